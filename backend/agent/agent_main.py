@@ -1,16 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import json
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, TypedDict
 
-from langgraph.graph import END, StateGraph
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, ToolMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
 
-from backend.core.config import GEMINI_API_KEY, MODEL_NAME
+from backend.agent.history import compact_history
+from backend.agent.intent import route_intent
+from backend.core.chains import registry
+from backend.core.concurrency import llm_limiter
+from backend.core.config import INTENT_FAST_PATH_ENABLED, MAX_TOOL_WORKERS, MODEL_NAME
+from backend.core.metrics import MetricsCallbackHandler, track_call
+from backend.core.runtime import run_sync
+from backend.core.text import split_feedbacks
+from backend.tools.feature_index import FeatureIndex
+from backend.tools.feature_store import record_tool_result, search_feature_store_tool, session_of
 from backend.tools.feedback_analyzer import analyze_feedback_tool, identify_recurrent_patterns_tool
 from backend.tools.prioritizer import prioritize_features_tool, FeatureToPrioritize
-from backend.tools.story_writer import write_user_story_tool
+from backend.tools.story_writer import write_user_stories_tool, write_user_story_tool
+
+if TYPE_CHECKING:
+    from langgraph.graph import StateGraph
 
 # --- Schéma d'état de l'agent (persisté par LangGraph entre les tours) ---
 class AgentState(TypedDict, total=False):
@@ -18,36 +31,108 @@ class AgentState(TypedDict, total=False):
     analysis_result: Optional[Dict[str, Any]]
     prioritization_result: Optional[Dict[str, Any]]
     user_story: Optional[Dict[str, Any]]
+    user_stories: Optional[Dict[str, Any]]
+    feature_index: Optional[Dict[str, Any]]
 
 # --- LLM supervisor configuré avec les outils (function-calling) ---
-llm_supervisor = (
-    ChatGoogleGenerativeAI(
-        model=MODEL_NAME,
-        temperature=0,
-        api_key=GEMINI_API_KEY,
+SUPERVISOR_TAG = "supervisor"
+SUPERVISOR_TOOLS = [
+    analyze_feedback_tool,
+    identify_recurrent_patterns_tool,
+    prioritize_features_tool,
+    write_user_story_tool,
+    write_user_stories_tool,
+    search_feature_store_tool,
+]
+
+
+def get_llm_supervisor() -> Runnable:
+    """
+    Retourne le LLM supervisor lié aux outils, construit une seule fois par boucle asyncio.
+    """
+    return registry.get_or_create(
+        ("supervisor", MODEL_NAME),
+        # Tag "supervisor" : permet au CLI de ne streamer que les tokens du supervisor
+        lambda: registry.get_llm(MODEL_NAME, temperature=0).bind_tools(SUPERVISOR_TOOLS).with_config(tags=[SUPERVISOR_TAG]),
     )
-    .bind_tools([
-        analyze_feedback_tool,
-        identify_recurrent_patterns_tool,
-        prioritize_features_tool,
-        write_user_story_tool,
-    ])
-)
+
+# --- Exécution d'un appel d'outil ---
+async def execute_tool_call(
+    call: Dict[str, Any],
+    feature_index: Optional[FeatureIndex] = None,
+) -> Tuple[str, Optional[str], Dict[str, Any]]:
+    """
+    Route un tool_call vers le bon outil et sérialise son résultat.
+    Avec un `feature_index`, l'analyse de feedbacks est incrémentale : seules les phrases jamais vues
+    sont analysées, et le résultat renvoyé couvre toutes les fonctionnalités de la session.
+    Retourne (nom de l'outil, clé de l'état à mettre à jour ou None, résultat sérialisable).
+    """
+    tool_name: str = call["name"]
+    arguments: Dict[str, Any] = call.get("args", {})
+
+    # --- Routage vers le bon outil et sérialisation du résultat ---
+    if tool_name == analyze_feedback_tool.name:
+        if feature_index is None:
+            result = await analyze_feedback_tool.ainvoke(arguments)
+            return tool_name, "analysis_result", result.model_dump()
+
+        feedback_text = arguments.get("feedback_text", "")
+        # Empreintes des feedbacks complets : une citation reprise dans un nouveau feedback ne le masque pas
+        items = split_feedbacks(feedback_text)
+        unseen = feature_index.unseen(items)
+        if unseen:
+            # Texte d'origine si tout est nouveau, sinon uniquement les phrases jamais analysées
+            text = feedback_text if len(unseen) == len(items) else "\n".join(unseen)
+            result = await analyze_feedback_tool.ainvoke({"feedback_text": text})
+            feature_index.add(result, unseen)
+        return tool_name, "analysis_result", feature_index.result().model_dump()
+
+    if tool_name == prioritize_features_tool.name: # Prioritization tool
+        features_objs = [FeatureToPrioritize(**f) for f in arguments.get("features", [])]
+        result = await prioritize_features_tool.ainvoke({
+            "features": features_objs,
+            "framework": arguments.get("framework", "RICE"),
+            }
+        )
+        return tool_name, "prioritization_result", result.model_dump()
+
+    if tool_name == write_user_story_tool.name: # Story writing tool
+        result = await write_user_story_tool.ainvoke(arguments)
+        return tool_name, "user_story", result.model_dump()
+
+    if tool_name == write_user_stories_tool.name: # Batch story writing tool
+        result = await write_user_stories_tool.ainvoke(arguments)
+        return tool_name, "user_stories", result.model_dump()
+
+    if tool_name == identify_recurrent_patterns_tool.name: # Pattern analysis tool
+        result = await identify_recurrent_patterns_tool.ainvoke(arguments)
+        return tool_name, None, result.model_dump()
+
+    if tool_name == search_feature_store_tool.name: # Local history search tool
+        result = await search_feature_store_tool.ainvoke(arguments)
+        return tool_name, None, result.model_dump()
+
+    # Outil inconnu
+    return tool_name, None, {"error": f"Outil inconnu : {tool_name}"}
+
 
 # --- Nœud principal : décision, exécution des outils, mise à jour de l'état ---
-def supervisor_step(state: AgentState) -> Dict[str, Any]:
+async def supervisor_step(state: AgentState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
     """
     Exécute un tour de conversation avec décision et appels d'outils.
+    Les résultats des outils sont ajoutés à l'historique local, rattachés à la session (`thread_id` de `config`).
     """
     # 1. Création du message système
     system_msg = SystemMessage(
         content=(
             "You are a Product‑Owner assistant. "
-            "You have four tools:\n"
+            "You have six tools:\n"
             "  - analyze_feedback   – analyse and extract structured feature requests from raw feedbacks.\n"
             "  - identify_recurrent_patterns – detect recurring patterns ONLY if the user explicitly asks (keywords: 'pattern', 'thème récurrent', 'tendance', 'recurrence').\n"
             "  - prioritize_features – score or rank features when the user requests prioritisation.\n"
             "  - write_user_story    – create a user story when the user asks for it.\n"
+            "  - write_user_stories  – create the user stories of several features at once (e.g. a whole prioritised backlog); prefer it to several write_user_story calls.\n"
+            "  - search_feature_store – keyword search over the features, prioritisations and user stories of all previous sessions; use it for questions about past results instead of re-analysing feedbacks.\n"
             "If the user provides several feedbacks at once, always send the full list together to the analyze_feedback tool for a global analysis.\n"
             "For each user request, determine which steps are relevant (analysis, prioritisation, user‑story writing) and call the tools in a logical order. "
             "Output :"
@@ -63,10 +148,32 @@ def supervisor_step(state: AgentState) -> Dict[str, Any]:
     if not history or not isinstance(history[0], SystemMessage):
         history = [system_msg] + history
 
-    # 3. Premier appel au LLM
-    response = llm_supervisor.invoke(history)
-
     updates: Dict[str, Any] = {}
+    llm_supervisor = get_llm_supervisor()
+    feature_index = FeatureIndex.from_dict(state.get("feature_index"))
+    session_id = session_of(config)
+
+    async def call_supervisor() -> BaseMessage:
+        # Historique borné : anciens résultats d'outils remplacés par des références à l'état
+        prompt_history, report = compact_history(history, {**state, **updates})
+        with track_call("supervisor", "supervisor", MODEL_NAME) as record:
+            record.extra["history_tokens_saved"] = report.tokens_saved
+            return await llm_limiter.run(
+                lambda: llm_supervisor.ainvoke(prompt_history, config={"callbacks": [MetricsCallbackHandler(record)]}),
+                estimated_tokens=report.compacted_tokens,
+                record=record,
+            )
+
+    # 3. Premier appel au LLM, sauf si la demande est routée localement vers un outil
+    response: Optional[BaseMessage] = None
+    if INTENT_FAST_PATH_ENABLED and isinstance(history[-1], HumanMessage):
+        with track_call("router", "intent") as record:
+            decision = route_intent(str(history[-1].content), {**state, **updates})
+            record.extra.update(intent=decision.intent, confidence=round(decision.confidence, 3), fast_path=decision.tool_call is not None)
+        if decision.tool_call is not None:
+            response = AIMessage(content="", tool_calls=[decision.tool_call])
+    if response is None:
+        response = await call_supervisor()
 
     # 4. Boucle d'exécution des tool_calls
     loop_guard = 0
@@ -80,37 +187,22 @@ def supervisor_step(state: AgentState) -> Dict[str, Any]:
         # Ajoute le message AI contenant les tool_calls dans l'historique
         history.append(response)
 
-        for call in response.tool_calls:
-            tool_name: str = call["name"]
-            arguments: Dict[str, Any] = call.get("args", {})
-
-            # --- Routage vers le bon outil et sérialisation du résultat ---
-            if tool_name == analyze_feedback_tool.name:
-                result = analyze_feedback_tool.invoke(arguments)
-                serializable = result.model_dump()
-                updates["analysis_result"] = serializable
-
-            elif tool_name == prioritize_features_tool.name: # Prioritization tool
-                features_objs = [FeatureToPrioritize(**f) for f in arguments.get("features", [])]
-                result = prioritize_features_tool.invoke({
-                    "features": features_objs,
-                    "framework": arguments.get("framework", "RICE"),
-                    }
-                )
-                serializable = result.model_dump()
-                updates["prioritization_result"] = serializable
+        # Les appels d'un même tour sont indépendants : exécution parallèle,
+        # puis injection des résultats dans l'ordre d'origine des tool_calls
+        calls = response.tool_calls
+        semaphore = asyncio.Semaphore(MAX_TOOL_WORKERS)
 
-            elif tool_name == write_user_story_tool.name: # Story writing tool
-                result = write_user_story_tool.invoke(arguments)
-                serializable = result.model_dump()
-                updates["user_story"] = serializable
+        async def bounded_call(call: Dict[str, Any]) -> Tuple[str, Optional[str], Dict[str, Any]]:
+            async with semaphore:
+                with track_call("tool", call["name"]):
+                    return await execute_tool_call(call, feature_index)
 
-            elif tool_name == identify_recurrent_patterns_tool.name: # Pattern analysis tool
-                result = identify_recurrent_patterns_tool.invoke(arguments)
-                serializable = result.model_dump()
+        outcomes = await asyncio.gather(*(bounded_call(call) for call in calls))
 
-            else: # Outil inconnu
-                serializable = {"error": f"Outil inconnu : {tool_name}"}
+        for call, (tool_name, state_key, serializable) in zip(calls, outcomes):
+            if state_key is not None:
+                updates[state_key] = serializable
+            await record_tool_result(tool_name, serializable, session_id)
 
             # Injection d'un ToolMessage avec un id correct
             tool_call_id = call.get("id", tool_name)
@@ -122,8 +214,14 @@ def supervisor_step(state: AgentState) -> Dict[str, Any]:
                 )
             )
 
+        # Analyses parallèles d'un même tour : chacune renvoie un instantané partiel de l'index,
+        # l'état reprend donc l'index complet une fois tous les appels terminés
+        if any(tool_name == analyze_feedback_tool.name for tool_name, _, _ in outcomes):
+            updates["analysis_result"] = feature_index.result().model_dump()
+            updates["feature_index"] = feature_index.to_dict()
+
         # Relance du LLM avec l'historique enrichi
-        response = llm_supervisor.invoke(history)
+        response = await call_supervisor()
 
     # 5. Ajout de la réponse finale à l'historique
     if isinstance(response, BaseMessage):
@@ -133,19 +231,47 @@ def supervisor_step(state: AgentState) -> Dict[str, Any]:
     updates["messages"] = history
 
     # On conserve les anciens résultats s'ils existent déjà dans le state
-    for key in ["analysis_result", "prioritization_result", "user_story"]:
+    for key in ["analysis_result", "prioritization_result", "user_story", "user_stories", "feature_index"]:
         if key not in updates and key in state:
             updates[key] = state[key]
 
     return updates
 
-# --- Construction du graphe LangGraph (un nœud) ---
-graph = StateGraph(AgentState)
+def supervisor_step_sync(state: AgentState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+    """
+    Enveloppe synchrone de `supervisor_step`, utilisée par `agent.invoke`.
+    """
+    return run_sync(supervisor_step(state, config))
+
+# --- Construction du graphe LangGraph (un nœud), différée au premier usage ---
+def build_graph() -> StateGraph:
+    """
+    Construit le graphe de l'agent (non compilé), par exemple pour le compiler avec un checkpointer.
+    """
+    # Import différé : LangGraph n'est chargé que si le graphe est utilisé
+    from langgraph.graph import END, StateGraph
+
+    graph = StateGraph(AgentState)
+
+    graph.add_node("supervisor", RunnableLambda(supervisor_step_sync, afunc=supervisor_step, name="supervisor"))
+
+    graph.set_entry_point("supervisor")
 
-graph.add_node("supervisor", supervisor_step)
+    graph.add_edge("supervisor", END)
 
-graph.set_entry_point("supervisor")
+    return graph
+
+
+@functools.lru_cache(maxsize=None)
+def get_agent() -> Runnable:
+    """
+    Retourne l'agent compilé, construit une seule fois par processus.
+    """
+    return build_graph().compile()
 
-graph.add_edge("supervisor", END)
 
-agent = graph.compile()
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    # Compatibilité : `from backend.agent.agent_main import agent` compile le graphe à la demande
+    if name == "agent":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
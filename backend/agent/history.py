@@ -0,0 +1,226 @@
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Mapping, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from backend.core.config import HISTORY_SUMMARY_CHARS, HISTORY_TOKEN_BUDGET
+from backend.core.text import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Outils dont le résultat est déjà conservé dans l'état de l'agent
+TOOL_STATE_KEYS = {
+    "analyze_feedback_tool": "analysis_result",
+    "prioritize_features_tool": "prioritization_result",
+    "write_user_story_tool": "user_story",
+    "write_user_stories_tool": "user_stories",
+}
+
+
+# --- Rapport de compaction ---
+@dataclass
+class CompactionReport:
+    """
+    Taille estimée (en tokens) de l'historique avant et après compaction.
+    """
+    original_tokens: int
+    compacted_tokens: int
+    compacted_tool_messages: int = 0
+    dropped_messages: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.compacted_tokens
+
+
+# --- Estimation de taille ---
+def message_tokens(message: BaseMessage) -> int:
+    """
+    Estimation du nombre de tokens d'un message, arguments des tool_calls compris.
+    """
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, ensure_ascii=False)
+    tokens = estimate_tokens(content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += estimate_tokens(json.dumps([call.get("args", {}) for call in message.tool_calls], ensure_ascii=False))
+    return tokens
+
+
+def history_tokens(messages: List[BaseMessage]) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+# --- Références compactes vers l'état ---
+def _describe_counts(state_key: str, payload: Mapping[str, Any]) -> str:
+    if state_key == "analysis_result":
+        return f"{len(payload.get('features', []))} fonctionnalités"
+    if state_key == "prioritization_result":
+        return f"{len(payload.get('features', []))} fonctionnalités priorisées"
+    if state_key == "user_story":
+        return f"user story « {payload.get('title', '')} »"
+    if state_key == "user_stories":
+        stories = payload.get("stories", [])
+        return f"{len(stories)} user stories ({sum(1 for s in stories if s.get('error'))} en échec)"
+    return state_key
+
+
+def _describe_result(state_key: str, payload: Mapping[str, Any]) -> str:
+    if state_key == "analysis_result":
+        names = [f.get("name", "") for f in payload.get("features", [])]
+        return f"{_describe_counts(state_key, payload)} ({', '.join(names)})"
+    if state_key == "prioritization_result":
+        names = [f.get("feature_name", "") for f in payload.get("features", [])]
+        return f"{_describe_counts(state_key, payload)} ({', '.join(names)})"
+    return _describe_counts(state_key, payload)
+
+
+def compact_tool_message(message: ToolMessage) -> Optional[ToolMessage]:
+    """
+    Remplace le contenu d'un ancien ToolMessage dont le résultat est conservé dans l'état
+    par une référence compacte. Retourne None si le message n'est pas concerné.
+    """
+    state_key = TOOL_STATE_KEYS.get(getattr(message, "tool_name", None) or message.name or "")
+    if state_key is None:
+        return None
+    try:
+        payload = json.loads(message.content)
+    except (TypeError, ValueError):
+        return None
+    reference = {"ref": state_key, "summary": _describe_result(state_key, payload)}
+    return message.model_copy(update={"content": json.dumps(reference, ensure_ascii=False)})
+
+
+SNAPSHOT_HEADER = "Résultats courants de la session (référencés par 'ref' dans les anciens résultats d'outils) :"
+
+
+def _snapshot_items(state_key: str, payload: Mapping[str, Any]) -> List[str]:
+    if state_key == "analysis_result":
+        return [f"{f.get('name', '')} ({f.get('category', '')})" for f in payload.get("features", [])]
+    if state_key == "prioritization_result":
+        items = []
+        for f in payload.get("features", []):
+            rank = f.get("final_score") if f.get("final_score") is not None else f.get("qualitative_rank")
+            items.append(f"{f.get('feature_name', '')} ({rank})" if rank is not None else f.get("feature_name", ""))
+        return items
+    if state_key == "user_stories":
+        return [
+            s["story"].get("title", "") if s.get("story") else f"{s.get('feature', '')} (échec)"
+            for s in payload.get("stories", [])
+        ]
+    return []
+
+
+def state_snapshot(state: Mapping[str, Any], max_tokens: Optional[int] = None) -> Optional[SystemMessage]:
+    """
+    Message de contexte décrivant une seule fois, de façon compacte, les résultats courants conservés dans l'état
+    (effectifs, noms, catégories et scores, pas les résultats complets), auxquels renvoient les références compactes.
+    Au-delà de `max_tokens`, la liste est tronquée et le nombre de lignes omises est indiqué ;
+    None si même l'en-tête ne tient pas.
+    """
+    lines: List[str] = []
+    for state_key in TOOL_STATE_KEYS.values():
+        payload = state.get(state_key)
+        if payload:
+            lines.append(f"- {state_key} : {_describe_counts(state_key, payload)}")
+            lines.extend(f"  - {item}" for item in _snapshot_items(state_key, payload))
+    if not lines:
+        return None
+
+    kept = [SNAPSHOT_HEADER] + lines
+    if max_tokens is not None and estimate_tokens("\n".join(kept)) > max_tokens:
+        # Troncature : on garde le début de la liste et on indique le nombre de lignes omises
+        kept = [SNAPSHOT_HEADER]
+        for i, line in enumerate(lines):
+            note = f"… {len(lines) - i - 1} lignes omises (budget de contexte atteint)."
+            if estimate_tokens("\n".join(kept + [line, note])) > max_tokens:
+                break
+            kept.append(line)
+        if len(kept) == 1:
+            return None
+        kept.append(f"… {len(lines) - len(kept) + 1} lignes omises (budget de contexte atteint).")
+    return SystemMessage(content="\n".join(kept))
+
+
+# --- Résumé des tours tronqués ---
+def summarize_turns(messages: List[BaseMessage], max_chars: int = HISTORY_SUMMARY_CHARS) -> SystemMessage:
+    """
+    Résumé local (sans appel au modèle) des échanges retirés de l'historique : un extrait tronqué
+    par message utilisateur et par réponse finale de l'assistant.
+    """
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            speaker = "Utilisateur"
+        elif isinstance(message, AIMessage) and not message.tool_calls and message.content:
+            speaker = "Assistant"
+        else:
+            continue
+        text = " ".join(str(message.content).split())
+        if len(text) > max_chars:
+            text = text[:max_chars].rstrip() + "…"
+        lines.append(f"- {speaker} : {text}")
+    return SystemMessage(content="Résumé des échanges précédents :\n" + "\n".join(lines))
+
+
+# --- Compaction de l'historique ---
+def compact_history(
+    history: List[BaseMessage],
+    state: Mapping[str, Any],
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+) -> Tuple[List[BaseMessage], CompactionReport]:
+    """
+    Prépare l'historique envoyé au supervisor sans modifier l'historique complet de l'état :
+    1. les résultats d'outils des tours précédents déjà conservés dans l'état sont remplacés par des références,
+       l'état courant étant décrit une seule fois en contexte, de façon compacte et dans la limite du budget ;
+    2. si le budget de tokens est dépassé, les tours les plus anciens sont retirés et résumés localement.
+    L'historique compacté n'est jamais plus long que l'original.
+    Le tour en cours (depuis le dernier message utilisateur) est toujours conservé intact.
+    """
+    original_tokens = history_tokens(history)
+    system = [m for m in history[:1] if isinstance(m, SystemMessage)]
+    body = history[len(system):]
+
+    current_start = max((i for i, m in enumerate(body) if isinstance(m, HumanMessage)), default=0)
+    past, current = body[:current_start], body[current_start:]
+
+    # 1. Références compactes pour les anciens résultats d'outils
+    compacted_count = 0
+    compacted_past: List[BaseMessage] = []
+    for message in past:
+        if isinstance(message, ToolMessage):
+            compacted = compact_tool_message(message)
+            if compacted is not None:
+                compacted_past.append(compacted)
+                compacted_count += 1
+                continue
+        compacted_past.append(message)
+
+    # L'état courant, sous forme compacte, ne peut occuper que le budget laissé par le message système et le tour en cours
+    snapshot_budget = token_budget - history_tokens(system + current)
+    snapshot = state_snapshot(state, max_tokens=snapshot_budget) if compacted_count and snapshot_budget > 0 else None
+    context = system + ([snapshot] if snapshot else [])
+
+    # 2. Troncature des tours les plus anciens (par tours complets, pour garder les tool_calls appariés),
+    #    résumé des tours retirés compris dans le budget
+    dropped: List[BaseMessage] = []
+    summary: List[BaseMessage] = []
+    while compacted_past and history_tokens(context + summary + compacted_past + current) > token_budget:
+        next_turn = next((i for i, m in enumerate(compacted_past) if i > 0 and isinstance(m, HumanMessage)), len(compacted_past))
+        dropped.extend(compacted_past[:next_turn])
+        compacted_past = compacted_past[next_turn:]
+        summary = [summarize_turns(dropped)]
+
+    compacted = context + summary + compacted_past + current
+    if history_tokens(compacted) > original_tokens:
+        # La compaction ne doit jamais agrandir l'historique envoyé
+        compacted, compacted_count, dropped = list(history), 0, []
+
+    report = CompactionReport(
+        original_tokens=original_tokens,
+        compacted_tokens=history_tokens(compacted),
+        compacted_tool_messages=compacted_count,
+        dropped_messages=len(dropped),
+    )
+    logger.info("Historique compacté : %d tokens économisés (%d → %d)", report.tokens_saved, report.original_tokens, report.compacted_tokens)
+    return compacted, report
@@ -0,0 +1,239 @@
+import functools
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.core.config import INTENT_MIN_CONFIDENCE
+from backend.core.text import normalize_text, quoted_feedbacks, split_feedbacks, strip_quoted
+
+# --- Règles par mots-clés (sur la consigne normalisée : minuscules, sans accents) ---
+INTENT_RULES = {
+    "patterns": re.compile(r"\b(patterns?|themes? recurrents?|tendances?|recurrences?|recurrents?)\b"),
+    "prioritize": re.compile(r"\b(priori\w*|rice|moscow|wsjf|kano|classe\w*|rank\w*)\b"),
+    "story": re.compile(r"\b(user stor\w*|stor(y|ies)|recits? utilisateurs?)\b"),
+    "analyze": re.compile(r"\b(analy\w*|extrai\w*|extract\w*)\b"),
+}
+
+FRAMEWORKS = {"rice": "RICE", "moscow": "MoSCoW", "wsjf": "WSJF", "kano": "Kano"}
+
+# Questions sur le fonctionnement de l'assistant (« peux-tu m'expliquer comment tu analyses… ») : jamais outillées
+QUESTION_RE = re.compile(r"\b(expliqu\w*|explain\w*|pourquoi|why|how|comment (tu|vous|on|ca|faire|fonctionne\w*))\b")
+
+# Nombre minimal de mots d'une donnée sur une seule ligne après le deux-points
+MIN_PAYLOAD_WORDS = 2
+
+# --- Exemples d'apprentissage du classifieur (consignes seules, sans les feedbacks) ---
+INTENT_EXAMPLES = {
+    "analyze": [
+        "analyse",
+        "analyse ces feedbacks",
+        "analyse ce feedback et celui-ci",
+        "peux-tu analyser ces retours clients",
+        "analyse les commentaires suivants",
+        "extrais les demandes de fonctionnalités de ces feedbacks",
+        "voici des feedbacks utilisateurs, analyse-les",
+        "analyze this customer feedback",
+        "extract the feature requests from these comments",
+        "quelles fonctionnalités ressortent de ces retours",
+    ],
+    "patterns": [
+        "quels sont les patterns récurrents dans ces feedbacks",
+        "identifie les thèmes récurrents",
+        "détecte les tendances dans ces retours",
+        "y a-t-il des récurrences dans ces commentaires",
+        "quels thèmes reviennent souvent",
+        "find recurring patterns in this feedback",
+        "what are the main trends in these comments",
+        "analyse les patterns de ces feedbacks",
+    ],
+    "prioritize": [
+        "priorise ces fonctionnalités en RICE",
+        "priorise les fonctionnalités",
+        "classe ces demandes par priorité",
+        "fais une priorisation MoSCoW",
+        "score les fonctionnalités avec RICE",
+        "prioritize these features",
+        "rank the backlog with WSJF",
+        "quelle fonctionnalité traiter en premier",
+    ],
+    "story": [
+        "rédige une user story",
+        "écris la user story pour cette fonctionnalité",
+        "génère les user stories",
+        "crée une story avec critères d'acceptation",
+        "rédige le récit utilisateur",
+        "write a user story for this feature",
+        "generate user stories for the backlog",
+        "donne-moi la story de cette fonctionnalité",
+    ],
+    "other": [
+        "bonjour",
+        "merci beaucoup",
+        "que sais-tu faire",
+        "explique-moi le framework RICE",
+        "résume ce qu'on a fait",
+        "peux-tu reformuler ta réponse",
+        "hello, who are you",
+        "quelle est la différence entre MoSCoW et RICE",
+    ],
+}
+
+
+# --- Classifieur naïf bayésien multinomial (NumPy, sur CPU) ---
+def _tokens(text: str) -> List[str]:
+    # Préfixes de 6 caractères : « analyse », « analyser » et « analysez » partagent le même trait
+    return [word[:6] for word in normalize_text(text).split() if len(word) > 1]
+
+
+class NaiveBayesIntentClassifier:
+    """
+    Classifieur de consignes par sac de mots (préfixes), avec lissage de Laplace.
+    Entraîné en quelques millisecondes sur une poignée d'exemples par intention.
+    """
+
+    def __init__(self, examples: Mapping[str, Sequence[str]], alpha: float = 1.0) -> None:
+        self.labels = list(examples)
+        vocabulary = sorted({token for texts in examples.values() for text in texts for token in _tokens(text)})
+        self.vocabulary = {token: i for i, token in enumerate(vocabulary)}
+        counts = np.full((len(self.labels), len(vocabulary)), alpha)
+        for row, label in enumerate(self.labels):
+            for text in examples[label]:
+                for token in _tokens(text):
+                    counts[row, self.vocabulary[token]] += 1
+        self.log_likelihood = np.log(counts / counts.sum(axis=1, keepdims=True))
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        columns = [self.vocabulary[token] for token in _tokens(text) if token in self.vocabulary]
+        scores = self.log_likelihood[:, columns].sum(axis=1)
+        probabilities = np.exp(scores - scores.max())
+        probabilities /= probabilities.sum()
+        return {label: float(p) for label, p in zip(self.labels, probabilities)}
+
+
+@functools.lru_cache(maxsize=None)
+def get_classifier() -> NaiveBayesIntentClassifier:
+    return NaiveBayesIntentClassifier(INTENT_EXAMPLES)
+
+
+# --- Décision de routage ---
+@dataclass
+class IntentDecision:
+    """
+    Intention détectée, confiance du classifieur et appel d'outil construit localement (None : repli sur le LLM).
+    """
+    intent: str
+    confidence: float
+    tool_call: Optional[Dict[str, Any]] = None
+    reason: str = ""
+
+
+def is_question(instruction: str) -> bool:
+    """
+    Vrai si la consigne est une question (point d'interrogation ou demande d'explication) plutôt qu'une demande d'action.
+    """
+    return "?" in instruction or bool(QUESTION_RE.search(normalize_text(instruction)))
+
+
+def _list_lines(text: str) -> List[str]:
+    return [line for line in text.splitlines() if line.strip(" \t-•*")]
+
+
+def _is_payload(text: str) -> bool:
+    """
+    Vrai si le texte après le deux-points ressemble à des données : liste sur plusieurs lignes,
+    ou ligne d'au moins `MIN_PAYLOAD_WORDS` mots qui n'est pas une question.
+    """
+    if len(_list_lines(text)) > 1:
+        return True
+    return len(normalize_text(text).split()) >= MIN_PAYLOAD_WORDS and not text.rstrip().endswith("?")
+
+
+def split_instruction(message: str) -> Tuple[str, str]:
+    """
+    Sépare la consigne des données : liste de feedbacks entre guillemets après la consigne (le message entier
+    est transmis à l'outil) ou texte après le premier deux-points, s'il ressemble à des données (voir `_is_payload`).
+    Sinon, le message entier est la consigne et il n'y a pas de données.
+    """
+    if quoted_feedbacks(message, with_instruction=True):
+        return strip_quoted(message), message
+    if ":" in message:
+        instruction, payload = message.split(":", 1)
+        if _is_payload(payload.strip()):
+            return instruction, payload.strip()
+    return message, ""
+
+
+def _build_tool_call(intent: str, instruction: str, payload: str, state: Mapping[str, Any]) -> Tuple[Optional[Dict[str, Any]], str]:
+    # Citations : le texte qui les précède est la consigne ; sinon découpage des données en lignes ou en phrases
+    quoted = quoted_feedbacks(payload, with_instruction=True) if payload else []
+    items = quoted or (split_feedbacks(payload) if payload else [])
+
+    if intent == "analyze":
+        if not items:
+            return None, "aucun feedback fourni"
+        return {"name": "analyze_feedback_tool", "args": {"feedback_text": payload}}, ""
+
+    if intent == "patterns":
+        if len(items) < 2:
+            return None, "moins de deux feedbacks fournis"
+        return {"name": "identify_recurrent_patterns_tool", "args": {"feedbacks": items}}, ""
+
+    if intent == "prioritize":
+        analysis = state.get("analysis_result") or {}
+        if items or not analysis.get("features"):
+            # Fonctionnalités à extraire du message ou aucune analyse en cours : décision laissée au LLM
+            return None, "aucune liste de fonctionnalités exploitable"
+        words = set(normalize_text(instruction).split())
+        framework = next((name for key, name in FRAMEWORKS.items() if key in words), "RICE")
+        features = [
+            {"name": f["name"], "description": f["description"], "category": f.get("category")}
+            for f in analysis["features"]
+        ]
+        return {"name": "prioritize_features_tool", "args": {"features": features, "framework": framework}}, ""
+
+    if intent == "story":
+        if not items:
+            return None, "aucune fonctionnalité décrite"
+        # Une description sur une seule ligne, même en plusieurs phrases, décrit une seule fonctionnalité :
+        # plusieurs user stories uniquement pour une liste (plusieurs lignes ou plusieurs citations)
+        features = items if quoted or len(_list_lines(payload)) > 1 else [payload.strip()]
+        if len(features) == 1:
+            return {"name": "write_user_story_tool", "args": {"feature_description": features[0]}}, ""
+        return {"name": "write_user_stories_tool", "args": {"features": features}}, ""
+
+    return None, "intention non outillée"
+
+
+def route_intent(message: str, state: Mapping[str, Any], min_confidence: float = INTENT_MIN_CONFIDENCE) -> IntentDecision:
+    """
+    Décide localement de l'outil à appeler pour un message utilisateur.
+    Les questions ne sont jamais outillées. Le raccourci n'est pris que si une seule intention est détectée par les règles, que le classifieur
+    la confirme avec une probabilité d'au moins `min_confidence` et que les arguments de l'outil
+    peuvent être construits sans ambiguïté ; sinon `tool_call` vaut None et le supervisor décide.
+    """
+    instruction, payload = split_instruction(message)
+    if is_question(instruction):
+        return IntentDecision("other", 0.0, reason="question laissée au supervisor")
+    normalized = normalize_text(instruction)
+    matched = [intent for intent, rule in INTENT_RULES.items() if rule.search(normalized)]
+    if "patterns" in matched and "analyze" in matched:
+        # « analyse les patterns » : la demande explicite de patterns l'emporte
+        matched.remove("analyze")
+
+    probabilities = get_classifier().predict_proba(instruction)
+    best = max(probabilities, key=probabilities.get)
+    confidence = probabilities[best]
+
+    if len(matched) != 1:
+        return IntentDecision(best, confidence, reason=f"{len(matched)} intentions détectées par les règles")
+    intent = matched[0]
+    if best != intent or confidence < min_confidence:
+        return IntentDecision(intent, probabilities[intent], reason="classifieur non confirmé")
+
+    tool_call, reason = _build_tool_call(intent, instruction, payload, state)
+    if tool_call is not None:
+        tool_call["id"] = f"fast-{uuid.uuid4().hex[:8]}"
+    return IntentDecision(intent, confidence, tool_call, reason)
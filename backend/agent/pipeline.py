@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import functools
+import operator
+from typing import Annotated, Any, Dict, List, Optional, TypedDict, Union
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langgraph.graph import END, StateGraph
+from langgraph.types import Send
+
+from backend.agent.agent_main import execute_tool_call
+from backend.core.config import PIPELINE_TOP_N
+from backend.core.metrics import track_call
+from backend.core.text import normalize_text
+from backend.tools.feature_index import FeatureIndex
+from backend.tools.feature_store import record_tool_result, session_of
+from backend.tools.feedback_analyzer import analyze_feedback_tool
+from backend.tools.prioritizer import prioritize_features_tool
+from backend.tools.story_writer import StoryOutcome, UserStoriesResult, write_user_story_tool
+
+
+# --- Schéma d'état du pipeline ---
+class PipelineState(TypedDict, total=False):
+    feedback_text: str
+    framework: str
+    top_n: int
+    analysis_result: Optional[Dict[str, Any]]
+    prioritization_result: Optional[Dict[str, Any]]
+    feature_index: Optional[Dict[str, Any]]
+    # Résultats des nœuds de rédaction parallèles, concaténés par LangGraph (ordre rétabli par `collect_stories`)
+    story_outcomes: Annotated[List[Dict[str, Any]], operator.add]
+    user_stories: Optional[Dict[str, Any]]
+
+
+class StoryTask(TypedDict):
+    rank: int
+    feature: str
+
+
+# --- Nœuds ---
+async def analyze_node(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
+    """
+    Analyse incrémentale des feedbacks (seules les phrases jamais vues de la session partent au modèle).
+    """
+    feature_index = FeatureIndex.from_dict(state.get("feature_index"))
+    call = {"name": analyze_feedback_tool.name, "args": {"feedback_text": state.get("feedback_text", "")}}
+    with track_call("tool", analyze_feedback_tool.name):
+        _, _, result = await execute_tool_call(call, feature_index)
+    await record_tool_result(analyze_feedback_tool.name, result, session_of(config))
+    return {"analysis_result": result, "feature_index": feature_index.to_dict()}
+
+
+async def prioritize_node(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
+    """
+    Priorisation de toutes les fonctionnalités extraites, transmises telles quelles par l'analyse.
+    """
+    features = [
+        {"name": f["name"], "description": f["description"], "category": f.get("category")}
+        for f in (state.get("analysis_result") or {}).get("features", [])
+    ]
+    if not features:
+        return {"prioritization_result": {"features": []}}
+    call = {"name": prioritize_features_tool.name, "args": {"features": features, "framework": state.get("framework", "RICE")}}
+    with track_call("tool", prioritize_features_tool.name):
+        _, _, result = await execute_tool_call(call)
+    await record_tool_result(prioritize_features_tool.name, result, session_of(config))
+    return {"prioritization_result": result}
+
+
+def story_tasks(state: PipelineState) -> List[StoryTask]:
+    """
+    Fonctionnalités les mieux classées (`top_n`), dans l'ordre de la priorisation, décrites par leur nom
+    et la description issue de l'analyse.
+    """
+    descriptions = {
+        normalize_text(f["name"]): f["description"]
+        for f in (state.get("analysis_result") or {}).get("features", [])
+    }
+    ranked = (state.get("prioritization_result") or {}).get("features", [])[: state.get("top_n", PIPELINE_TOP_N)]
+    tasks: List[StoryTask] = []
+    for rank, item in enumerate(ranked):
+        name = item["feature_name"]
+        description = descriptions.get(normalize_text(name))
+        tasks.append({"rank": rank, "feature": f"{name} : {description}" if description else name})
+    return tasks
+
+
+def fan_out_stories(state: PipelineState) -> Union[str, List[Send]]:
+    """
+    Un nœud de rédaction par fonctionnalité retenue, tous lancés dans la même étape du graphe.
+    """
+    tasks = story_tasks(state)
+    if not tasks:
+        return "collect_stories"
+    return [Send("write_story", task) for task in tasks]
+
+
+async def write_story_node(task: StoryTask, config: RunnableConfig) -> Dict[str, Any]:
+    """
+    Rédige la user story d'une fonctionnalité ; un échec est reporté sans interrompre les autres.
+    """
+    with track_call("tool", write_user_story_tool.name):
+        try:
+            story = await write_user_story_tool.ainvoke({"feature_description": task["feature"]})
+            outcome = StoryOutcome(feature=task["feature"], story=story)
+            await record_tool_result(write_user_story_tool.name, story.model_dump(), session_of(config))
+        except Exception as exc:
+            outcome = StoryOutcome(feature=task["feature"], error=f"{type(exc).__name__}: {exc}")
+    return {"story_outcomes": [{"rank": task["rank"], **outcome.model_dump()}]}
+
+
+def collect_stories(state: PipelineState) -> Dict[str, Any]:
+    """
+    Rassemble les user stories dans l'ordre de la priorisation, au format de `write_user_stories_tool`.
+    """
+    outcomes = sorted(state.get("story_outcomes") or [], key=operator.itemgetter("rank"))
+    result = UserStoriesResult(stories=[StoryOutcome(**{k: v for k, v in o.items() if k != "rank"}) for o in outcomes])
+    return {"user_stories": result.model_dump()}
+
+
+# --- Construction du graphe ---
+def build_pipeline_graph() -> StateGraph:
+    """
+    Graphe déclaratif analyse → priorisation → user stories (une branche parallèle par fonctionnalité).
+    Aucun appel au supervisor : un rafraîchissement complet du backlog ne coûte que les appels des outils.
+    """
+    graph = StateGraph(PipelineState)
+
+    graph.add_node("analyze", analyze_node)
+    graph.add_node("prioritize", prioritize_node)
+    graph.add_node("write_story", write_story_node)
+    graph.add_node("collect_stories", collect_stories)
+
+    graph.set_entry_point("analyze")
+    graph.add_edge("analyze", "prioritize")
+    graph.add_conditional_edges("prioritize", fan_out_stories, ["write_story", "collect_stories"])
+    graph.add_edge("write_story", "collect_stories")
+    graph.add_edge("collect_stories", END)
+
+    return graph
+
+
+@functools.lru_cache(maxsize=None)
+def get_pipeline() -> Runnable:
+    """
+    Retourne le pipeline compilé, construit une seule fois par processus.
+    """
+    return build_pipeline_graph().compile()
+
+
+async def run_pipeline(
+    feedback_text: str,
+    framework: str = "RICE",
+    top_n: int = PIPELINE_TOP_N,
+    state: Optional[Dict[str, Any]] = None,
+    session_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Exécute le pipeline complet sur de nouveaux feedbacks. L'index de fonctionnalités de `state`
+    (session de l'agent) est repris : seuls les feedbacks jamais vus sont analysés.
+    Les résultats sont aussi ajoutés à l'historique local, rattachés à `session_id`.
+    Retourne les résultats à fusionner dans l'état de l'agent.
+    """
+    output = await get_pipeline().ainvoke({
+        "feedback_text": feedback_text,
+        "framework": framework,
+        "top_n": top_n,
+        "feature_index": (state or {}).get("feature_index"),
+    }, config={"configurable": {"thread_id": session_id}})
+    keys = ("analysis_result", "prioritization_result", "user_stories", "feature_index")
+    return {key: output[key] for key in keys if output.get(key) is not None}
@@ -0,0 +1,11 @@
+import argparse
+
+import uvicorn
+
+# --- Lancement du service HTTP ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service HTTP multi-sessions de l'agent Product Owner")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run("backend.api.app:app", host=args.host, port=args.port)
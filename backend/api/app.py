@@ -0,0 +1,132 @@
+import asyncio
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from pydantic import BaseModel
+
+from backend.agent.agent_main import build_graph
+from backend.core.concurrency import llm_limiter
+from backend.core.config import CHECKPOINT_DB
+from backend.core.metrics import metrics
+
+# Clés de l'état renvoyées au client (l'historique complet reste côté serveur)
+RESULT_KEYS = ("analysis_result", "prioritization_result", "user_story", "user_stories")
+
+
+# --- Schémas d'entrée/sortie ---
+class SessionCreated(BaseModel):
+    session_id: str
+
+
+class MessageIn(BaseModel):
+    message: str
+
+
+class TurnOut(BaseModel):
+    session_id: str
+    reply: str
+    results: Dict[str, Any]
+
+
+class SessionOut(BaseModel):
+    session_id: str
+    turns: int
+    results: Dict[str, Any]
+
+
+# --- Verrous par session ---
+class SessionLocks:
+    """
+    Un verrou asyncio par session : deux messages d'une même session sont traités l'un après l'autre,
+    les sessions différentes s'exécutent en parallèle. Les verrous inutilisés sont libérés automatiquement.
+    """
+
+    def __init__(self) -> None:
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def get(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+
+def _config(session_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": session_id}}
+
+
+def _results(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: values[key] for key in RESULT_KEYS if values.get(key) is not None}
+
+
+# --- Application ---
+def create_app(checkpoint_db: Optional[str] = None) -> FastAPI:
+    """
+    Service HTTP multi-sessions : chaque session est un thread LangGraph dont l'état
+    (historique et résultats) est persisté dans SQLite et survit aux redémarrages.
+    Toutes les sessions partagent le même graphe compilé et la limite d'appels LLM simultanés du processus.
+    """
+    db_path = checkpoint_db or CHECKPOINT_DB
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        async with AsyncSqliteSaver.from_conn_string(db_path) as saver:
+            app.state.agent = build_graph().compile(checkpointer=saver)
+            app.state.locks = SessionLocks()
+            yield
+
+    app = FastAPI(title="Product Owner Agent", lifespan=lifespan)
+
+    @app.post("/sessions", response_model=SessionCreated, status_code=201)
+    async def create_session() -> SessionCreated:
+        return SessionCreated(session_id=uuid.uuid4().hex)
+
+    @app.post("/sessions/{session_id}/messages", response_model=TurnOut)
+    async def post_message(session_id: str, body: MessageIn, request: Request) -> TurnOut:
+        agent = request.app.state.agent
+        async with request.app.state.locks.get(session_id):
+            # 1. Reprise de l'état persisté de la session
+            snapshot = await agent.aget_state(_config(session_id))
+            values = dict(snapshot.values or {})
+            values["messages"] = list(values.get("messages", [])) + [HumanMessage(content=body.message)]
+
+            # 2. Exécution du tour ; le checkpointer enregistre le nouvel état
+            final_state = await agent.ainvoke(values, config=_config(session_id))
+
+        last = final_state["messages"][-1]
+        reply = last.content if isinstance(last, AIMessage) and isinstance(last.content, str) else ""
+        return TurnOut(session_id=session_id, reply=reply, results=_results(final_state))
+
+    @app.get("/sessions/{session_id}", response_model=SessionOut)
+    async def get_session(session_id: str, request: Request) -> SessionOut:
+        snapshot = await request.app.state.agent.aget_state(_config(session_id))
+        if not snapshot.values:
+            raise HTTPException(status_code=404, detail=f"Session inconnue : {session_id}")
+        messages = snapshot.values.get("messages", [])
+        return SessionOut(
+            session_id=session_id,
+            turns=sum(isinstance(m, HumanMessage) for m in messages),
+            results=_results(snapshot.values),
+        )
+
+    @app.get("/health")
+    async def health() -> Dict[str, Any]:
+        return {"status": "ok", "llm": llm_limiter.stats()}
+
+    @app.get("/metrics")
+    async def get_metrics() -> Dict[str, Any]:
+        # Même contenu que la commande /metrics du CLI : mesures de chaque appel et état du limiteur
+        return {**metrics.summary(), "llm_limiter": llm_limiter.stats()}
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from backend.core.config import BATCH_CONCURRENCY, BATCH_SIZE
+from backend.tools.feedback_analyzer import analyze_feedback_list, identify_recurrent_patterns_tool
+from backend.tools.prioritizer import FeatureToPrioritize, prioritize_features_tool
+
+# Colonnes (CSV) ou champs (JSONL) reconnus par défaut comme texte du feedback
+TEXT_FIELDS = ("feedback", "text", "comment", "message")
+
+
+# --- Lecture en flux des fichiers de feedbacks ---
+def _pick_field(fields: List[str], column: Optional[str]) -> str:
+    if column is not None:
+        if column not in fields:
+            raise ValueError(f"Colonne introuvable : {column} (colonnes disponibles : {', '.join(fields)})")
+        return column
+    return next((f for f in fields if f.lower() in TEXT_FIELDS), fields[0])
+
+
+def iter_feedback_rows(path: str, column: Optional[str] = None) -> Iterator[str]:
+    """
+    Lit un fichier CSV (avec en-tête) ou JSONL ligne par ligne et produit le texte de chaque feedback,
+    espaces normalisés. Les lignes vides sont ignorées. Sans `column`, le premier champ nommé
+    feedback/text/comment/message est utilisé, sinon la première colonne.
+    Seule la ligne courante est gardée en mémoire.
+    """
+    with open(path, encoding="utf-8", newline="") as handle:
+        if Path(path).suffix.lower() in (".jsonl", ".ndjson"):
+            for line in handle:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                text = row if isinstance(row, str) else row.get(_pick_field(list(row), column), "")
+                text = " ".join(str(text).split())
+                if text:
+                    yield text
+        else:
+            reader = csv.DictReader(handle)
+            field = _pick_field(list(reader.fieldnames or []), column)
+            for row in reader:
+                text = " ".join((row.get(field) or "").split())
+                if text:
+                    yield text
+
+
+def iter_batches(rows: Iterator[str], batch_size: int) -> Iterator[List[str]]:
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+# --- Point de reprise ---
+@dataclass
+class BatchCheckpoint:
+    """
+    Avancement d'un traitement : nombre de lots et de lignes déjà écrits, et taille du fichier de sortie
+    à ce moment-là (tout ce qui suit a pu être écrit partiellement et sera retiré à la reprise).
+    """
+    input_path: str
+    batch_size: int
+    batches_done: int = 0
+    rows_done: int = 0
+    output_offset: int = 0
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BatchCheckpoint"]:
+        if not path.exists():
+            return None
+        return cls(**json.loads(path.read_text(encoding="utf-8")))
+
+    def save(self, path: Path) -> None:
+        # Écriture atomique : un arrêt brutal laisse l'ancien point de reprise intact
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(asdict(self)), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+@dataclass
+class BatchReport:
+    batches: int
+    rows: int
+    resumed_from_row: int
+
+
+# --- Traitement d'un lot ---
+async def process_batch(rows: List[str], framework: str = "RICE") -> Dict[str, Any]:
+    """
+    Enchaîne analyse → patterns → priorisation sur un lot de feedbacks, sans passer par le supervisor.
+    L'analyse et la détection de patterns sont indépendantes et lancées en parallèle.
+    """
+    analysis, patterns = await asyncio.gather(
+        analyze_feedback_list(rows),
+        identify_recurrent_patterns_tool.ainvoke({"feedbacks": rows}),
+    )
+    features = [
+        FeatureToPrioritize(name=f.name, description=f.description, category=f.category)
+        for f in analysis.features
+    ]
+    prioritization = (
+        await prioritize_features_tool.ainvoke({"features": features, "framework": framework}) if features else None
+    )
+    return {
+        "analysis": analysis.model_dump(),
+        "patterns": patterns.model_dump(),
+        "prioritization": prioritization.model_dump() if prioritization else None,
+    }
+
+
+# --- Traitement d'un fichier complet ---
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    checkpoint_path: Optional[str] = None,
+    batch_size: int = BATCH_SIZE,
+    concurrency: int = BATCH_CONCURRENCY,
+    framework: str = "RICE",
+    column: Optional[str] = None,
+) -> BatchReport:
+    """
+    Traite un fichier de feedbacks par lots de `batch_size` lignes, au plus `concurrency` lots en cours.
+    Chaque lot produit une ligne JSONL, écrite dans l'ordre des lots dès qu'elle est prête ; le point de reprise
+    est mis à jour après chaque écriture. Relancer la même commande reprend après le dernier lot écrit,
+    sans renvoyer au modèle les lignes déjà traitées. La mémoire utilisée ne dépend pas de la taille du fichier.
+    """
+    output = Path(output_path)
+    checkpoint_file = Path(checkpoint_path) if checkpoint_path else output.with_name(output.name + ".checkpoint")
+
+    # 1. Reprise éventuelle : on retire de la sortie ce qui a suivi le dernier point de reprise
+    checkpoint = BatchCheckpoint.load(checkpoint_file)
+    if checkpoint is not None and (checkpoint.input_path, checkpoint.batch_size) != (str(Path(input_path).resolve()), batch_size):
+        raise ValueError(
+            f"Le point de reprise {checkpoint_file} correspond à un autre traitement "
+            f"({checkpoint.input_path}, lots de {checkpoint.batch_size}) : le supprimer pour recommencer."
+        )
+    if checkpoint is None:
+        checkpoint = BatchCheckpoint(input_path=str(Path(input_path).resolve()), batch_size=batch_size)
+    resumed_from_row = checkpoint.rows_done
+    if checkpoint.rows_done and not output.exists():
+        raise ValueError(f"Fichier de sortie introuvable pour le point de reprise {checkpoint_file} : le supprimer pour recommencer.")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    mode = "r+" if checkpoint.rows_done else "w"
+    with output.open(mode, encoding="utf-8") as out:
+        out.seek(checkpoint.output_offset)
+        out.truncate()
+
+        # 2. Lecture en flux, en sautant les lignes déjà traitées
+        rows = itertools.islice(iter_feedback_rows(input_path, column), checkpoint.rows_done, None)
+        batches = enumerate(iter_batches(rows, batch_size), start=checkpoint.batches_done)
+
+        # 3. Fenêtre glissante de lots en cours ; écriture dans l'ordre des lots
+        window: Deque[asyncio.Task] = deque()
+
+        async def write_oldest() -> None:
+            index, size, result = await window.popleft()
+            out.write(json.dumps({"batch": index, "rows": size, **result}, ensure_ascii=False) + "\n")
+            out.flush()
+            checkpoint.batches_done = index + 1
+            checkpoint.rows_done += size
+            checkpoint.output_offset = out.tell()
+            checkpoint.save(checkpoint_file)
+            print(f"[lot {index}] {checkpoint.rows_done} lignes traitées", flush=True)
+
+        async def run_one(index: int, batch: List[str]) -> Any:
+            return index, len(batch), await process_batch(batch, framework)
+
+        try:
+            for index, batch in batches:
+                window.append(asyncio.create_task(run_one(index, batch)))
+                if len(window) >= concurrency:
+                    await write_oldest()
+            while window:
+                await write_oldest()
+        finally:
+            for task in window:
+                task.cancel()
+
+    return BatchReport(
+        batches=checkpoint.batches_done,
+        rows=checkpoint.rows_done,
+        resumed_from_row=resumed_from_row,
+    )
+
+
+# --- Point d'entrée en ligne de commande ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse, patterns et priorisation d'un fichier de feedbacks (CSV ou JSONL)")
+    parser.add_argument("input", help="Fichier CSV (avec en-tête) ou JSONL de feedbacks")
+    parser.add_argument("--output", required=True, help="Fichier JSONL de résultats (une ligne par lot)")
+    parser.add_argument("--column", default=None, help="Colonne ou champ contenant le texte du feedback")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--framework", default="RICE")
+    parser.add_argument("--restart", action="store_true", help="Ignore le point de reprise et recommence depuis le début")
+    args = parser.parse_args()
+
+    checkpoint_file = Path(args.output + ".checkpoint")
+    if args.restart:
+        checkpoint_file.unlink(missing_ok=True)
+
+    report = asyncio.run(
+        run_batch(
+            args.input,
+            args.output,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            framework=args.framework,
+            column=args.column,
+        )
+    )
+    print(f"{report.rows} lignes traitées en {report.batches} lots (reprise à la ligne {report.resumed_from_row}).")
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from backend.core.config import (
+    TOOL_CACHE_DIR,
+    TOOL_CACHE_ENABLED,
+    TOOL_CACHE_MAX_ENTRIES,
+    TOOL_CACHE_NONDETERMINISTIC,
+    TOOL_CACHE_TTL_SECONDS,
+)
+
+M = TypeVar("M", bound=BaseModel)
+
+
+# --- Normalisation et clé de cache ---
+def normalize_input(value: Any) -> Any:
+    """
+    Normalise une entrée d'outil pour que des variations sans effet (espaces, retours à la ligne,
+    ordre des clés) produisent la même clé de cache.
+    """
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, BaseModel):
+        return normalize_input(value.model_dump())
+    if isinstance(value, dict):
+        return {str(k): normalize_input(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [normalize_input(v) for v in value]
+    return value
+
+
+def make_cache_key(tool_name: str, model: str, temperature: float, prompt_version: str, inputs: Dict[str, Any]) -> str:
+    """
+    Clé adressée par contenu : outil, modèle, température, version du prompt et hash des entrées normalisées.
+    """
+    payload = json.dumps(
+        {
+            "tool": tool_name,
+            "model": model,
+            "temperature": float(temperature),
+            "prompt_version": prompt_version,
+            "inputs": normalize_input(inputs),
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# --- Cache disque des résultats d'outils ---
+class ResultCache:
+    """
+    Cache disque des résultats Pydantic des outils : un fichier JSON par entrée,
+    éviction LRU au-delà de `max_entries` et expiration après `ttl_seconds`.
+    L'ordre LRU est tenu en mémoire (chargé une seule fois depuis les dates d'accès des fichiers) :
+    une écriture ne parcourt pas le répertoire. `aget` et `aset` exécutent les accès disque dans un thread.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 1000, ttl_seconds: float = 7 * 24 * 3600) -> None:
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, None]"] = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _lru(self) -> "OrderedDict[str, None]":
+        # Index LRU (du moins au plus récemment utilisé), construit au premier accès d'après les fichiers existants
+        if self._index is None:
+            entries = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    entries.append((path.stat().st_mtime, path.stem))
+                except OSError:
+                    continue
+            self._index = OrderedDict((key, None) for _, key in sorted(entries))
+        return self._index
+
+    def get(self, key: str, schema: Type[M]) -> Optional[M]:
+        """
+        Retourne le résultat en cache pour `key`, ou None (absent, expiré ou illisible).
+        """
+        path = self._path(key)
+        with self._lock:
+            index = self._lru()
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+                if time.time() - entry["created_at"] > self.ttl_seconds:
+                    path.unlink(missing_ok=True)
+                    index.pop(key, None)
+                    self.evictions += 1
+                    raise KeyError(key)
+                result = schema.model_validate(entry["value"])
+            except (OSError, KeyError, ValueError, ValidationError):
+                self.misses += 1
+                return None
+
+            # Mise à jour de l'ordre LRU (et de la date d'accès, pour le prochain démarrage)
+            index[key] = None
+            index.move_to_end(key)
+            os.utime(path)
+            self.hits += 1
+            return result
+
+    def set(self, key: str, value: BaseModel) -> None:
+        """
+        Enregistre un résultat (écriture atomique) puis applique la limite de taille.
+        """
+        entry = {"created_at": time.time(), "schema": type(value).__name__, "value": value.model_dump()}
+        with self._lock:
+            index = self._lru()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.directory / f".{key}.{threading.get_ident()}.tmp"
+            tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self._path(key))
+            index[key] = None
+            index.move_to_end(key)
+            self.writes += 1
+            self._evict()
+
+    async def aget(self, key: str, schema: Type[M]) -> Optional[M]:
+        """
+        `get` dans un thread, pour ne pas bloquer la boucle asyncio.
+        """
+        return await asyncio.to_thread(self.get, key, schema)
+
+    async def aset(self, key: str, value: BaseModel) -> None:
+        """
+        `set` dans un thread, pour ne pas bloquer la boucle asyncio.
+        """
+        await asyncio.to_thread(self.set, key, value)
+
+    def _evict(self) -> None:
+        index = self._lru()
+        while len(index) > self.max_entries:
+            key, _ = index.popitem(last=False)
+            self._path(key).unlink(missing_ok=True)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self.directory.glob("*.json"):
+                path.unlink(missing_ok=True)
+            self._index = OrderedDict()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Statistiques hit/miss du cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def is_cacheable(temperature: float) -> bool:
+    """
+    Les résultats sont mis en cache uniquement si le cache est activé. Les chaînes non déterministes
+    (température > 0, ex. write_user_story) nécessitent en plus TOOL_CACHE_NONDETERMINISTIC.
+    """
+    if not TOOL_CACHE_ENABLED:
+        return False
+    return temperature == 0 or TOOL_CACHE_NONDETERMINISTIC
+
+
+# Cache global du processus
+tool_cache = ResultCache(TOOL_CACHE_DIR, max_entries=TOOL_CACHE_MAX_ENTRIES, ttl_seconds=TOOL_CACHE_TTL_SECONDS)
@@ -0,0 +1,311 @@
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel, ValidationError
+
+from backend.core.cache import is_cacheable, make_cache_key, tool_cache
+from backend.core.concurrency import llm_limiter
+from backend.core.config import FAST_MODEL_NAME, GEMINI_API_KEY, MODEL_NAME, MODEL_ROUTES, STRUCTURED_OUTPUT_MODE
+from backend.core.metrics import CallRecord, MetricsCallbackHandler, track_call
+from backend.core.structured import (
+    FORMAT_SUFFIX,
+    describe_error,
+    format_instructions,
+    format_tokens_saved,
+    raw_output_text,
+    repair_json,
+)
+from backend.core.text import estimate_tokens
+
+
+# --- Description déclarative d'une chaîne d'outil ---
+@dataclass(frozen=True)
+class ChainSpec:
+    """
+    Décrit la chaîne LLM d'un outil : nom, prompt, schéma de sortie et température.
+    Le prompt ne décrit pas le format JSON attendu : le schéma est transmis au modèle en sortie structurée native,
+    ou ajouté au prompt sous forme de consignes de format en mode 'prompt'.
+    `version` est à incrémenter à chaque modification du prompt (invalide le cache des résultats).
+    """
+    name: str
+    template: str
+    input_variables: Tuple[str, ...]
+    schema: Type[BaseModel]
+    temperature: float = 0
+    version: str = "1"
+
+
+LLMFactory = Callable[[str, float], BaseChatModel]
+
+
+def default_llm_factory(model: str, temperature: float) -> BaseChatModel:
+    """
+    Construit un client Gemini (comportement par défaut du registre).
+    """
+    # Import différé : le SDK Google n'est chargé qu'au premier appel réel au modèle
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        google_api_key=GEMINI_API_KEY,
+    )
+
+
+REPAIR_TEMPLATE = """
+        La sortie JSON suivante n'a pas pu être validée :
+        ---
+        {output}
+        ---
+        Erreur : {error}
+
+        Corrigez uniquement le format de cette sortie, sans en modifier le contenu.
+        """ + FORMAT_SUFFIX
+
+
+# --- Choix du modèle par chaîne ---
+MODEL_ALIASES = {"fast": FAST_MODEL_NAME, "default": MODEL_NAME}
+
+
+def parse_model_routes(text: str) -> Dict[str, Tuple[str, ...]]:
+    """
+    Lit une configuration « chaîne=modèle>modèle, ... » : pour chaque chaîne, les modèles à essayer dans l'ordre.
+    """
+    routes: Dict[str, Tuple[str, ...]] = {}
+    for entry in text.split(","):
+        name, _, models = entry.partition("=")
+        route = tuple(MODEL_ALIASES.get(m.strip(), m.strip()) for m in models.split(">") if m.strip())
+        if name.strip() and route:
+            # Un même modèle cité deux fois n'est essayé qu'une fois
+            routes[name.strip()] = tuple(dict.fromkeys(route))
+    return routes
+
+
+CHAIN_MODEL_ROUTES = parse_model_routes(MODEL_ROUTES)
+
+
+def model_route(spec: ChainSpec) -> Tuple[str, ...]:
+    return CHAIN_MODEL_ROUTES.get(spec.name, (MODEL_NAME,))
+
+
+# --- Registre partagé des modèles et des chaînes compilées ---
+class ChainRegistry:
+    """
+    Registre thread-safe qui construit une seule fois chaque client Gemini et chaque chaîne d'outil.
+    Les clients sont indexés par (modèle, température) et partagés entre les chaînes, ce qui permet
+    de réutiliser leurs connexions HTTP/gRPC au lieu d'en ouvrir une nouvelle à chaque appel.
+    Les clients async de Gemini étant attachés à une boucle asyncio, le cache est cloisonné par boucle.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._global_scope: Dict[Tuple[Any, ...], Any] = {}
+        self._loop_scopes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[Any, ...], Any]]" = weakref.WeakKeyDictionary()
+        self.setups_built = 0
+        self.setups_avoided = 0
+        self.llm_factory: LLMFactory = default_llm_factory
+
+    def set_llm_factory(self, factory: Optional[LLMFactory]) -> None:
+        """
+        Remplace la construction des modèles (ex. par un FakeChatModel pour les tests et benchmarks)
+        et vide le cache ; `None` rétablit Gemini.
+        """
+        with self._lock:
+            self.llm_factory = factory or default_llm_factory
+            self.clear()
+
+    def _scope(self) -> Dict[Tuple[Any, ...], Any]:
+        try:
+            loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            return self._global_scope
+        return self._loop_scopes.setdefault(loop, {})
+
+    def get_or_create(self, key: Tuple[Any, ...], factory: Callable[[], Any]) -> Any:
+        """
+        Retourne l'objet mis en cache sous `key`, en le construisant via `factory` au premier appel.
+        """
+        with self._lock:
+            scope = self._scope()
+            if key in scope:
+                self.setups_avoided += 1
+                return scope[key]
+            value = factory()
+            scope[key] = value
+            self.setups_built += 1
+            return value
+
+    def get_llm(self, model: str = MODEL_NAME, temperature: float = 0) -> BaseChatModel:
+        """
+        Retourne le client partagé pour ce couple (modèle, température).
+        """
+        return self.get_or_create(("llm", model, float(temperature)), lambda: self.llm_factory(model, temperature))
+
+    def get_chain(self, spec: ChainSpec, model: str = MODEL_NAME) -> Runnable:
+        """
+        Retourne la chaîne compilée de l'outil décrit par `spec` :
+        - mode 'native' : `prompt | llm.with_structured_output(schema)`, qui renvoie {"raw", "parsed", "parsing_error"} ;
+        - mode 'prompt' (ou modèle sans sortie structurée) : `prompt + consignes de format | llm`, qui renvoie le message brut.
+        """
+        def build() -> Runnable:
+            llm = self.get_llm(model, spec.temperature)
+            if STRUCTURED_OUTPUT_MODE == "native":
+                try:
+                    structured_llm = llm.with_structured_output(spec.schema, include_raw=True)
+                except NotImplementedError:
+                    pass
+                else:
+                    return PromptTemplate(template=spec.template, input_variables=list(spec.input_variables)) | structured_llm
+
+            prompt = PromptTemplate(
+                template=spec.template + FORMAT_SUFFIX,
+                input_variables=list(spec.input_variables),
+                partial_variables={"format_instructions": format_instructions(spec.schema)},
+            )
+            return prompt | llm
+
+        return self.get_or_create(("chain", spec.name, model, float(spec.temperature)), build)
+
+    def get_repair_chain(self, spec: ChainSpec, model: str = MODEL_NAME) -> Runnable:
+        """
+        Retourne la chaîne de correction d'une sortie invalide de `spec` : seule la sortie fautive
+        et l'erreur de validation sont renvoyées au modèle, pas l'entrée d'origine.
+        """
+        def build() -> Runnable:
+            output_parser = PydanticOutputParser(pydantic_object=spec.schema)
+            prompt = PromptTemplate(
+                template=REPAIR_TEMPLATE,
+                input_variables=["output", "error"],
+                partial_variables={"format_instructions": format_instructions(spec.schema)},
+            )
+            return prompt | self.get_llm(model, 0) | output_parser
+
+        return self.get_or_create(("chain", f"{spec.name}:repair", model, 0.0), build)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Compteurs de construction : setups effectués, setups évités, clients et chaînes en cache.
+        """
+        with self._lock:
+            keys = list(self._global_scope)
+            for scope in list(self._loop_scopes.values()):
+                keys.extend(scope)
+            return {
+                "setups_built": self.setups_built,
+                "setups_avoided": self.setups_avoided,
+                "llms": sum(1 for key in keys if key[0] == "llm"),
+                "chains": sum(1 for key in keys if key[0] == "chain"),
+            }
+
+    def clear(self) -> None:
+        """
+        Vide le registre (utile pour les tests ou après un changement de configuration).
+        """
+        with self._lock:
+            self._global_scope.clear()
+            self._loop_scopes = weakref.WeakKeyDictionary()
+            self.setups_built = 0
+            self.setups_avoided = 0
+
+
+# Registre global du processus
+registry = ChainRegistry()
+
+
+# --- Exécution d'une chaîne d'outil ---
+async def ainvoke_chain(spec: ChainSpec, inputs: Dict[str, Any], model: Optional[str] = None) -> Any:
+    """
+    Exécute la chaîne de `spec` sur `inputs`, en passant par le cache disque des résultats s'il est activé.
+    Sans `model` explicite, les modèles de la route de la chaîne (`MODEL_ROUTES`) sont essayés du plus rapide
+    au plus robuste : le suivant n'est appelé que si la sortie reste invalide après correction locale.
+    Chaque exécution est mesurée (durée, tokens, cache, échecs de parsing, modèle retenu et escalades)
+    dans le registre de métriques.
+    """
+    route = (model,) if model else model_route(spec)
+    with track_call("chain", spec.name, route[0]) as record:
+        cache_key = None
+        if is_cacheable(spec.temperature):
+            cache_key = make_cache_key(spec.name, ">".join(route), spec.temperature, spec.version, inputs)
+            cached = await tool_cache.aget(cache_key, spec.schema)
+            record.cache_hit = cached is not None
+            if cached is not None:
+                return cached
+
+        escalations: List[Dict[str, str]] = []
+        for tier, current in enumerate(route):
+            record.model = current
+            last = tier == len(route) - 1
+            chain = registry.get_chain(spec, current)
+            output = await llm_limiter.run(
+                lambda: chain.ainvoke(inputs, config={"callbacks": [MetricsCallbackHandler(record)]}),
+                estimated_tokens=estimate_tokens(spec.template) + sum(estimate_tokens(str(v)) for v in inputs.values()),
+                record=record,
+            )
+            try:
+                # Correction par le modèle réservée au dernier niveau : avant, on passe au modèle suivant
+                result = await _parse_output(spec, output, current, record, model_repair=last)
+                break
+            except (OutputParserException, ValidationError) as exc:
+                if last:
+                    raise
+                escalations.append({"model": current, "reason": describe_error(exc)})
+                record.extra["escalations"] = escalations
+
+        if cache_key is not None:
+            await tool_cache.aset(cache_key, result)
+        return result
+
+
+# --- Validation et correction des sorties ---
+async def _parse_output(spec: ChainSpec, output: Any, model: str, record: CallRecord, model_repair: bool = True) -> Any:
+    """
+    Valide la sortie d'une chaîne. En cas d'échec, la sortie est d'abord corrigée localement
+    (JSON mal formé), puis, si nécessaire et si `model_repair`, seule la sortie fautive est renvoyée au modèle
+    pour correction ; sinon OutputParserException est levée.
+    `parse_failure` signale un premier essai invalide, `extra["repair"]` la correction appliquée.
+    """
+    if isinstance(output, dict):
+        # Sortie structurée native
+        record.extra["prompt_tokens_saved"] = format_tokens_saved(spec.schema)
+        if output.get("parsed") is not None:
+            return output["parsed"]
+        raw, error = output.get("raw"), output.get("parsing_error")
+    else:
+        try:
+            return PydanticOutputParser(pydantic_object=spec.schema).invoke(output)
+        except OutputParserException as exc:
+            raw, error = output, exc
+
+    record.parse_failure = True
+    text = raw_output_text(raw)
+
+    # 1. Correction locale, sans appel au modèle
+    repaired = repair_json(text, spec.schema)
+    if repaired is not None:
+        record.extra["repair"] = "local"
+        return repaired
+    if not text.strip():
+        raise OutputParserException(f"Sortie vide pour {spec.name} : {describe_error(error)}")
+    if not model_repair:
+        raise OutputParserException(f"Sortie invalide pour {spec.name} : {describe_error(error)}")
+
+    # 2. Correction par le modèle, limitée à la sortie fautive
+    record.retries += 1
+    record.extra["repair"] = "model"
+    repair_inputs = {"output": text, "error": describe_error(error)}
+    repair_chain = registry.get_repair_chain(spec, model)
+    return await llm_limiter.run(
+        lambda: repair_chain.ainvoke(repair_inputs, config={"callbacks": [MetricsCallbackHandler(record)]}),
+        estimated_tokens=estimate_tokens(REPAIR_TEMPLATE + text),
+        record=record,
+    )
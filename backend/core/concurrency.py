@@ -0,0 +1,231 @@
+import asyncio
+import collections
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from backend.core.config import (
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    MAX_INFLIGHT_LLM_CALLS,
+)
+from backend.core.metrics import CallRecord
+
+T = TypeVar("T")
+
+# Exceptions signalant un dépassement de quota (429), reconnues par leur nom pour ne pas importer le SDK Google
+RATE_LIMIT_ERRORS = ("ResourceExhausted", "TooManyRequests", "RateLimitError")
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """
+    Vrai si l'exception (ou sa cause) correspond à une réponse 429 du fournisseur.
+    """
+    while exc is not None:
+        if type(exc).__name__ in RATE_LIMIT_ERRORS or getattr(exc, "code", None) == 429:
+            return True
+        exc = exc.__cause__
+    return False
+
+
+# --- Seau à jetons (requêtes ou tokens par minute) ---
+class TokenBucket:
+    """
+    Débit moyen de `per_minute` unités par minute, avec des rafales d'au plus `capacity` unités.
+    Chaque réservation est prélevée immédiatement (le niveau peut devenir négatif) : les appelants
+    attendent le délai retourné, ce qui les sert dans l'ordre d'arrivée. `per_minute <= 0` désactive la limite.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = per_minute / 60
+        self.capacity = capacity if capacity is not None else max(1.0, per_minute / 6)
+        self._clock = clock
+        self._level = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Prélève `amount` unités et retourne l'attente nécessaire (en secondes) avant de les utiliser.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self._level -= min(amount, self.capacity)
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """
+        Corrige une réservation a posteriori (ex. tokens réellement consommés moins tokens estimés).
+        """
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level - amount)
+
+
+# --- Concurrence adaptative ---
+class AdaptiveConcurrencyLimiter:
+    """
+    Borne le nombre d'appels simultanés, partagée par toutes les boucles asyncio du processus.
+    La limite suit une règle AIMD : +1/limite par succès (environ +1 par « fenêtre » d'appels réussis),
+    divisée par deux à chaque refus pour dépassement de quota, entre `minimum` et `maximum`.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, initial: Optional[int] = None) -> None:
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(initial if initial is not None else maximum)
+        self.in_flight = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = collections.deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        # La place est transmise par `release` (in_flight déjà incrémenté pour nous)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._wake()
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self.throttled += 1
+            self.limit = max(self.minimum, self.limit / 2)
+
+    def _wake(self) -> None:
+        # Appelé sous verrou : transmet les places libres aux premiers en attente, quelle que soit leur boucle
+        while self._waiters and self.in_flight < int(self.limit):
+            loop, future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            loop.call_soon_threadsafe(self._grant, future)
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()  # l'appelant a abandonné entre-temps : la place est rendue
+        else:
+            future.set_result(None)
+
+
+# --- Limiteur de débit partagé des appels LLM ---
+class RateLimiter:
+    """
+    Point de passage unique des appels au modèle (supervisor et chaînes d'outils) :
+    1. attente d'une place (concurrence adaptative) puis des quotas requêtes/minute et tokens/minute ;
+    2. appel ; en cas de 429, réduction de la concurrence puis nouvel essai après un backoff exponentiel
+       à gigue complète (hors place réservée, pour ne pas bloquer les autres appels) ;
+    3. correction du seau de tokens avec la consommation réelle.
+    Les attentes sont reportées dans `CallRecord.queue_wait` et les nouveaux essais dans `CallRecord.retries`.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ) -> None:
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrencyLimiter(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        estimated_tokens: int = 0,
+        record: Optional[CallRecord] = None,
+    ) -> T:
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            await self.concurrency.acquire()
+            try:
+                wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if record is not None:
+                    record.queue_wait += time.perf_counter() - start
+                tokens_before = (record.input_tokens + record.output_tokens) if record is not None else 0
+                try:
+                    result = await call()
+                except Exception as exc:
+                    if not is_rate_limit_error(exc) or attempt >= self.max_retries:
+                        raise
+                    self.concurrency.on_throttle()
+                    attempt += 1
+                    if record is not None:
+                        record.retries += 1
+                    delay = self.backoff(attempt)
+                else:
+                    self.concurrency.on_success()
+                    if record is not None:
+                        used = record.input_tokens + record.output_tokens - tokens_before
+                        if used:
+                            self.tokens.adjust(used - min(estimated_tokens, self.tokens.capacity))
+                    return result
+            finally:
+                self.concurrency.release()
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "waiting": self.concurrency.waiting,
+            "throttled": self.concurrency.throttled,
+        }
+
+
+# Limiteur global du processus
+llm_limiter = RateLimiter(
+    requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+    max_concurrency=MAX_INFLIGHT_LLM_CALLS,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_base=LLM_BACKOFF_BASE_SECONDS,
+    backoff_max=LLM_BACKOFF_MAX_SECONDS,
+)
@@ -6,6 +6,85 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = "gemini-2.5-flash"
 
+# Modèles par chaîne d'outil : « chaîne=modèle>modèle, ... », du plus rapide au plus robuste. Le modèle suivant
+# n'est appelé que si la sortie du précédent reste invalide après correction locale. "fast" désigne FAST_MODEL_NAME,
+# "default" MODEL_NAME ; une chaîne absente utilise MODEL_NAME seul.
+FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME", "gemini-2.5-flash-lite")
+MODEL_ROUTES = os.getenv(
+    "MODEL_ROUTES",
+    "analyze_feedback=fast>default, label_pattern_clusters=fast>default, prioritize_features=fast>default",
+)
+
+# Nombre maximal d'appels d'outils exécutés en parallèle pour un même tour du supervisor
+MAX_TOOL_WORKERS = int(os.getenv("MAX_TOOL_WORKERS", "4"))
+
+# Limiteur partagé des appels LLM du processus (toutes sessions confondues) :
+# concurrence maximale (adaptée à la baisse en cas de 429), quotas par minute (0 = illimité) et backoff
+MAX_INFLIGHT_LLM_CALLS = int(os.getenv("MAX_INFLIGHT_LLM_CALLS", "8"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "1000"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+
+# Sessions du service HTTP : base SQLite du checkpointer LangGraph
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", ".cache/sessions.sqlite")
+
+# Sortie structurée des outils : "native" (schéma transmis au modèle) ou "prompt" (consignes de format dans le prompt)
+STRUCTURED_OUTPUT_MODE = os.getenv("STRUCTURED_OUTPUT_MODE", "native")
+
+# Routage local des demandes évidentes (règles + classifieur naïf bayésien) sans appel de décision au supervisor
+INTENT_FAST_PATH_ENABLED = os.getenv("INTENT_FAST_PATH_ENABLED", "true").lower() == "true"
+INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.7"))
+
+# Traitement par lots de fichiers de feedbacks (python -m backend.batch)
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "2"))
+
+# Budget (tokens estimés) de l'historique envoyé au supervisor ; les tours plus anciens sont résumés
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
+HISTORY_SUMMARY_CHARS = int(os.getenv("HISTORY_SUMMARY_CHARS", "200"))
+
+# Analyse map-reduce des gros volumes de feedbacks
+ANALYSIS_CHUNK_TOKENS = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "4000"))
+ANALYSIS_MAX_CONCURRENCY = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "4"))
+
+# Priorisation des gros backlogs par lots notés en parallèle, calibrés par des fonctionnalités d'ancrage communes
+PRIORITIZATION_CHUNK_SIZE = int(os.getenv("PRIORITIZATION_CHUNK_SIZE", "20"))
+PRIORITIZATION_ANCHORS = int(os.getenv("PRIORITIZATION_ANCHORS", "3"))
+PRIORITIZATION_MAX_CONCURRENCY = int(os.getenv("PRIORITIZATION_MAX_CONCURRENCY", "4"))
+
+# Rédaction de user stories par lots : fonctionnalités par prompt et requêtes simultanées
+STORY_BATCH_SIZE = int(os.getenv("STORY_BATCH_SIZE", "5"))
+STORY_MAX_CONCURRENCY = int(os.getenv("STORY_MAX_CONCURRENCY", "4"))
+
+# Mode pipeline (analyse → priorisation → user stories sans supervisor) : nombre de fonctionnalités les mieux classées à rédiger
+PIPELINE_TOP_N = int(os.getenv("PIPELINE_TOP_N", "5"))
+
+# Regroupement local des feedbacks quasi identiques (MinHash/LSH) avant analyse
+FEEDBACK_DEDUP_ENABLED = os.getenv("FEEDBACK_DEDUP_ENABLED", "true").lower() == "true"
+FEEDBACK_DEDUP_THRESHOLD = float(os.getenv("FEEDBACK_DEDUP_THRESHOLD", "0.8"))
+
+# Détection de patterns par regroupement local (TF-IDF + k-means) au-delà d'un certain volume
+PATTERN_CLUSTERING_MIN_FEEDBACKS = int(os.getenv("PATTERN_CLUSTERING_MIN_FEEDBACKS", "200"))
+PATTERN_MAX_CLUSTERS = int(os.getenv("PATTERN_MAX_CLUSTERS", "12"))
+PATTERN_SAMPLES_PER_CLUSTER = int(os.getenv("PATTERN_SAMPLES_PER_CLUSTER", "5"))
+
+# Historique local des résultats d'outils (SQLite + index plein texte FTS5), interrogeable sans appel au modèle
+FEATURE_STORE_ENABLED = os.getenv("FEATURE_STORE_ENABLED", "true").lower() == "true"
+FEATURE_STORE_DB = os.getenv("FEATURE_STORE_DB", ".cache/features.sqlite")
+
+# Cache disque des résultats d'outils (désactivé par défaut)
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "false").lower() == "true"
+TOOL_CACHE_DIR = os.getenv("TOOL_CACHE_DIR", ".cache/tool_results")
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1000"))
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Autorise aussi le cache des outils non déterministes (température > 0, ex. user stories)
+TOOL_CACHE_NONDETERMINISTIC = os.getenv("TOOL_CACHE_NONDETERMINISTIC", "false").lower() == "true"
+# Instrumentation locale : fichier de trace JSONL (vide pour désactiver) et taille de la fenêtre de métriques
+TRACE_FILE = os.getenv("TRACE_FILE", ".cache/trace.jsonl")
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "10000"))
+
 LANGSMITH_TRACING = os.getenv("LANGSMITH_TRACING", "false")
 LANGSMITH_ENDPOINT = os.getenv("LANGSMITH_ENDPOINT", None)
 LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY", None)
@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, PrivateAttr
+
+from backend.core.text import estimate_tokens
+
+Response = Union[AIMessage, str]
+Responder = Callable[[List[BaseMessage]], Response]
+
+
+# --- Construction de réponses scriptées ---
+def tool_call_message(*calls: Dict[str, Any]) -> AIMessage:
+    """
+    Message AI contenant des tool_calls, ex. `tool_call_message({"name": "write_user_story_tool", "args": {...}})`.
+    """
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": call["name"], "args": call.get("args", {}), "id": call.get("id") or f"call-{uuid.uuid4().hex[:8]}"}
+            for call in calls
+        ],
+    )
+
+
+# --- Modèle de chat factice et déterministe ---
+class FakeChatModel(BaseChatModel):
+    """
+    Modèle de chat sans réseau pour les tests et benchmarks, injectable à la place de ChatGoogleGenerativeAI
+    (voir `ChainRegistry.set_llm_factory`).
+    Les réponses viennent soit d'un `script` (liste rejouée en boucle), soit d'un `responder` appelé avec les messages.
+    La latence (avant le premier token puis par token en streaming) et les tokens rapportés sont configurables.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    script: Sequence[Response] = ()
+    responder: Optional[Responder] = None
+    latency: float = 0.0
+    token_latency: float = 0.0
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    forced_tool: Optional[str] = None
+
+    _cycle: Optional[Iterator[Response]] = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Sequence[Any], tool_choice: Optional[str] = None, **kwargs: Any) -> "FakeChatModel":
+        """
+        Les tool_calls sont scriptés : la liste d'outils n'a pas d'effet sur les réponses, sauf pour un appel
+        imposé (sortie structurée native) où une réponse JSON valide est convertie en tool_call de ce schéma.
+        """
+        if tool_choice and len(tools) == 1:
+            forced = self.model_copy()
+            forced.forced_tool = convert_to_openai_tool(tools[0])["function"]["name"]
+            return forced
+        return self
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.responder is not None:
+            response = self.responder(messages)
+        else:
+            with self._lock:
+                if self._cycle is None:
+                    self._cycle = itertools.cycle(self.script or ["ok"])
+                response = next(self._cycle)
+        message = AIMessage(content=response) if isinstance(response, str) else response.model_copy()
+
+        input_tokens = self.input_tokens if self.input_tokens is not None else sum(estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = self.output_tokens if self.output_tokens is not None else estimate_tokens(str(message.content))
+        if self.forced_tool and not message.tool_calls:
+            message = self._as_tool_call(message)
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return message
+
+    def _as_tool_call(self, message: AIMessage) -> AIMessage:
+        # JSON invalide : la réponse reste textuelle, comme un modèle qui n'a pas respecté le schéma
+        try:
+            args = json.loads(str(message.content))
+        except ValueError:
+            return message
+        if not isinstance(args, dict):
+            return message
+        return tool_call_message({"name": self.forced_tool, "args": args})
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        for chunk in self._chunks(self._next_message(messages)):
+            if run_manager and chunk.text:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            if self.token_latency:
+                time.sleep(self.token_latency)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for chunk in self._chunks(self._next_message(messages)):
+            if run_manager and chunk.text:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        """
+        Découpe une réponse en morceaux de streaming (un par mot) ; tool_calls et usage sur le dernier morceau.
+        """
+        words = str(message.content).split(" ") if message.content else []
+        for word in words[:-1]:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content=words[-1] if words else "",
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"], ensure_ascii=False), "id": call["id"], "index": i}
+                    for i, call in enumerate(message.tool_calls)
+                ],
+                usage_metadata=message.usage_metadata,
+            )
+        )
+
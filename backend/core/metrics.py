@@ -0,0 +1,196 @@
+import atexit
+import json
+import queue
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.exceptions import OutputParserException
+from langchain_core.outputs import LLMResult
+from pydantic import ValidationError
+
+from backend.core.config import METRICS_WINDOW, TRACE_FILE
+
+
+# --- Enregistrement d'un appel ---
+@dataclass
+class CallRecord:
+    """
+    Mesures d'un appel au supervisor, à un outil ou à une chaîne LLM.
+    """
+    kind: str
+    name: str
+    model: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    wall_time: float = 0.0
+    time_to_first_token: Optional[float] = None
+    queue_wait: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    retries: int = 0
+    cache_hit: Optional[bool] = None
+    parse_failure: bool = False
+    error: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Callback LangChain qui complète un CallRecord : temps du premier token (en streaming)
+    et nombre de tokens d'entrée/sortie d'après `usage_metadata`.
+    """
+
+    def __init__(self, record: CallRecord) -> None:
+        self.record = record
+        self._start = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self.record.time_to_first_token is None:
+            self.record.time_to_first_token = time.perf_counter() - self._start
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.record.input_tokens += usage.get("input_tokens", 0)
+                self.record.output_tokens += usage.get("output_tokens", 0)
+
+
+# --- Registre des métriques du processus ---
+class MetricsRegistry:
+    """
+    Conserve les derniers appels par (type, nom) et calcule des résumés p50/p95/p99.
+    Chaque appel est aussi ajouté au fichier de trace JSONL s'il est configuré : l'écriture est confiée
+    à un thread dédié, qui regroupe les lignes en attente, pour ne jamais bloquer la boucle asyncio.
+    """
+
+    def __init__(self, window: int = 10_000, trace_file: Optional[str] = None) -> None:
+        self._lock = threading.Lock()
+        self._records: Dict[Tuple[str, str], Deque[CallRecord]] = defaultdict(lambda: deque(maxlen=window))
+        self.trace_file = Path(trace_file) if trace_file else None
+        self._pending: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    def record(self, record: CallRecord) -> None:
+        with self._lock:
+            self._records[(record.kind, record.name)].append(record)
+            if self.trace_file is None:
+                return
+            self._pending.put(asdict(record))
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_traces, name="metrics-trace", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_traces(self) -> None:
+        while True:
+            # Un seul ajout au fichier pour toutes les lignes en attente
+            entries = [self._pending.get()]
+            while True:
+                try:
+                    entries.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                trace_file = self.trace_file
+                if trace_file is not None:
+                    trace_file.parent.mkdir(parents=True, exist_ok=True)
+                    with trace_file.open("a", encoding="utf-8") as trace:
+                        trace.write("".join(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in entries))
+            except OSError:
+                pass
+            finally:
+                for _ in entries:
+                    self._pending.task_done()
+
+    def flush(self) -> None:
+        """
+        Attend que toutes les traces en attente soient écrites dans le fichier.
+        """
+        if self._writer is not None:
+            self._pending.join()
+
+    def records(self, kind: Optional[str] = None, name: Optional[str] = None) -> List[CallRecord]:
+        with self._lock:
+            return [
+                r
+                for (k, n), records in self._records.items()
+                if (kind is None or k == kind) and (name is None or n == name)
+                for r in records
+            ]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Résumé par appel ('type:nom') : nombre d'appels, percentiles de durée, du premier token et de l'attente du limiteur,
+        tokens consommés, taux de cache, taux d'échecs de parsing (premier essai) et corrections appliquées,
+        tokens de prompt économisés par la sortie structurée native, modèles retenus et escalades vers un modèle plus robuste.
+        """
+        with self._lock:
+            groups = {key: list(records) for key, records in self._records.items()}
+
+        summary: Dict[str, Dict[str, Any]] = {}
+        for (kind, name), records in sorted(groups.items()):
+            wall = np.array([r.wall_time for r in records])
+            ttft = np.array([r.time_to_first_token for r in records if r.time_to_first_token is not None])
+            cache_lookups = [r.cache_hit for r in records if r.cache_hit is not None]
+            summary[f"{kind}:{name}"] = {
+                "count": len(records),
+                "wall_time": _percentiles(wall),
+                "time_to_first_token": _percentiles(ttft),
+                "queue_wait": _percentiles(np.array([r.queue_wait for r in records])),
+                "input_tokens": int(sum(r.input_tokens for r in records)),
+                "output_tokens": int(sum(r.output_tokens for r in records)),
+                "retries": int(sum(r.retries for r in records)),
+                "cache_hit_rate": sum(cache_lookups) / len(cache_lookups) if cache_lookups else None,
+                "parse_failure_rate": sum(r.parse_failure for r in records) / len(records),
+                "repairs": sum("repair" in r.extra for r in records),
+                "escalations": sum("escalations" in r.extra for r in records),
+                "models": dict(Counter(r.model for r in records if r.model)),
+                "prompt_tokens_saved": int(sum(r.extra.get("prompt_tokens_saved", 0) for r in records)),
+                "errors": sum(r.error is not None for r in records),
+            }
+        return summary
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+
+def _percentiles(values: np.ndarray) -> Optional[Dict[str, float]]:
+    if values.size == 0:
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4)}
+
+
+# Registre global du processus
+metrics = MetricsRegistry(window=METRICS_WINDOW, trace_file=TRACE_FILE or None)
+
+
+# --- Mesure d'un appel ---
+@contextmanager
+def track_call(kind: str, name: str, model: Optional[str] = None) -> Iterator[CallRecord]:
+    """
+    Mesure la durée d'un bloc et l'enregistre dans le registre global, qu'il réussisse ou non.
+    Les échecs de parsing de la sortie du modèle sont signalés dans `parse_failure`.
+    """
+    record = CallRecord(kind=kind, name=name, model=model)
+    start = time.perf_counter()
+    try:
+        yield record
+    except (OutputParserException, ValidationError) as exc:
+        record.parse_failure = True
+        record.error = f"{type(exc).__name__}: {exc}"
+        raise
+    except Exception as exc:
+        record.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        record.wall_time = time.perf_counter() - start
+        metrics.record(record)
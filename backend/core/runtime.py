@@ -0,0 +1,56 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, Optional, TypeVar
+
+from langchain_core.tools import StructuredTool
+
+T = TypeVar("T")
+
+_portal_loop: Optional[asyncio.AbstractEventLoop] = None
+_portal_lock = threading.Lock()
+
+
+# --- Boucle d'événements partagée par l'API synchrone ---
+def _get_portal_loop() -> asyncio.AbstractEventLoop:
+    """
+    Démarre (une seule fois) une boucle asyncio dans un thread dédié.
+    Tous les appels synchrones y exécutent le chemin async, ce qui garde les clients
+    async (gRPC) attachés à une seule boucle au lieu d'en recréer une par appel.
+    """
+    global _portal_loop
+    with _portal_lock:
+        if _portal_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="backend-async-portal", daemon=True)
+            thread.start()
+            _portal_loop = loop
+        return _portal_loop
+
+
+async def _run_in_context(coro: Coroutine[Any, Any, T], ctx: contextvars.Context) -> T:
+    return await asyncio.get_running_loop().create_task(coro, context=ctx)
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Exécute une coroutine depuis du code synchrone et retourne son résultat.
+    Le contexte (callbacks LangChain, traces) de l'appelant est propagé à la coroutine.
+    """
+    loop = _get_portal_loop()
+    ctx = contextvars.copy_context()
+    return asyncio.run_coroutine_threadsafe(_run_in_context(coro, ctx), loop).result()
+
+
+# --- Outils LangChain à double API (sync/async) ---
+def async_tool(coroutine: Callable[..., Awaitable[Any]]) -> StructuredTool:
+    """
+    Équivalent de `@tool` pour une fonction async : l'outil expose `ainvoke` nativement
+    et `invoke` comme simple enveloppe synchrone autour du chemin async.
+    """
+    @functools.wraps(coroutine)
+    def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+        return run_sync(coroutine(*args, **kwargs))
+
+    return StructuredTool.from_function(func=sync_wrapper, coroutine=coroutine)
@@ -0,0 +1,72 @@
+import json
+import re
+from functools import lru_cache
+from typing import Any, Optional, Type
+
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, ValidationError
+
+from backend.core.text import estimate_tokens
+
+# Consigne ajoutée au prompt lorsque la sortie structurée native n'est pas utilisée
+FORMAT_SUFFIX = """
+        Retournez la sortie strictement au format JSON conforme à ces instructions :
+        {format_instructions}
+        """
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+# --- Consignes de format et coût en tokens ---
+@lru_cache(maxsize=None)
+def format_instructions(schema: Type[BaseModel]) -> str:
+    return PydanticOutputParser(pydantic_object=schema).get_format_instructions()
+
+
+@lru_cache(maxsize=None)
+def format_tokens_saved(schema: Type[BaseModel]) -> int:
+    """
+    Tokens de prompt (estimés) économisés par appel en sortie structurée native : consignes de format
+    retirées du prompt, moins la déclaration de fonction envoyée à la place.
+    """
+    declaration = json.dumps(convert_to_openai_tool(schema)["function"], ensure_ascii=False, separators=(",", ":"))
+    return estimate_tokens(format_instructions(schema)) - estimate_tokens(declaration)
+
+
+# --- Réparation locale des sorties mal formées ---
+def raw_output_text(message: Optional[BaseMessage]) -> str:
+    """
+    Texte brut d'une réponse du modèle : arguments du premier tool_call (sortie native) ou contenu texte.
+    """
+    if message is None:
+        return ""
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        return json.dumps(tool_calls[0].get("args", {}), ensure_ascii=False)
+    content = message.content
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content)
+
+
+def repair_json(text: str, schema: Type[BaseModel]) -> Optional[BaseModel]:
+    """
+    Tente de corriger sans appel au modèle les défauts courants d'une sortie JSON (balises ```json,
+    texte autour de l'objet, virgules finales) puis de la valider. Retourne None en cas d'échec.
+    """
+    candidate = _FENCE_RE.sub("", text.strip())
+    start, end = candidate.find("{"), candidate.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    candidate = _TRAILING_COMMA_RE.sub(r"\1", candidate[start:end + 1])
+    try:
+        return schema.model_validate(json.loads(candidate))
+    except (ValueError, ValidationError):
+        return None
+
+
+def describe_error(error: Any) -> str:
+    return f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error or "sortie vide")
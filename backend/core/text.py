@@ -0,0 +1,116 @@
+import math
+import re
+import unicodedata
+from typing import Iterable, List
+
+# Segments entre guillemets : « ... », “ ... ” ou "..."
+_QUOTED_RE = re.compile(r"«\s*(.+?)\s*»|“\s*(.+?)\s*”|\"\s*(.+?)\s*\"", re.DOTALL)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_LIST_MARKERS = " \t-•*"
+
+# Mots de liaison tolérés autour des citations d'une liste de feedbacks (« a », et « b ». Merci)
+FRAMING_WORDS = {"et", "ou", "puis", "enfin", "merci", "and", "or", "then", "thanks"}
+# Nombre maximal de mots d'un libellé entre deux citations (« Ticket 2 : »)
+MAX_LABEL_WORDS = 4
+
+
+# --- Estimation de tokens ---
+def estimate_tokens(text: str) -> int:
+    """
+    Estimation rapide du nombre de tokens (≈ 4 caractères par token), sans appel réseau.
+    """
+    return math.ceil(len(text) / 4) if text else 0
+
+
+# --- Normalisation ---
+def normalize_text(text: str) -> str:
+    """
+    Minuscules, accents retirés, ponctuation remplacée par des espaces, espaces fusionnés.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return text.strip()
+
+
+# --- Découpage d'un texte de feedbacks ---
+def quoted_segments(text: str) -> List[str]:
+    """
+    Tous les segments entre guillemets du texte, dans l'ordre.
+    """
+    segments = (next(g for g in match.groups() if g).strip() for match in _QUOTED_RE.finditer(text))
+    return [segment for segment in segments if segment]
+
+
+def _is_framing(gap: str, intro: bool) -> bool:
+    # Texte hors guillemets qui ne fait qu'encadrer les citations : ponctuation, liaisons,
+    # consigne d'introduction ou libellé court terminés par un deux-points, en une seule phrase
+    words = normalize_text(gap).split()
+    if all(word in FRAMING_WORDS for word in words):
+        return True
+    text = gap.strip().lstrip(".,;!?" + _LIST_MARKERS + "\n")
+    if not text.endswith(":") or len(_SENTENCE_RE.split(text)) > 1:
+        return False
+    return intro or len(words) <= MAX_LABEL_WORDS
+
+
+def quoted_feedbacks(text: str, with_instruction: bool = False) -> List[str]:
+    """
+    Segments entre guillemets si le texte n'est qu'une liste de citations (le texte hors guillemets
+    ne faisant que les encadrer, voir `_is_framing`), sinon liste vide : une citation au milieu
+    d'un feedback (le bouton "Exporter" est grisé) ne le remplace pas.
+    Avec `with_instruction`, le texte qui précède la première citation peut être une consigne quelconque.
+    """
+    matches = list(_QUOTED_RE.finditer(text))
+    if not matches:
+        return []
+    gaps = [text[a.end():b.start()] for a, b in zip(matches, matches[1:])] + [text[matches[-1].end():]]
+    intro = with_instruction or _is_framing(text[:matches[0].start()], intro=True)
+    if not intro or not all(_is_framing(gap, intro=False) for gap in gaps):
+        return []
+    return quoted_segments(text)
+
+
+def split_feedbacks(feedback_text: str) -> List[str]:
+    """
+    Découpe un texte brut en feedbacks individuels, en conservant leur formulation exacte :
+    citations si le texte n'est qu'une liste de citations, sinon lignes non vides, sinon phrases.
+    Aucun texte n'est perdu, hors consigne et libellés qui encadrent une liste de citations.
+    """
+    quoted = quoted_feedbacks(feedback_text)
+    if quoted:
+        return quoted
+
+    lines = [line.strip(_LIST_MARKERS) for line in feedback_text.splitlines()]
+    lines = [line for line in lines if line]
+    if len(lines) > 1:
+        return lines
+
+    return [s.strip() for s in _SENTENCE_RE.split(feedback_text) if s.strip()]
+
+
+def strip_quoted(text: str) -> str:
+    """
+    Texte privé de ses segments entre guillemets (ex. la consigne qui accompagne des feedbacks cités).
+    """
+    return _QUOTED_RE.sub(" ", text)
+
+
+def batch_by_tokens(items: Iterable[str], max_tokens: int) -> List[List[str]]:
+    """
+    Regroupe des éléments en lots dont la taille estimée ne dépasse pas `max_tokens`
+    (un élément plus gros que le budget forme un lot à lui seul).
+    """
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for item in items:
+        tokens = estimate_tokens(item) + 1
+        if current and current_tokens + tokens > max_tokens:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
@@ -1,21 +1,90 @@
-from typing import List
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
 
-from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 
-from backend.agent.agent_main import agent, AgentState
+from backend.agent.agent_main import SUPERVISOR_TAG, AgentState, get_agent
+from backend.core.concurrency import llm_limiter
+from backend.core.config import PIPELINE_TOP_N
+from backend.core.metrics import metrics
+
+# --- Exécution d'un tour en streaming ---
+def _chunk_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    # Contenu multimodal : on ne garde que les parties texte
+    return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+async def stream_turn(state: AgentState, config: Optional[Dict[str, Any]] = None) -> AgentState:
+    """
+    Exécute un tour de l'agent via `agent.astream_events` : les tokens du supervisor sont affichés
+    au fil de leur génération, ainsi que le début et la fin de chaque appel d'outil.
+    Retourne l'état final du graphe.
+    """
+    final_state: AgentState = state
+    tool_starts: Dict[str, float] = {}
+
+    async for event in get_agent().astream_events(state, config=config, version="v2"):
+        kind = event["event"]
+
+        if kind == "on_chat_model_stream" and SUPERVISOR_TAG in event.get("tags", []):
+            text = _chunk_text(event["data"]["chunk"].content)
+            if text:
+                print(text, end="", flush=True)
+
+        elif kind == "on_tool_start":
+            tool_starts[event["run_id"]] = time.perf_counter()
+            print(f"\n[{event['name']}] en cours…", flush=True)
+
+        elif kind == "on_tool_end":
+            elapsed = time.perf_counter() - tool_starts.pop(event["run_id"], time.perf_counter())
+            print(f"[{event['name']}] terminé en {elapsed:.1f} s", flush=True)
+
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            final_state = event["data"]["output"]
+
+    print()
+    return final_state
+
+
+# --- Mode pipeline : rafraîchissement complet du backlog sans supervisor ---
+async def pipeline_turn(state: AgentState, feedback_text: str, session_id: Optional[str] = None) -> AgentState:
+    """
+    Analyse, priorise et rédige les user stories des `PIPELINE_TOP_N` premières fonctionnalités,
+    puis affiche le classement et les stories. Les résultats sont fusionnés dans l'état de la session.
+    """
+    # Import différé : le pipeline (et LangGraph) ne sont chargés qu'à la première utilisation
+    from backend.agent.pipeline import run_pipeline
+
+    if not feedback_text:
+        print("Usage : /pipeline <feedbacks>")
+        return state
+    results = await run_pipeline(feedback_text, state=state, session_id=session_id)
+    for rank, item in enumerate(results["prioritization_result"]["features"], start=1):
+        score = f" ({item['final_score']})" if item.get("final_score") is not None else ""
+        print(f"{rank}. {item['feature_name']}{score}")
+    for outcome in results.get("user_stories", {}).get("stories", []):
+        story = outcome.get("story")
+        print(f"\n- {story['title']} : {story['story']}" if story else f"\n- {outcome['feature']} : erreur ({outcome['error']})")
+    return {**state, **results}
 
-# --- Chargement des variables d'environnement (.env) ---
-load_dotenv()
 
 # --- Boucle REPL principale pour l'agent Product Owner ---
-def run_cli() -> None:
+async def arun_cli(stream: bool = True) -> None:
     """
-    Boucle REPL : envoie l'entrée utilisateur à l'agent et affiche sa réponse.
+    Boucle REPL asynchrone : envoie l'entrée utilisateur à l'agent et affiche sa réponse,
+    en streaming (par défaut) ou en une fois à la fin du tour (`agent.ainvoke`).
     """
-    print("Product‑Owner Agent CLI – Ctrl‑C pour quitter.\n")
+    print(f"Product‑Owner Agent CLI – Ctrl‑C pour quitter, /metrics pour les mesures de performance, /pipeline <feedbacks> pour analyser, prioriser et rédiger les {PIPELINE_TOP_N} premières user stories.\n")
 
     state: AgentState = {"messages": []}  # mémoire en RAM
+    # Identifiant de session : provenance des résultats ajoutés à l'historique local
+    config = {"configurable": {"thread_id": uuid.uuid4().hex}}
     last_len = 0  # pour afficher seulement les nouveaux messages AI
 
     try:
@@ -25,11 +94,26 @@ def run_cli() -> None:
             if not user_input:
                 continue  # ignore les lignes vides
 
+            if user_input == "/metrics":
+                # Résumé p50/p95/p99 des appels supervisor, outils et chaînes LLM
+                print(json.dumps({**metrics.summary(), "llm_limiter": llm_limiter.stats()}, ensure_ascii=False, indent=2))
+                continue
+
+            if user_input.startswith("/pipeline"):
+                # Analyse → priorisation → user stories, sans appel au supervisor
+                state = await pipeline_turn(state, user_input[len("/pipeline"):].strip(), config["configurable"]["thread_id"])
+                continue
+
             # 1. Ajoute le message utilisateur
             state["messages"].append(HumanMessage(content=user_input))
 
-            # 2. Appelle l'agent
-            state = agent.invoke(state)
+            # 2. Appelle l'agent (les réponses sont affichées au fil de l'eau en streaming)
+            if stream:
+                state = await stream_turn(state, config)
+                last_len = len(state["messages"])
+                continue
+
+            state = await get_agent().ainvoke(state, config=config)
 
             # 3. Affiche les nouvelles réponses AI
             new_msgs: List[BaseMessage] = state["messages"][last_len:]
@@ -45,5 +129,18 @@ def run_cli() -> None:
     print("\nSession terminée.")
 
 
+def run_cli(stream: bool = True) -> None:
+    """
+    Boucle REPL : envoie l'entrée utilisateur à l'agent et affiche sa réponse.
+    """
+    try:
+        asyncio.run(arun_cli(stream=stream))
+    except KeyboardInterrupt:
+        print("\nSession terminée.")
+
+
 if __name__ == "__main__":
-    run_cli()
+    parser = argparse.ArgumentParser(description="Product‑Owner Agent CLI")
+    parser.add_argument("--no-stream", action="store_true", help="Affiche la réponse en une fois à la fin du tour.")
+    args = parser.parse_args()
+    run_cli(stream=not args.no_stream)
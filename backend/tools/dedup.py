@@ -0,0 +1,166 @@
+import re
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from backend.core.text import normalize_text
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_COUNT_SUFFIX_RE = re.compile(r"\s*\(x\d+\)\s*$")
+
+
+# --- Groupe de feedbacks quasi identiques ---
+@dataclass
+class DuplicateCluster:
+    """
+    Groupe de feedbacks quasi identiques : un représentant (le premier rencontré) et tous ses membres.
+    """
+    representative: str
+    members: List[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.members)
+
+    def prompt_line(self) -> str:
+        """
+        Ligne envoyée au modèle : le représentant suivi du nombre d'occurrences.
+        """
+        return self.representative if self.count == 1 else f"{self.representative} (x{self.count})"
+
+
+# --- MinHash ---
+def shingles(text: str, k: int = 5) -> Set[int]:
+    """
+    Shingles de k caractères du texte normalisé, hachés en entiers 32 bits (crc32, stable entre processus).
+    """
+    normalized = normalize_text(text)
+    if len(normalized) <= k:
+        return {zlib.crc32(normalized.encode("utf-8"))}
+    return {zlib.crc32(normalized[i:i + k].encode("utf-8")) for i in range(len(normalized) - k + 1)}
+
+
+class MinHasher:
+    """
+    Signatures MinHash vectorisées : `num_perm` permutations (a*x + b) mod p appliquées à tous les shingles d'un coup.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1) -> None:
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, shingle_set: Set[int]) -> np.ndarray:
+        x = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))[np.newaxis, :]
+        return ((self._a * x + self._b) % _MERSENNE_PRIME).min(axis=1)
+
+
+# --- Regroupement LSH des quasi-doublons ---
+def cluster_near_duplicates(
+    feedbacks: Sequence[str],
+    threshold: float = 0.8,
+    num_perm: int = 64,
+    bands: int = 16,
+) -> List[DuplicateCluster]:
+    """
+    Regroupe les feedbacks quasi identiques (similarité de Jaccard estimée >= `threshold`).
+    Les paires candidates sont trouvées par LSH (signature découpée en `bands` bandes) puis vérifiées
+    sur la signature complète ; l'ordre de première apparition est conservé.
+    """
+    if not feedbacks:
+        return []
+
+    hasher = MinHasher(num_perm=num_perm)
+    signatures = np.stack([hasher.signature(shingles(text)) for text in feedbacks])
+    rows = num_perm // bands
+
+    # Union-find sur les indices de feedbacks
+    parent = list(range(len(feedbacks)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = defaultdict(list)
+        band_values = signatures[:, band * rows:(band + 1) * rows]
+        for i, values in enumerate(band_values):
+            buckets[values.tobytes()].append(i)
+        for candidates in buckets.values():
+            first = candidates[0]
+            for other in candidates[1:]:
+                root_a, root_b = find(first), find(other)
+                if root_a == root_b:
+                    continue
+                similarity = float(np.mean(signatures[first] == signatures[other]))
+                if similarity >= threshold:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters: Dict[int, DuplicateCluster] = {}
+    for i, text in enumerate(feedbacks):
+        root = find(i)
+        if root not in clusters:
+            clusters[root] = DuplicateCluster(representative=feedbacks[root])
+        clusters[root].members.append(text)
+    return list(clusters.values())
+
+
+def _match_cluster(
+    source: str,
+    clusters: List[DuplicateCluster],
+    lookup: Dict[str, DuplicateCluster],
+    min_overlap: float,
+) -> Optional[DuplicateCluster]:
+    """
+    Groupe correspondant à un extrait renvoyé par le modèle : égalité du texte normalisé, sinon inclusion
+    (extrait partiel ou membre cité dans un extrait plus long), sinon part des mots de l'extrait présents
+    dans un membre au moins égale à `min_overlap`. Le groupe le plus proche l'emporte.
+    """
+    normalized = normalize_text(_COUNT_SUFFIX_RE.sub("", source))
+    if not normalized:
+        return None
+    if normalized in lookup:
+        return lookup[normalized]
+
+    words = set(normalized.split())
+    best: Optional[DuplicateCluster] = None
+    best_score = 0.0
+    for cluster in clusters:
+        for member in cluster.members:
+            member_text = normalize_text(member)
+            if not member_text:
+                continue
+            if f" {normalized} " in f" {member_text} " or f" {member_text} " in f" {normalized} ":
+                score = 1.0
+            else:
+                score = len(words & set(member_text.split())) / len(words)
+            if score > best_score:
+                best, best_score = cluster, score
+    return best if best_score >= min_overlap else None
+
+
+def expand_sources(sources: List[str], clusters: List[DuplicateCluster], min_overlap: float = 0.8) -> List[str]:
+    """
+    Remplace chaque extrait renvoyé par le modèle par tous les feedbacks originaux de son groupe,
+    afin que chaque phrase d'origine apparaisse dans `source_feedbacks`. Le modèle pouvant citer
+    un extrait partiel ou légèrement retouché, la correspondance se fait par inclusion ou recouvrement de mots.
+    Les extraits qui ne correspondent à aucun groupe sont conservés tels quels.
+    """
+    lookup: Dict[str, DuplicateCluster] = {}
+    for cluster in clusters:
+        for member in cluster.members:
+            lookup.setdefault(normalize_text(member), cluster)
+
+    expanded: List[str] = []
+    for source in sources:
+        cluster = _match_cluster(source, clusters, lookup, min_overlap)
+        for text in (cluster.members if cluster else [source]):
+            if text not in expanded:
+                expanded.append(text)
+    return expanded
@@ -0,0 +1,102 @@
+import hashlib
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from backend.core.text import normalize_text
+from backend.tools.feedback_analyzer import AnalysisResult, Feature
+
+FeatureKey = Tuple[str, str]
+
+
+# --- Empreintes ---
+def sentence_fingerprint(sentence: str) -> str:
+    """
+    Empreinte d'une phrase de feedback, insensible à la casse, aux accents et à la ponctuation.
+    """
+    return hashlib.sha1(normalize_text(sentence).encode("utf-8")).hexdigest()[:16]
+
+
+def feature_fingerprint(feature: Feature) -> FeatureKey:
+    """
+    Empreinte d'une fonctionnalité : mots de son nom normalisé, sans ordre ni doublon, et catégorie.
+    'Export PDF' et 'PDF export' ont la même empreinte.
+    """
+    return " ".join(sorted(set(normalize_text(feature.name).split()))), feature.category.strip().lower()
+
+
+# --- Index incrémental des fonctionnalités ---
+class FeatureIndex:
+    """
+    Fonctionnalités extraites au fil de la session, indexées par nom normalisé et par empreinte,
+    et empreintes des phrases de feedback déjà analysées. Une mise à jour n'envoie au modèle que
+    les phrases jamais vues et fusionne leurs `source_feedbacks` dans les fonctionnalités existantes :
+    son coût dépend de la taille des nouveaux feedbacks, pas de celle du corpus.
+    """
+
+    def __init__(self, features: Iterable[Feature] = (), seen: Iterable[str] = ()) -> None:
+        self._features: Dict[FeatureKey, Feature] = {}
+        self._by_fingerprint: Dict[FeatureKey, FeatureKey] = {}
+        self._seen: Set[str] = set(seen)
+        for feature in features:
+            self._merge(feature)
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def unseen(self, sentences: Iterable[str]) -> List[str]:
+        """
+        Phrases jamais analysées (les répétitions au sein de `sentences` ne sont gardées qu'une fois).
+        """
+        fresh: List[str] = []
+        fingerprints: Set[str] = set()
+        for sentence in sentences:
+            fingerprint = sentence_fingerprint(sentence)
+            if fingerprint not in self._seen and fingerprint not in fingerprints:
+                fingerprints.add(fingerprint)
+                fresh.append(sentence)
+        return fresh
+
+    def add(self, result: AnalysisResult, analyzed: Iterable[str]) -> None:
+        """
+        Fusionne le résultat de l'analyse de `analyzed` dans l'index et marque ces phrases comme vues.
+        """
+        for feature in result.features:
+            self._merge(feature)
+        self._seen.update(sentence_fingerprint(sentence) for sentence in analyzed)
+
+    def _merge(self, feature: Feature) -> None:
+        key = (normalize_text(feature.name), feature.category.strip().lower())
+        fingerprint = feature_fingerprint(feature)
+        existing_key = key if key in self._features else self._by_fingerprint.get(fingerprint)
+        if existing_key is None:
+            self._features[key] = feature.model_copy(deep=True)
+            self._by_fingerprint.setdefault(fingerprint, key)
+            return
+
+        existing = self._features[existing_key]
+        for source in feature.source_feedbacks:
+            if source not in existing.source_feedbacks:
+                existing.source_feedbacks.append(source)
+        if len(feature.description) > len(existing.description):
+            existing.description = feature.description
+
+    def result(self) -> AnalysisResult:
+        """
+        Vue complète de l'analyse de la session.
+        """
+        return AnalysisResult(features=[feature.model_copy(deep=True) for feature in self._features.values()])
+
+    # --- Sérialisation (état LangGraph, checkpointer) ---
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "features": [feature.model_dump() for feature in self._features.values()],
+            "seen": sorted(self._seen),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Mapping[str, Any]]) -> "FeatureIndex":
+        if not data:
+            return cls()
+        return cls(
+            features=[Feature.model_validate(feature) for feature in data.get("features", [])],
+            seen=data.get("seen", []),
+        )
@@ -0,0 +1,263 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Literal, Mapping, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from backend.core.config import FEATURE_STORE_DB, FEATURE_STORE_ENABLED
+from backend.core.runtime import async_tool
+from backend.core.text import normalize_text
+
+RecordKind = Literal["feature", "prioritized_feature", "user_story"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    body TEXT NOT NULL,
+    data TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    session_id TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, session_id, key)
+);
+CREATE INDEX IF NOT EXISTS records_created_at ON records (created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+    name, body, content='records', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS records_ai AFTER INSERT ON records BEGIN
+    INSERT INTO records_fts (rowid, name, body) VALUES (new.id, new.name, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS records_ad AFTER DELETE ON records BEGIN
+    INSERT INTO records_fts (records_fts, rowid, name, body) VALUES ('delete', old.id, old.name, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS records_au AFTER UPDATE ON records BEGIN
+    INSERT INTO records_fts (records_fts, rowid, name, body) VALUES ('delete', old.id, old.name, old.body);
+    INSERT INTO records_fts (rowid, name, body) VALUES (new.id, new.name, new.body);
+END;
+"""
+
+# Upsert : une fonctionnalité revue dans la même session met à jour sa ligne et garde sa date de première apparition
+_UPSERT = """
+INSERT INTO records (kind, key, name, body, data, tool, session_id, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (kind, session_id, key) DO UPDATE SET
+    name = excluded.name, body = excluded.body, data = excluded.data,
+    tool = excluded.tool, updated_at = excluded.updated_at
+"""
+
+Row = Tuple[str, str, str, str, Dict[str, Any]]  # (type, clé, nom, texte indexé, données)
+
+
+# --- Schémas de données ---
+class StoredRecord(BaseModel):
+    """
+    Résultat d'outil enregistré, avec sa provenance (outil, session) et ses dates.
+    """
+    kind: str = Field(description="Type d'enregistrement : 'feature', 'prioritized_feature' ou 'user_story'.")
+    name: str = Field(description="Nom de la fonctionnalité ou titre de la user story.")
+    snippet: str = Field(description="Extrait du texte correspondant à la recherche, termes trouvés entre crochets.")
+    tool: str = Field(description="Outil qui a produit l'enregistrement.")
+    session_id: str = Field(description="Session d'origine (vide si inconnue).")
+    created_at: str = Field(description="Date de première apparition (ISO 8601).")
+    updated_at: str = Field(description="Date de dernière mise à jour (ISO 8601).")
+    data: Dict[str, Any] = Field(description="Résultat complet de l'outil pour cet enregistrement.")
+
+
+class StoreSearchResult(BaseModel):
+    """
+    Enregistrements trouvés, du plus pertinent au moins pertinent.
+    """
+    query: str = Field(description="Recherche effectuée.")
+    records: List[StoredRecord] = Field(description="Enregistrements correspondants.", default_factory=list)
+
+
+# --- Conversion des résultats d'outils en enregistrements ---
+def _key(*parts: Optional[str]) -> str:
+    return "|".join(normalize_text(part or "") for part in parts)
+
+
+def _story_row(story: Mapping[str, Any], feature: Optional[str] = None) -> Row:
+    body = "\n".join([story.get("story", ""), *story.get("acceptance_criteria", []), feature or ""])
+    data = {**story, "feature": feature} if feature else dict(story)
+    return "user_story", _key(feature or story["title"]), story["title"], body, data
+
+
+def records_from_tool_result(tool_name: str, result: Mapping[str, Any]) -> List[Row]:
+    """
+    Enregistrements à conserver pour le résultat sérialisé d'un outil (aucun pour les autres outils).
+    """
+    if tool_name == "analyze_feedback_tool":
+        return [
+            ("feature", _key(f["name"], f.get("category")), f["name"], "\n".join([f["description"], *f.get("source_feedbacks", [])]), dict(f))
+            for f in result.get("features", [])
+        ]
+    if tool_name == "prioritize_features_tool":
+        return [
+            (
+                "prioritized_feature",
+                _key(f["feature_name"]),
+                f["feature_name"],
+                "\n".join(part for part in (f.get("score"), f.get("qualitative_rank"), f.get("justification")) if part),
+                dict(f),
+            )
+            for f in result.get("features", [])
+        ]
+    if tool_name == "write_user_story_tool" and result.get("title"):
+        return [_story_row(result)]
+    if tool_name == "write_user_stories_tool":
+        return [_story_row(o["story"], o["feature"]) for o in result.get("stories", []) if o.get("story")]
+    return []
+
+
+def fts_query(text: str) -> str:
+    """
+    Requête FTS5 tolérante : chaque mot (sans accents, pluriel simple retiré) est cherché comme préfixe,
+    et un enregistrement est retenu dès qu'un mot correspond (classement BM25).
+    """
+    terms = []
+    for word in normalize_text(text).split():
+        if len(word) < 3:
+            continue
+        if len(word) > 4 and word[-1] in "sx":
+            word = word[:-1]
+        terms.append(f'"{word}"*')
+    return " OR ".join(dict.fromkeys(terms))
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+
+# --- Historique local ---
+class FeatureStore:
+    """
+    Historique SQLite des fonctionnalités extraites, priorisations et user stories de toutes les sessions,
+    indexé en plein texte (FTS5) : une recherche répond en quelques millisecondes, sans appel au modèle.
+    Un même élément revu dans une session met à jour sa ligne ; d'une session à l'autre, les lignes s'ajoutent.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            if not self._initialized:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path)
+            try:
+                if not self._initialized:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.executescript(_SCHEMA)
+                    self._initialized = True
+                with connection:
+                    yield connection
+            finally:
+                connection.close()
+
+    def save(self, tool_name: str, result: Mapping[str, Any], session_id: Optional[str] = None) -> int:
+        """
+        Enregistre le résultat sérialisé d'un outil ; retourne le nombre d'enregistrements écrits.
+        """
+        rows = records_from_tool_result(tool_name, result)
+        if not rows:
+            return 0
+        now = time.time()
+        with self._connect() as connection:
+            connection.executemany(_UPSERT, [
+                (kind, key, name, body, json.dumps(data, ensure_ascii=False), tool_name, session_id or "", now, now)
+                for kind, key, name, body, data in rows
+            ])
+        return len(rows)
+
+    def search(
+        self,
+        query: str,
+        kind: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 10,
+    ) -> StoreSearchResult:
+        """
+        Recherche plein texte, filtrée par type d'enregistrement et date de première apparition (timestamp).
+        """
+        match = fts_query(query)
+        if not match:
+            return StoreSearchResult(query=query)
+        sql = (
+            "SELECT r.kind, r.name, snippet(records_fts, 1, '[', ']', '…', 12), r.tool, r.session_id,"
+            " r.created_at, r.updated_at, r.data"
+            " FROM records_fts JOIN records r ON r.id = records_fts.rowid WHERE records_fts MATCH ?"
+        )
+        params: List[Any] = [match]
+        if kind is not None:
+            sql += " AND r.kind = ?"
+            params.append(kind)
+        if since is not None:
+            sql += " AND r.created_at >= ?"
+            params.append(since)
+        sql += " ORDER BY bm25(records_fts, 5.0, 1.0) LIMIT ?"
+        params.append(limit)
+        with self._connect() as connection:
+            rows = connection.execute(sql, params).fetchall()
+        return StoreSearchResult(query=query, records=[
+            StoredRecord(
+                kind=kind, name=name, snippet=snippet, tool=tool, session_id=session_id,
+                created_at=_iso(created_at), updated_at=_iso(updated_at), data=json.loads(data),
+            )
+            for kind, name, snippet, tool, session_id, created_at, updated_at, data in rows
+        ])
+
+
+# Historique global du processus
+feature_store = FeatureStore(FEATURE_STORE_DB)
+
+
+def session_of(config: Optional[Mapping[str, Any]]) -> Optional[str]:
+    """
+    Identifiant de session d'un appel LangGraph (`thread_id`), utilisé comme provenance.
+    """
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+async def record_tool_result(tool_name: str, result: Mapping[str, Any], session_id: Optional[str] = None) -> None:
+    """
+    Ajoute le résultat d'un outil à l'historique s'il est activé, dans un thread pour ne pas bloquer la boucle asyncio.
+    Un échec d'écriture (base SQLite ou système de fichiers) n'interrompt pas le tour.
+    """
+    if not FEATURE_STORE_ENABLED or "error" in result:
+        return
+    try:
+        await asyncio.to_thread(feature_store.save, tool_name, result, session_id)
+    except (sqlite3.Error, OSError):
+        pass
+
+
+# --- Outil de recherche dans l'historique ---
+@async_tool
+async def search_feature_store_tool(
+    query: str,
+    kind: Optional[RecordKind] = None,
+    since_days: Optional[int] = None,
+    limit: int = 10,
+) -> StoreSearchResult:
+    """
+    Recherche par mots-clés dans l'historique des fonctionnalités extraites, priorisations et user stories
+    de toutes les sessions précédentes (ex. « export » pour « qu'ont dit les utilisateurs sur les exports le mois dernier ? »,
+    avec since_days=31). Répond sans nouvelle analyse : à utiliser avant de ré-analyser des feedbacks déjà traités.
+    """
+    # 1. Recherche plein texte locale, sans appel au modèle (dans un thread : SQLite est bloquant)
+    since = time.time() - since_days * 86400 if since_days else None
+    result = await asyncio.to_thread(feature_store.search, query, kind=kind, since=since, limit=limit)
+    return result
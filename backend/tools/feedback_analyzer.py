@@ -1,11 +1,22 @@
-from typing import List
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_core.tools import tool
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field
 
-from backend.core.config import GEMINI_API_KEY, MODEL_NAME
+from backend.core.chains import ChainSpec, ainvoke_chain
+from backend.core.config import (
+    ANALYSIS_CHUNK_TOKENS,
+    ANALYSIS_MAX_CONCURRENCY,
+    FEEDBACK_DEDUP_ENABLED,
+    FEEDBACK_DEDUP_THRESHOLD,
+    GEMINI_API_KEY,
+    PATTERN_CLUSTERING_MIN_FEEDBACKS,
+    PATTERN_MAX_CLUSTERS,
+    PATTERN_SAMPLES_PER_CLUSTER,
+)
+from backend.core.runtime import async_tool
+from backend.core.text import batch_by_tokens, estimate_tokens, normalize_text, split_feedbacks
+from backend.tools.dedup import DuplicateCluster, cluster_near_duplicates, expand_sources
+from backend.tools.pattern_clustering import cluster_feedbacks, default_cluster_count
 
 
 # --- Schémas de données ---
@@ -26,34 +37,41 @@ class AnalysisResult(BaseModel):
     features: List[Feature] = Field(description="Liste des fonctionnalités extraites du texte de feedback.", default_factory=list)
 
 
+class PatternCluster(BaseModel):
+    """
+    Groupe de feedbacks regroupés localement autour d'un même thème.
+    """
+    label: str = Field(description="Libellé court du thème.")
+    size: int = Field(description="Nombre de feedbacks du groupe.")
+    examples: List[str] = Field(description="Feedbacks représentatifs du groupe.", default_factory=list)
+
+
+class RecurrentPatterns(BaseModel):
+    """
+    Patterns récurrents identifiés par le modèle sur une petite liste de feedbacks.
+    """
+    patterns: List[str] = Field(description="Liste des patterns ou thèmes récurrents identifiés dans les feedbacks.")
+
+
 class PatternAnalysisResult(BaseModel):
     """
     Résultat de l'analyse des patterns récurrents dans les feedbacks.
     """
     patterns: List[str] = Field(description="Liste des patterns ou thèmes récurrents identifiés dans les feedbacks.")
+    clusters: List[PatternCluster] = Field(description="Groupes calculés localement avec leur taille (gros volumes uniquement).", default_factory=list)
 
 
-# --- Outils d'analyse de feedback ---
-@tool
-def analyze_feedback_tool(feedback_text: str) -> AnalysisResult:
+class ClusterLabels(BaseModel):
     """
-    Analyse un ou plusieurs feedbacks utilisateurs (email, commentaire, etc.) transmis ensemble, afin d'extraire toutes les demandes de fonctionnalités, bugs ou commentaires de façon structurée.
-    Utilise cet outil pour une analyse détaillée de chaque feedback, même si plusieurs feedbacks sont fournis en une seule fois.
-    Ne pas utiliser pour détecter des patterns globaux ou des tendances récurrentes : pour cela, utiliser identify_recurrent_patterns_tool.
+    Libellés attribués par le modèle aux groupes de feedbacks, dans l'ordre des groupes.
     """
-    # 1. Initialisation du parser de sortie
-    output_parser = PydanticOutputParser(pydantic_object=AnalysisResult)
+    labels: List[str] = Field(description="Un libellé court et explicite par groupe, dans l'ordre des groupes fournis.")
 
-    # 2. Initialisation du modèle LLM Gemini
-    llm = ChatGoogleGenerativeAI(
-        model=MODEL_NAME,
-        temperature=0,
-        google_api_key=GEMINI_API_KEY
-    )
 
-    # 3. Création du prompt template
-    prompt = PromptTemplate(
-        template="""
+# --- Chaînes LLM des outils ---
+ANALYSIS_CHAIN = ChainSpec(
+    name="analyze_feedback",
+    template="""
         Vous êtes un assistant expert pour un Product Owner. Votre rôle est d'analyser le feedback des utilisateurs
         et d'en extraire des demandes de fonctionnalités claires et exploitables.
 
@@ -65,62 +83,171 @@ def analyze_feedback_tool(feedback_text: str) -> AnalysisResult:
         Identifiez chaque demande de fonctionnalité distincte. Pour chaque demande, fournissez un nom, une description,
         la catégorie ("bug", "feature" ou "comment"), et les extraits exacts du feedback qui la concernent. Ne regroupez que les feedbacks qui parlent
         EXACTEMENT de la même fonctionnalité. Si aucune fonctionnalité n'est mentionnée, retournez une liste vide.
-
-        Retournez la sortie strictement au format JSON conforme à ces instructions :
-        {format_instructions}
+        Un suffixe "(xN)" indique que ce feedback a été reçu N fois : ne le recopiez pas dans les extraits.
         """,
-        input_variables=["feedback"],
-        partial_variables={"format_instructions": output_parser.get_format_instructions()},
-    )
+    input_variables=("feedback",),
+    schema=AnalysisResult,
+    temperature=0,
+    version="3",
+)
+
+PATTERN_CHAIN = ChainSpec(
+    name="identify_recurrent_patterns",
+    template="""
+        Vous êtes un assistant expert en analyse de feedback utilisateur. Votre tâche est d'identifier les patterns ou thèmes récurrents dans la liste suivante de feedbacks :
+        ---
+        {feedbacks}
+        ---
+        Listez les patterns ou thèmes récurrents que vous observez, sous forme de phrases courtes et explicites. 
+        Un suffixe "(xN)" indique que ce feedback a été reçu N fois.
+        
+        """,
+    input_variables=("feedbacks",),
+    schema=RecurrentPatterns,
+    temperature=0,
+    version="4",
+)
+
+PATTERN_LABEL_CHAIN = ChainSpec(
+    name="label_pattern_clusters",
+    template="""
+        Vous êtes un assistant expert en analyse de feedback utilisateur. Les feedbacks ont été regroupés par thème ;
+        pour chaque groupe, quelques feedbacks représentatifs sont fournis avec la taille du groupe :
+        ---
+        {clusters}
+        ---
+        Donnez pour chaque groupe, dans le même ordre, un libellé court et explicite décrivant le pattern ou thème récurrent.
+        """,
+    input_variables=("clusters",),
+    schema=ClusterLabels,
+    temperature=0,
+    version="2",
+)
 
-    # 4. Création de la chaîne d'analyse
-    chain = prompt | llm | output_parser
 
-    # 5. Lancement de l'analyse
-    print("--- Lancement de l'analyse des feedbacks ---")
-    result = chain.invoke({"feedback": feedback_text})
-    print("--- Analyse terminée ---")
-    return result
+# --- Analyse map-reduce des gros volumes de feedbacks ---
+def merge_features(results: List[AnalysisResult]) -> AnalysisResult:
+    """
+    Fusionne les résultats d'analyse de plusieurs lots : les fonctionnalités de même nom normalisé
+    et de même catégorie sont regroupées et leurs `source_feedbacks` combinés sans doublon.
+    """
+    merged: Dict[Tuple[str, str], Feature] = {}
+    for result in results:
+        for feature in result.features:
+            key = (normalize_text(feature.name), feature.category.strip().lower())
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = feature.model_copy(deep=True)
+                continue
+            for source in feature.source_feedbacks:
+                if source not in existing.source_feedbacks:
+                    existing.source_feedbacks.append(source)
+            if len(feature.description) > len(existing.description):
+                existing.description = feature.description
+    return AnalysisResult(features=list(merged.values()))
+
+
+async def analyze_feedback_items(items: List[str], max_tokens: int = ANALYSIS_CHUNK_TOKENS) -> AnalysisResult:
+    """
+    Regroupe des feedbacks individuels en lots bornés en tokens, les analyse en parallèle
+    (au plus ANALYSIS_MAX_CONCURRENCY appels simultanés) puis fusionne les fonctionnalités extraites.
+    """
+    batches = batch_by_tokens(items, max_tokens)
+    semaphore = asyncio.Semaphore(ANALYSIS_MAX_CONCURRENCY)
 
+    async def analyze_batch(batch: List[str]) -> AnalysisResult:
+        async with semaphore:
+            return await ainvoke_chain(ANALYSIS_CHAIN, {"feedback": "\n".join(f"- {item}" for item in batch)})
 
-# --- Outils d'analyse de patterns récurrents ---
-@tool
-def identify_recurrent_patterns_tool(feedbacks: List[str]) -> PatternAnalysisResult:
+    results = await asyncio.gather(*(analyze_batch(batch) for batch in batches))
+    return merge_features(list(results))
+
+
+async def analyze_feedback_in_batches(feedback_text: str, max_tokens: int = ANALYSIS_CHUNK_TOKENS) -> AnalysisResult:
     """
-    Analyse une liste de feedbacks pour détecter uniquement les patterns, thèmes ou tendances récurrents dans l'ensemble des feedbacks.
-    N'extrait pas de demandes de fonctionnalités individuelles : utiliser cet outil seulement si l'utilisateur demande explicitement une analyse de patterns ou de tendances globales.
+    Découpe un texte brut en feedbacks individuels puis les analyse par lots (voir `analyze_feedback_items`).
     """
-    # 1. Initialisation du parser de sortie
-    output_parser = PydanticOutputParser(pydantic_object=PatternAnalysisResult)
+    return await analyze_feedback_items(split_feedbacks(feedback_text), max_tokens)
 
-    # 2. Initialisation du modèle LLM Gemini
-    llm = ChatGoogleGenerativeAI(
-        model=MODEL_NAME,
-        temperature=0,
-        google_api_key=GEMINI_API_KEY
-    )
 
-    # 3. Création du prompt template
-    prompt = PromptTemplate(
-        template="""
-        Vous êtes un assistant expert en analyse de feedback utilisateur. Votre tâche est d'identifier les patterns ou thèmes récurrents dans la liste suivante de feedbacks :
-        ---
-        {feedbacks}
-        ---
-        Listez les patterns ou thèmes récurrents que vous observez, sous forme de phrases courtes et explicites. 
-        
-        Retournez uniquement la liste au format JSON suivant :
-        {format_instructions}
-        """,
-        input_variables=["feedbacks"],
-        partial_variables={"format_instructions": output_parser.get_format_instructions()},
+async def analyze_feedback_list(items: List[str], clusters: Optional[List[DuplicateCluster]] = None) -> AnalysisResult:
+    """
+    Analyse une liste de feedbacks déjà découpés. Les quasi-doublons sont regroupés (un seul représentant
+    envoyé au modèle, puis chaque phrase d'origine est rattachée aux fonctionnalités de son groupe),
+    le reste est analysé par lots (voir `analyze_feedback_items`).
+    """
+    if clusters is None:
+        clusters = cluster_near_duplicates(items, FEEDBACK_DEDUP_THRESHOLD) if FEEDBACK_DEDUP_ENABLED else []
+    if clusters and len(clusters) < len(items):
+        result = await analyze_feedback_items([cluster.prompt_line() for cluster in clusters])
+        for feature in result.features:
+            feature.source_feedbacks = expand_sources(feature.source_feedbacks, clusters)
+        return result
+    return await analyze_feedback_items(items)
+
+
+# --- Détection de patterns sur de gros volumes ---
+async def identify_patterns_by_clustering(feedbacks: List[str]) -> PatternAnalysisResult:
+    """
+    Regroupe localement les feedbacks (TF-IDF + k-means) puis demande au modèle, en un seul appel,
+    un libellé par groupe à partir de quelques exemples : le coût LLM ne dépend pas du volume.
+    """
+    n_clusters = default_cluster_count(len(feedbacks), PATTERN_MAX_CLUSTERS)
+    clusters = await asyncio.to_thread(cluster_feedbacks, feedbacks, n_clusters, PATTERN_SAMPLES_PER_CLUSTER)
+
+    description = "\n".join(
+        f"Groupe {i} ({cluster.size} feedbacks) :\n" + "\n".join(f"  - {sample}" for sample in cluster.samples)
+        for i, cluster in enumerate(clusters, start=1)
+    )
+    labels = (await ainvoke_chain(PATTERN_LABEL_CHAIN, {"clusters": description})).labels
+    if len(labels) != len(clusters):
+        # Réponse incomplète : libellé de repli sur l'exemple le plus représentatif
+        labels = [labels[i] if i < len(labels) else cluster.samples[0] for i, cluster in enumerate(clusters)]
+
+    return PatternAnalysisResult(
+        patterns=labels,
+        clusters=[
+            PatternCluster(label=label, size=cluster.size, examples=cluster.samples)
+            for label, cluster in zip(labels, clusters)
+        ],
     )
 
-    # 4. Création de la chaîne d'analyse
-    chain = prompt | llm | output_parser
 
-    # 5. Lancement de l'identification
-    print("--- Lancement de l'identification des patterns récurrents ---")
-    result = chain.invoke({"feedbacks": feedbacks})
-    print("--- Identification terminée ---")
+# --- Outils d'analyse de feedback ---
+@async_tool
+async def analyze_feedback_tool(feedback_text: str) -> AnalysisResult:
+    """
+    Analyse un ou plusieurs feedbacks utilisateurs (email, commentaire, etc.) transmis ensemble, afin d'extraire toutes les demandes de fonctionnalités, bugs ou commentaires de façon structurée.
+    Utilise cet outil pour une analyse détaillée de chaque feedback, même si plusieurs feedbacks sont fournis en une seule fois.
+    Ne pas utiliser pour détecter des patterns globaux ou des tendances récurrentes : pour cela, utiliser identify_recurrent_patterns_tool.
+    """
+    # 1. Lancement de l'analyse (résultat servi depuis le cache s'il est activé)
+    items = split_feedbacks(feedback_text)
+    clusters = cluster_near_duplicates(items, FEEDBACK_DEDUP_THRESHOLD) if FEEDBACK_DEDUP_ENABLED else []
+    if (clusters and len(clusters) < len(items)) or estimate_tokens(feedback_text) > ANALYSIS_CHUNK_TOKENS:
+        # Quasi-doublons ou corpus trop volumineux pour un seul prompt
+        result = await analyze_feedback_list(items, clusters)
+    else:
+        result = await ainvoke_chain(ANALYSIS_CHAIN, {"feedback": feedback_text})
+    return result
+
+
+# --- Outils d'analyse de patterns récurrents ---
+@async_tool
+async def identify_recurrent_patterns_tool(feedbacks: List[str]) -> PatternAnalysisResult:
+    """
+    Analyse une liste de feedbacks pour détecter uniquement les patterns, thèmes ou tendances récurrents dans l'ensemble des feedbacks.
+    N'extrait pas de demandes de fonctionnalités individuelles : utiliser cet outil seulement si l'utilisateur demande explicitement une analyse de patterns ou de tendances globales.
+    """
+    # 1. Lancement de l'identification (résultat servi depuis le cache s'il est activé)
+    if len(feedbacks) >= PATTERN_CLUSTERING_MIN_FEEDBACKS:
+        # Gros volume : regroupement local puis un seul appel pour nommer les groupes
+        result = await identify_patterns_by_clustering(feedbacks)
+    else:
+        if FEEDBACK_DEDUP_ENABLED:
+            # Un représentant par groupe de quasi-doublons, avec son nombre d'occurrences
+            feedbacks = [cluster.prompt_line() for cluster in cluster_near_duplicates(feedbacks, FEEDBACK_DEDUP_THRESHOLD)]
+        # Le modèle ne renvoie que les patterns : les groupes sont réservés au regroupement local
+        patterns = await ainvoke_chain(PATTERN_CHAIN, {"feedbacks": feedbacks})
+        result = PatternAnalysisResult(patterns=patterns.patterns)
     return result
\ No newline at end of file
@@ -0,0 +1,69 @@
+import math
+from dataclasses import dataclass, field
+from typing import List, Sequence
+
+import numpy as np
+
+
+# --- Groupe thématique de feedbacks ---
+@dataclass
+class FeedbackCluster:
+    """
+    Groupe de feedbacks proches : indices des membres et quelques exemples représentatifs (les plus proches du centroïde).
+    """
+    members: List[int] = field(default_factory=list)
+    samples: List[str] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+
+def default_cluster_count(n_feedbacks: int, max_clusters: int) -> int:
+    """
+    Nombre de groupes par défaut : √(n/2), borné entre 2 et `max_clusters`.
+    """
+    return max(2, min(max_clusters, round(math.sqrt(n_feedbacks / 2))))
+
+
+# --- Regroupement TF-IDF + mini-batch k-means ---
+def cluster_feedbacks(
+    feedbacks: Sequence[str],
+    n_clusters: int,
+    samples_per_cluster: int = 5,
+    seed: int = 0,
+) -> List[FeedbackCluster]:
+    """
+    Regroupe les feedbacks par thème sans appel au modèle : représentation TF-IDF creuse
+    (unigrammes et bigrammes, accents retirés) puis mini-batch k-means.
+    Les groupes sont retournés du plus grand au plus petit.
+    """
+    # Import différé : scikit-learn n'est chargé que pour les gros volumes
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    n_clusters = min(n_clusters, len(feedbacks))
+    vectorizer = TfidfVectorizer(
+        strip_accents="unicode",
+        lowercase=True,
+        ngram_range=(1, 2),
+        min_df=2 if len(feedbacks) >= 1000 else 1,
+        max_features=50_000,
+        sublinear_tf=True,
+    )
+    matrix = vectorizer.fit_transform(feedbacks)
+
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=seed, batch_size=2048, n_init=3)
+    labels = kmeans.fit_predict(matrix)
+    distances = kmeans.transform(matrix)
+
+    clusters: List[FeedbackCluster] = []
+    for label in range(n_clusters):
+        members = np.flatnonzero(labels == label)
+        if members.size == 0:
+            continue
+        closest = members[np.argsort(distances[members, label], kind="stable")[:samples_per_cluster]]
+        clusters.append(FeedbackCluster(members=members.tolist(), samples=[feedbacks[i] for i in closest]))
+
+    clusters.sort(key=lambda cluster: cluster.size, reverse=True)
+    return clusters
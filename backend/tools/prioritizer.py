@@ -1,12 +1,29 @@
+import asyncio
+import hashlib
 import json
-from typing import List, Dict, Any
-from langchain_core.tools import tool
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 from pydantic import BaseModel, Field
 
-from backend.core.config import GEMINI_API_KEY, MODEL_NAME
+from backend.core.chains import ChainSpec, ainvoke_chain
+from backend.core.config import (
+    GEMINI_API_KEY,
+    PRIORITIZATION_ANCHORS,
+    PRIORITIZATION_CHUNK_SIZE,
+    PRIORITIZATION_MAX_CONCURRENCY,
+)
+from backend.core.runtime import async_tool
+from backend.core.text import normalize_text
+from backend.tools.scoring import (
+    MOSCOW_LABELS,
+    RICE_KEYS,
+    RiceScoreBoard,
+    anchor_level_offsets,
+    anchor_scale_factors,
+    format_subscores,
+    moscow_level,
+    parse_subscores,
+)
 
 
 # --- Schémas de données ---
@@ -40,28 +57,10 @@ class PrioritizationResult(BaseModel):
     features: List[PrioritizedFeature] = Field(description="Liste des fonctionnalités priorisées.")
 
 
-# --- Outil de priorisation des fonctionnalités ---
-@tool
-def prioritize_features_tool(features: List[FeatureToPrioritize], framework: str = 'RICE') -> PrioritizationResult:
-    """
-    Score et priorise une liste de fonctionnalités selon un framework spécifié (RICE, MoSCoW, etc.).
-    """
-    # 1. Initialisation du parser de sortie
-    output_parser = PydanticOutputParser(pydantic_object=PrioritizationResult)
-
-    # 2. Initialisation du modèle LLM Gemini
-    llm = ChatGoogleGenerativeAI(
-        model=MODEL_NAME,
-        temperature=0,
-        api_key=GEMINI_API_KEY
-    )
-
-    # 3. Conversion des fonctionnalités en JSON
-    features_json = json.dumps([f.model_dump() for f in features], ensure_ascii=False)
-
-    # 4. Création du prompt template
-    prompt = PromptTemplate(
-        template="""
+# --- Chaîne LLM de l'outil ---
+PRIORITIZATION_CHAIN = ChainSpec(
+    name="prioritize_features",
+    template="""
         Vous êtes un assistant expert Product Owner. Vous devez appliquer le framework **{framework}** pour prioriser les fonctionnalités. Votre tâche est de **classer et scorer** les fonctionnalités ci‑dessous selon le framework demandé.
 
         Fonctionnalités (JSON) :
@@ -73,24 +72,225 @@ def prioritize_features_tool(features: List[FeatureToPrioritize], framework: str
         Règles :
         - Si le framework est RICE → dans le champ 'score', fournis une chaîne de caractères listant chaque sous-score (reach, impact, confidence, effort) suivi d'une justification textuelle pour chacun, par exemple :
           "reach=60 : Justification du reach. impact=8 : Justification de l'impact. confidence=0.9 : Justification de la confiance. effort=3 : Justification de l'effort."
+          Le champ final_score et l'ordre de classement sont recalculés localement à partir de ces sous-scores : laisse final_score à null.
         - Si le framework est MoSCoW → mets Must/Should/Could/Won't dans qualitative_rank et mets les champs numériques à 0.
         - Pour tout autre framework :
             - Renseigne qualitative_rank s'il y a un label (ex. High/Med/Low).
             - Place n'importe quelle métrique spécifique (ex. wsjf, cost_of_delay, value_score, risk) dans custom.
             - Laisse les champs inutilisés à null.
-
-        Retourne strictement la sortie au format JSON suivant :
-        {format_instructions}
         """,
-        input_variables=["framework", "features"],
-        partial_variables={"format_instructions": output_parser.get_format_instructions()},
-    )
+    input_variables=("framework", "features"),
+    schema=PrioritizationResult,
+    temperature=0,
+    version="3",
+)
+
+
+# --- Notation par lots des gros backlogs (tournoi) ---
+def _name_hash(name: str) -> str:
+    return hashlib.sha1(normalize_text(name).encode("utf-8")).hexdigest()
+
+
+def tournament_chunks(
+    features: List[FeatureToPrioritize],
+    chunk_size: int = PRIORITIZATION_CHUNK_SIZE,
+    n_anchors: int = PRIORITIZATION_ANCHORS,
+) -> Tuple[List[FeatureToPrioritize], List[List[FeatureToPrioritize]]]:
+    """
+    Répartit les fonctionnalités en lots d'au plus `chunk_size` (ancres comprises), d'après l'empreinte de leur nom :
+    le découpage et les ancres ne dépendent pas de l'ordre de la liste fournie.
+    Retourne (ancres communes à tous les lots, fonctionnalités propres à chaque lot).
+    """
+    ordered = sorted(features, key=lambda f: _name_hash(f.name))
+    anchors, rest = ordered[:n_anchors], ordered[n_anchors:]
+    size = max(1, chunk_size - len(anchors))
+    return anchors, [rest[i:i + size] for i in range(0, len(rest), size)]
+
+
+async def score_chunks(
+    anchors: List[FeatureToPrioritize],
+    chunks: List[List[FeatureToPrioritize]],
+    framework: str,
+) -> List[Dict[str, PrioritizedFeature]]:
+    """
+    Note chaque lot (ancres + fonctionnalités du lot) en parallèle, au plus PRIORITIZATION_MAX_CONCURRENCY appels simultanés.
+    Retourne, pour chaque lot, les fonctionnalités notées indexées par nom normalisé.
+    """
+    semaphore = asyncio.Semaphore(PRIORITIZATION_MAX_CONCURRENCY)
+
+    async def score(chunk: List[FeatureToPrioritize]) -> Dict[str, PrioritizedFeature]:
+        features_json = json.dumps([f.model_dump() for f in anchors + chunk], ensure_ascii=False)
+        async with semaphore:
+            result = await ainvoke_chain(PRIORITIZATION_CHAIN, {"framework": framework, "features": features_json})
+        return {normalize_text(item.feature_name): item for item in result.features}
+
+    return list(await asyncio.gather(*(score(chunk) for chunk in chunks)))
+
+
+async def score_rice_in_chunks(board: RiceScoreBoard, features: List[FeatureToPrioritize]) -> Dict[int, PrioritizedFeature]:
+    """
+    Estime les sous-scores RICE manquants d'un gros backlog par lots parallèles, puis calibre les lots entre eux :
+    chaque sous-score d'un lot est multiplié par le facteur tiré des ancres (voir `anchor_scale_factors`),
+    et les ancres reçoivent leur note de référence. Les valeurs déjà connues du tableau sont conservées.
+    """
+    anchors, chunks = tournament_chunks(features, PRIORITIZATION_CHUNK_SIZE, PRIORITIZATION_ANCHORS)
+    results = await score_chunks(anchors, chunks, "RICE")
+
+    # 1. Notes des ancres dans chaque lot puis facteurs de calibration
+    anchor_keys = [normalize_text(anchor.name) for anchor in anchors]
+    anchor_scores = np.full((len(chunks), len(anchors), len(RICE_KEYS)), np.nan)
+    for c, items in enumerate(results):
+        for a, key in enumerate(anchor_keys):
+            subscores = parse_subscores(items[key].score) if key in items else {}
+            for j, rice_key in enumerate(RICE_KEYS):
+                anchor_scores[c, a, j] = subscores.get(rice_key, np.nan)
+    factors, reference = anchor_scale_factors(anchor_scores)
+
+    # 2. Report des sous-scores calibrés dans le tableau
+    llm_items: Dict[int, PrioritizedFeature] = {}
+
+    def apply(feature: FeatureToPrioritize, item: PrioritizedFeature, calibrated: Dict[str, float]) -> None:
+        if "confidence" in calibrated:
+            calibrated["confidence"] = min(1.0, calibrated["confidence"])
+        i = board.index_of(feature.name)
+        board.set(feature.name, overwrite=False, **calibrated)
+        llm_items[i] = item.model_copy(update={"score": f"{item.score} | Calibré : {format_subscores(calibrated)}"})
 
-    # 5. Création de la chaîne d'analyse
-    chain = prompt | llm | output_parser
+    for a, (anchor, key) in enumerate(zip(anchors, anchor_keys)):
+        item = next((items[key] for items in results if key in items), None)
+        if item is not None:
+            apply(anchor, item, {k: float(v) for k, v in zip(RICE_KEYS, reference[a]) if not np.isnan(v)})
+
+    for c, (chunk, items) in enumerate(zip(chunks, results)):
+        for feature in chunk:
+            item = items.get(normalize_text(feature.name))
+            if item is not None:
+                subscores = parse_subscores(item.score)
+                apply(feature, item, {k: v * float(factors[c, RICE_KEYS.index(k)]) for k, v in subscores.items()})
+    return llm_items
+
+
+async def prioritize_moscow_in_chunks(features: List[FeatureToPrioritize]) -> PrioritizationResult:
+    """
+    MoSCoW sur un gros backlog : lots classés en parallèle avec les mêmes ancres, puis alignés entre eux
+    (les niveaux d'un lot sont décalés de l'écart observé sur ses ancres, voir `anchor_level_offsets`).
+    Classement global par niveau (Must, Should, Could, Won't), dans l'ordre des fonctionnalités fournies à niveau égal ;
+    les fonctionnalités sans label reconnu sont placées en fin de liste.
+    """
+    anchors, chunks = tournament_chunks(features, PRIORITIZATION_CHUNK_SIZE, PRIORITIZATION_ANCHORS)
+    results = await score_chunks(anchors, chunks, "MoSCoW")
+
+    # 1. Niveaux des ancres dans chaque lot puis décalages d'alignement
+    anchor_keys = [normalize_text(anchor.name) for anchor in anchors]
+    anchor_levels = np.full((len(chunks), len(anchors)), np.nan)
+    for c, items in enumerate(results):
+        for a, key in enumerate(anchor_keys):
+            level = moscow_level(items[key].qualitative_rank) if key in items else None
+            if level is not None:
+                anchor_levels[c, a] = level
+    offsets, reference = anchor_level_offsets(anchor_levels)
+
+    # 2. Niveaux alignés : référence pour les ancres, niveau décalé pour les autres
+    aligned: Dict[str, Tuple[Optional[int], PrioritizedFeature]] = {}
+
+    def apply(key: str, item: PrioritizedFeature, level: Optional[int]) -> None:
+        original = moscow_level(item.qualitative_rank)
+        if level is not None and level != original:
+            item = item.model_copy(update={
+                "qualitative_rank": MOSCOW_LABELS[level],
+                "justification": f"{item.justification} | Aligné sur les ancres : {item.qualitative_rank} → {MOSCOW_LABELS[level]}",
+            })
+        aligned[key] = (level, item)
+
+    for a, key in enumerate(anchor_keys):
+        item = next((items[key] for items in results if key in items), None)
+        if item is not None:
+            apply(key, item, None if np.isnan(reference[a]) else int(reference[a]))
+
+    for c, (chunk, items) in enumerate(zip(chunks, results)):
+        for feature in chunk:
+            key = normalize_text(feature.name)
+            if key in items:
+                level = moscow_level(items[key].qualitative_rank)
+                apply(key, items[key], None if level is None else min(max(level + int(offsets[c]), 0), len(MOSCOW_LABELS) - 1))
+
+    # 3. Classement global par niveau
+    ordered = [aligned[key] for key in (normalize_text(f.name) for f in features) if key in aligned]
+    ordered.sort(key=lambda pair: len(MOSCOW_LABELS) if pair[0] is None else pair[0])
+    return PrioritizationResult(features=[item for _, item in ordered])
+
+
+# --- Scoring RICE local ---
+def build_rice_result(board: RiceScoreBoard, llm_items: Dict[int, PrioritizedFeature]) -> PrioritizationResult:
+    """
+    Construit le résultat RICE à partir du tableau de sous-scores : `final_score` est toujours
+    recalculé localement et l'ordre est celui du classement NumPy, quel que soit l'ordre renvoyé par le modèle.
+    """
+    scores = board.final_scores()
+    prioritized: List[PrioritizedFeature] = []
+    for i in board.ranking():
+        name = board.names[i]
+        final_score = None if np.isnan(scores[i]) else round(float(scores[i]), 2)
+        item = llm_items.get(int(i))
+        if item is None:
+            justification = (
+                "Sous-scores RICE fournis : score calculé localement sans appel au modèle."
+                if final_score is not None
+                else "Sous-scores RICE incomplets : score final non calculable."
+            )
+            item = PrioritizedFeature(feature_name=name, score=format_subscores(board.subscores(name)), justification=justification)
+        prioritized.append(item.model_copy(update={"final_score": final_score}))
+    return PrioritizationResult(features=prioritized)
+
+
+async def prioritize_rice(features: List[FeatureToPrioritize]) -> PrioritizationResult:
+    """
+    Priorisation RICE : les sous-scores déjà fournis dans `score_details` sont utilisés tels quels,
+    le modèle n'est appelé que pour les fonctionnalités dont un sous-score manque.
+    """
+    # 1. Sous-scores connus
+    board = RiceScoreBoard(f.name for f in features)
+    for feature in features:
+        board.set(feature.name, **parse_subscores(feature.score_details))
+
+    # 2. Estimation des sous-scores manquants par le modèle
+    llm_items: Dict[int, PrioritizedFeature] = {}
+    missing = set(board.missing())
+    to_score = [f for f in features if f.name in missing]
+    if len(to_score) > PRIORITIZATION_CHUNK_SIZE:
+        # Gros backlog : lots parallèles calibrés par des ancres communes
+        llm_items = await score_rice_in_chunks(board, to_score)
+    elif to_score:
+        features_json = json.dumps([f.model_dump() for f in to_score], ensure_ascii=False)
+        llm_result = await ainvoke_chain(PRIORITIZATION_CHAIN, {"framework": "RICE", "features": features_json})
+        for item in llm_result.features:
+            i = board.index_of(item.feature_name)
+            if i is None:
+                continue
+            board.set(board.names[i], overwrite=False, **parse_subscores(item.score))
+            llm_items[i] = item
+
+    # 3. Calcul et classement locaux
+    return build_rice_result(board, llm_items)
+
+
+# --- Outil de priorisation des fonctionnalités ---
+@async_tool
+async def prioritize_features_tool(features: List[FeatureToPrioritize], framework: str = 'RICE') -> PrioritizationResult:
+    """
+    Score et priorise une liste de fonctionnalités selon un framework spécifié (RICE, MoSCoW, etc.).
+    """
+    if framework.strip().upper() == "RICE":
+        # Scoring et classement calculés localement, modèle limité aux sous-scores manquants
+        result = await prioritize_rice(features)
+    elif framework.strip().lower() == "moscow" and len(features) > PRIORITIZATION_CHUNK_SIZE:
+        # Gros backlog MoSCoW : lots parallèles alignés par des ancres communes
+        result = await prioritize_moscow_in_chunks(features)
+    else:
+        # Petits backlogs et autres frameworks : un seul appel, pour un classement global cohérent
+        # 1. Conversion des fonctionnalités en JSON
+        features_json = json.dumps([f.model_dump() for f in features], ensure_ascii=False)
 
-    # 6. Lancement de la priorisation
-    print("--- Lancement de la priorisation des fonctionnalités ---")
-    result = chain.invoke({"framework": framework, "features": features_json})
-    print("--- Priorisation terminée ---")
+        # 2. Lancement de la priorisation (résultat servi depuis le cache s'il est activé)
+        result = await ainvoke_chain(PRIORITIZATION_CHAIN, {"framework": framework, "features": features_json})
     return result
@@ -0,0 +1,153 @@
+import re
+import warnings
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.core.text import normalize_text
+
+RICE_KEYS = ("reach", "impact", "confidence", "effort")
+MOSCOW_LABELS = ("Must", "Should", "Could", "Won't")
+
+_SUBSCORE_RE = re.compile(
+    r"\b(reach|impact|confidence|effort)\s*[=:]\s*(-?\d+(?:[.,]\d+)?)\s*(%?)",
+    re.IGNORECASE,
+)
+
+
+# --- Lecture des sous-scores ---
+def parse_subscores(text: Optional[str]) -> Dict[str, float]:
+    """
+    Extrait les sous-scores RICE d'un texte libre, par exemple 'reach=60; effort=3'
+    ou le champ `score` renvoyé par le modèle ('reach=60 : ... impact=8 : ...').
+    Une confiance exprimée en pourcentage (80% ou 80) est ramenée entre 0 et 1.
+    """
+    subscores: Dict[str, float] = {}
+    if not text:
+        return subscores
+    for key, raw_value, percent in _SUBSCORE_RE.findall(text):
+        key = key.lower()
+        if key in subscores:
+            continue  # la première valeur rencontrée fait foi
+        value = float(raw_value.replace(",", "."))
+        if key == "confidence" and (percent or value > 1):
+            value /= 100
+        subscores[key] = value
+    return subscores
+
+
+def format_subscores(subscores: Dict[str, float]) -> str:
+    return "; ".join(f"{key}={subscores[key]:g}" for key in RICE_KEYS if key in subscores)
+
+
+# --- Moteur de scoring RICE vectorisé ---
+class RiceScoreBoard:
+    """
+    Tableau (n x 4) des sous-scores RICE d'un backlog, NaN pour les valeurs inconnues.
+    Le score final `reach * impact * confidence / effort` et le classement sont calculés
+    localement avec NumPy : modifier un sous-score puis reclasser ne nécessite aucun appel au modèle.
+    """
+
+    def __init__(self, names: Iterable[str]) -> None:
+        self.names: List[str] = list(names)
+        self._index = {normalize_text(name): i for i, name in enumerate(self.names)}
+        self.values = np.full((len(self.names), len(RICE_KEYS)), np.nan)
+
+    def index_of(self, name: str) -> Optional[int]:
+        return self._index.get(normalize_text(name))
+
+    def set(self, name: str, overwrite: bool = True, **subscores: float) -> None:
+        """
+        Renseigne les sous-scores d'une fonctionnalité (les clés inconnues sont ignorées).
+        Avec `overwrite=False`, les valeurs déjà connues sont conservées.
+        """
+        i = self.index_of(name)
+        if i is None:
+            raise KeyError(name)
+        for key, value in subscores.items():
+            if key not in RICE_KEYS:
+                continue
+            j = RICE_KEYS.index(key)
+            if overwrite or np.isnan(self.values[i, j]):
+                self.values[i, j] = value
+
+    def subscores(self, name: str) -> Dict[str, float]:
+        i = self.index_of(name)
+        if i is None:
+            raise KeyError(name)
+        return {key: float(v) for key, v in zip(RICE_KEYS, self.values[i]) if not np.isnan(v)}
+
+    def missing(self) -> List[str]:
+        """
+        Fonctionnalités dont au moins un sous-score est inconnu.
+        """
+        rows = np.isnan(self.values).any(axis=1)
+        return [self.names[i] for i in np.flatnonzero(rows)]
+
+    def final_scores(self) -> np.ndarray:
+        """
+        Scores RICE finaux ; NaN si un sous-score manque ou si l'effort est nul.
+        """
+        reach, impact, confidence, effort = self.values.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = reach * impact * confidence / effort
+        scores[~np.isfinite(scores)] = np.nan
+        return scores
+
+    def ranking(self) -> np.ndarray:
+        """
+        Indices des fonctionnalités triées par score décroissant (scores inconnus en dernier,
+        ordre d'entrée conservé en cas d'égalité).
+        """
+        scores = self.final_scores()
+        keys = np.where(np.isnan(scores), np.inf, -scores)
+        return np.argsort(keys, kind="stable")
+
+
+# --- Calibration entre lots (priorisation par tournoi) ---
+def anchor_scale_factors(anchor_scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calibre des lots notés séparément grâce aux fonctionnalités d'ancrage présentes dans chacun.
+    `anchor_scores` est de forme (lots, ancres, 4), NaN pour les sous-scores inconnus.
+    La référence d'une ancre est la médiane de ses notes sur tous les lots ; le facteur d'un lot,
+    pour chaque sous-score, est la médiane des rapports référence / note du lot sur ses ancres (1 si inconnu).
+    Retourne (facteurs de forme (lots, 4), références de forme (ancres, 4)). Les médianes rendent le résultat
+    indépendant de l'ordre des lots.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # médianes de tranches entièrement NaN
+        reference = np.nanmedian(anchor_scores, axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = reference[np.newaxis] / anchor_scores
+        ratios[~np.isfinite(ratios) | (ratios <= 0)] = np.nan
+        factors = np.nanmedian(ratios, axis=1)
+    factors[np.isnan(factors)] = 1.0
+    return factors, reference
+
+
+# --- MoSCoW ---
+def moscow_level(label: Optional[str]) -> Optional[int]:
+    """
+    Niveau MoSCoW d'un label (0 pour Must … 3 pour Won't), d'après son premier mot ; None si non reconnu.
+    """
+    words = normalize_text(label or "").split()
+    if not words:
+        return None
+    first = "won" if words[0] in ("won", "wont") else words[0]
+    return next((i for i, name in enumerate(MOSCOW_LABELS) if normalize_text(name).split()[0] == first), None)
+
+
+def anchor_level_offsets(anchor_levels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aligne des lots classés séparément en MoSCoW grâce aux ancres présentes dans chacun.
+    `anchor_levels` est de forme (lots, ancres), NaN pour un niveau inconnu.
+    La référence d'une ancre est la médiane (arrondie) de ses niveaux sur tous les lots ; le décalage d'un lot
+    est la médiane (arrondie) des écarts référence - niveau du lot sur ses ancres (0 si inconnu).
+    Retourne (décalages entiers de forme (lots,), références de forme (ancres,), NaN si inconnue).
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # médianes de tranches entièrement NaN
+        reference = np.round(np.nanmedian(anchor_levels, axis=0))
+        offsets = np.round(np.nanmedian(reference[np.newaxis] - anchor_levels, axis=1))
+    offsets[np.isnan(offsets)] = 0
+    return offsets.astype(int), reference
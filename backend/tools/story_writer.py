@@ -1,11 +1,10 @@
-from typing import List
-from langchain_core.tools import tool
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
-from backend.core.config import GEMINI_API_KEY, MODEL_NAME
+from backend.core.chains import ChainSpec, ainvoke_chain
+from backend.core.config import GEMINI_API_KEY, STORY_BATCH_SIZE, STORY_MAX_CONCURRENCY
+from backend.core.runtime import async_tool
 
 
 # --- Schéma de données ---
@@ -19,25 +18,40 @@ class UserStory(BaseModel):
     estimated_complexity: str = Field(description="Estimation de la complexité (faible, moyen, élevé).")
 
 
-# --- Outil de génération de User Story ---
-@tool
-def write_user_story_tool(feature_description: str) -> UserStory:
+class NumberedUserStory(UserStory):
     """
-    Génère une User Story structurée, incluant les critères d'acceptation et l'estimation de complexité, à partir d'une description de fonctionnalité.
+    User Story d'un prompt groupé, rattachée au numéro de sa fonctionnalité.
+    """
+    index: int = Field(description="Numéro de la fonctionnalité dans la liste fournie.")
+
+
+class UserStoryBatch(BaseModel):
+    """
+    User Stories générées en un seul appel pour plusieurs fonctionnalités.
+    """
+    stories: List[NumberedUserStory] = Field(description="Une User Story par fonctionnalité, dans l'ordre de la liste.")
+
+
+class StoryOutcome(BaseModel):
+    """
+    Résultat pour une fonctionnalité : la User Story générée, ou l'erreur rencontrée.
     """
-    # 1. Initialisation du parser de sortie
-    output_parser = PydanticOutputParser(pydantic_object=UserStory)
+    feature: str = Field(description="Description de la fonctionnalité.")
+    story: Optional[UserStory] = Field(default=None, description="User Story générée.")
+    error: Optional[str] = Field(default=None, description="Erreur de génération, le cas échéant.")
 
-    # 2. Initialisation du modèle LLM Gemini
-    llm = ChatGoogleGenerativeAI(
-        model=MODEL_NAME,
-        temperature=0.7,  # Température modérée pour la créativité
-        api_key=GEMINI_API_KEY
-    )
 
-    # 3. Création du prompt template
-    prompt = PromptTemplate(
-        template="""
+class UserStoriesResult(BaseModel):
+    """
+    User Stories d'un backlog, dans l'ordre des fonctionnalités fournies.
+    """
+    stories: List[StoryOutcome] = Field(default_factory=list)
+
+
+# --- Chaînes LLM des outils ---
+USER_STORY_CHAIN = ChainSpec(
+    name="write_user_story",
+    template="""
         Vous êtes un expert en gestion de produit et en rédaction agile. À partir de la description de la fonctionnalité suivante :
         ---
         {feature_description}
@@ -47,19 +61,103 @@ def write_user_story_tool(feature_description: str) -> UserStory:
         - story : une description narrative plus détaillée.
         - acceptance_criteria : une liste de critères d'acceptation clairs et testables.
         - estimated_complexity : estimation de la complexité (faible, moyen ou élevé).
+        """,
+    input_variables=("feature_description",),
+    schema=UserStory,
+    temperature=0.7,  # Température modérée pour la créativité
+    version="2",
+)
 
-        Retournez la sortie strictement au format JSON conforme à ces instructions :
-        {format_instructions}
+USER_STORIES_CHAIN = ChainSpec(
+    name="write_user_stories",
+    template="""
+        Vous êtes un expert en gestion de produit et en rédaction agile. Rédigez une User Story pour chacune des fonctionnalités numérotées suivantes :
+        ---
+        {features}
+        ---
+        Pour chaque fonctionnalité, générez une User Story complète avec ces champs :
+        - index : le numéro de la fonctionnalité dans la liste.
+        - title : un titre concis sous forme 'En tant que..., je veux..., afin de...'.
+        - story : une description narrative plus détaillée.
+        - acceptance_criteria : une liste de critères d'acceptation clairs et testables.
+        - estimated_complexity : estimation de la complexité (faible, moyen ou élevé).
+        Chaque User Story ne doit porter que sur sa propre fonctionnalité.
         """,
-        input_variables=["feature_description"],
-        partial_variables={"format_instructions": output_parser.get_format_instructions()},
-    )
+    input_variables=("features",),
+    schema=UserStoryBatch,
+    temperature=0.7,  # Même température que pour une User Story seule
+)
+
+
+# --- Rédaction groupée ---
+async def write_user_stories(
+    features: List[str],
+    batch_size: int = STORY_BATCH_SIZE,
+    max_concurrency: int = STORY_MAX_CONCURRENCY,
+) -> UserStoriesResult:
+    """
+    Génère les User Stories d'une liste de fonctionnalités en quelques allers-retours :
+    1. les fonctionnalités sont regroupées par `batch_size` dans un même prompt,
+       au plus `max_concurrency` requêtes simultanées ;
+    2. les fonctionnalités absentes ou invalides dans la réponse d'un lot (ou d'un lot en échec)
+       sont régénérées une par une ;
+    3. une fonctionnalité en échec n'affecte pas les autres : son erreur est reportée dans le résultat.
+    Les résultats sont retournés dans l'ordre des fonctionnalités.
+    """
+    outcomes: List[Optional[StoryOutcome]] = [None] * len(features)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def write_one(i: int) -> None:
+        async with semaphore:
+            try:
+                story = await ainvoke_chain(USER_STORY_CHAIN, {"feature_description": features[i]})
+                outcomes[i] = StoryOutcome(feature=features[i], story=story)
+            except Exception as exc:
+                outcomes[i] = StoryOutcome(feature=features[i], error=f"{type(exc).__name__}: {exc}")
+
+    async def write_batch(batch: List[int]) -> None:
+        if len(batch) == 1:
+            await write_one(batch[0])
+            return
+        by_number: Dict[int, NumberedUserStory] = {}
+        async with semaphore:
+            try:
+                numbered = "\n".join(f"{n}. {features[i]}" for n, i in enumerate(batch, start=1))
+                result = await ainvoke_chain(USER_STORIES_CHAIN, {"features": numbered})
+                by_number = {story.index: story for story in result.stories}
+            except Exception:
+                pass  # tout le lot est régénéré fonctionnalité par fonctionnalité
+        missing = []
+        for n, i in enumerate(batch, start=1):
+            story = by_number.get(n)
+            if story is None:
+                missing.append(i)
+            else:
+                outcomes[i] = StoryOutcome(feature=features[i], story=UserStory(**story.model_dump(exclude={"index"})))
+        await asyncio.gather(*(write_one(i) for i in missing))
+
+    batches = [list(range(start, min(start + batch_size, len(features)))) for start in range(0, len(features), batch_size)]
+    await asyncio.gather(*(write_batch(batch) for batch in batches))
+    return UserStoriesResult(stories=[outcome for outcome in outcomes if outcome is not None])
 
-    # 4. Création de la chaîne d'analyse
-    chain = prompt | llm | output_parser
 
-    # 5. Lancement de la génération
-    print("--- Génération de la User Story ---")
-    result = chain.invoke({"feature_description": feature_description})
-    print("--- User Story générée ---")
+# --- Outil de génération de User Story ---
+@async_tool
+async def write_user_story_tool(feature_description: str) -> UserStory:
+    """
+    Génère une User Story structurée, incluant les critères d'acceptation et l'estimation de complexité, à partir d'une description de fonctionnalité.
+    """
+    # 1. Lancement de la génération
+    result = await ainvoke_chain(USER_STORY_CHAIN, {"feature_description": feature_description})
+    return result
+
+
+@async_tool
+async def write_user_stories_tool(features: List[str]) -> UserStoriesResult:
+    """
+    Génère les User Stories de plusieurs fonctionnalités en une fois (par exemple tout un backlog priorisé),
+    dans l'ordre de la liste fournie. À préférer à plusieurs appels de write_user_story_tool dès qu'il y a plus d'une fonctionnalité.
+    """
+    # 1. Lancement de la génération groupée
+    result = await write_user_stories(features)
     return result
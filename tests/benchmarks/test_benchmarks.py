@@ -0,0 +1,186 @@
+"""
+Benchmarks hors ligne de l'agent, avec un FakeChatModel injecté à la place de Gemini.
+
+Chaque mesure (médiane de plusieurs exécutions) est comparée à `baselines.json` : le test échoue si elle
+dépasse la référence multipliée par BENCH_TOLERANCE (3 par défaut), plus une marge absolue de 10 ms
+pour absorber le bruit des mesures très courtes.
+Pour régénérer les références : BENCH_UPDATE_BASELINES=1 python -m pytest tests/benchmarks
+"""
+import asyncio
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from backend.core.chains import registry
+from backend.core.fake_llm import FakeChatModel, tool_call_message
+from backend.core.metrics import metrics
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "3.0"))
+ABSOLUTE_SLACK = 0.01
+UPDATE_BASELINES = os.getenv("BENCH_UPDATE_BASELINES") == "1"
+
+
+# --- Réponses factices ---
+def _analysis_json(prompt: str) -> str:
+    lines = [line[2:] for line in prompt.splitlines() if line.strip().startswith("- ")][:20]
+    features = [
+        {"name": f"Feature {i}", "description": line, "source_feedbacks": [line], "category": "feature"}
+        for i, line in enumerate(lines or ["feedback"])
+    ]
+    return json.dumps({"features": features}, ensure_ascii=False)
+
+
+STORY_JSON = json.dumps({
+    "title": "En tant que PO, je veux exporter en PDF, afin de partager mes rapports.",
+    "story": "Histoire détaillée.",
+    "acceptance_criteria": ["Critère 1", "Critère 2"],
+    "estimated_complexity": "moyen",
+})
+
+
+def make_responder(tool_calls_per_turn):
+    def responder(messages):
+        first = messages[0]
+        if isinstance(first, SystemMessage) and "Product" in str(first.content):
+            # Supervisor : tool_calls scriptés puis réponse finale
+            if isinstance(messages[-1], ToolMessage):
+                return "Voici le résultat des outils."
+            return tool_call_message(*tool_calls_per_turn())
+        prompt = str(messages[-1].content)
+        if "User Story" in prompt:
+            return STORY_JSON
+        return _analysis_json(prompt)
+
+    return responder
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Injecte un FakeChatModel dans le registre pour toute la durée du benchmark.
+    """
+    state = {"calls": lambda: [{"name": "write_user_story_tool", "args": {"feature_description": "Export PDF"}}], "latency": 0.0}
+
+    registry.set_llm_factory(
+        lambda model, temperature: FakeChatModel(responder=make_responder(lambda: state["calls"]()), latency=state["latency"])
+    )
+    monkeypatch.setattr(metrics, "trace_file", None)
+    yield state
+    registry.set_llm_factory(None)
+
+
+# --- Mesure et comparaison aux références ---
+def measure(name, fn, repeat=5):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    median = statistics.median(durations)
+
+    baselines = json.loads(BASELINES_PATH.read_text(encoding="utf-8")) if BASELINES_PATH.exists() else {}
+    if UPDATE_BASELINES or name not in baselines:
+        baselines[name] = round(median, 6)
+        BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        return median
+    limit = baselines[name] * TOLERANCE + ABSOLUTE_SLACK
+    assert median <= limit, f"Régression de performance sur {name} : {median:.4f}s > {limit:.4f}s (référence {baselines[name]:.4f}s)"
+    return median
+
+
+def _history(length):
+    history = []
+    for i in range(length // 4):
+        history += [
+            HumanMessage(content=f"Demande {i}"),
+            tool_call_message({"name": "write_user_story_tool", "args": {"feature_description": f"F{i}"}, "id": f"h{i}"}),
+            ToolMessage(content=STORY_JSON, tool_name="write_user_story_tool", tool_call_id=f"h{i}"),
+            AIMessage(content=f"Réponse {i}"),
+        ]
+    return history
+
+
+# --- Benchmarks ---
+@pytest.mark.parametrize("history_length", [0, 40, 400])
+def test_bench_supervisor_turn(fake_llm, history_length):
+    from backend.agent.agent_main import supervisor_step
+
+    base = _history(history_length)
+    loop = asyncio.new_event_loop()
+    try:
+        measure(
+            f"supervisor_turn[history={history_length}]",
+            lambda: loop.run_until_complete(supervisor_step({"messages": base + [HumanMessage(content="Rédige une user story")]})),
+        )
+    finally:
+        loop.close()
+
+
+def test_bench_tool_dispatch(fake_llm):
+    from backend.agent.agent_main import execute_tool_call
+
+    call = {"name": "write_user_story_tool", "args": {"feature_description": "Export PDF"}, "id": "1"}
+    loop = asyncio.new_event_loop()
+    try:
+        measure("tool_dispatch[write_user_story]", lambda: loop.run_until_complete(execute_tool_call(call)), repeat=20)
+    finally:
+        loop.close()
+
+
+def test_bench_parse_and_serialize():
+    from langchain_core.output_parsers import PydanticOutputParser
+    from backend.tools.feedback_analyzer import AnalysisResult
+
+    payload = _analysis_json("\n".join(f"- Feedback numéro {i} sur l'export PDF" for i in range(20)) * 10)
+    parser = PydanticOutputParser(pydantic_object=AnalysisResult)
+
+    def parse_and_dump():
+        for _ in range(50):
+            json.dumps(parser.parse(payload).model_dump(), ensure_ascii=False)
+
+    measure("parse_and_serialize[analysis]", parse_and_dump)
+
+
+@pytest.mark.parametrize("n_feedbacks", [10, 1000])
+def test_bench_analysis_turn(fake_llm, n_feedbacks):
+    from backend.agent.agent_main import agent
+
+    feedbacks = [f"« Retour {i} : l'export PDF du rapport {i % 37} échoue »" for i in range(n_feedbacks)]
+    fake_llm["calls"] = lambda: [{"name": "analyze_feedback_tool", "args": {"feedback_text": ", ".join(feedbacks)}}]
+    loop = asyncio.new_event_loop()
+    try:
+        measure(
+            f"analysis_turn[feedbacks={n_feedbacks}]",
+            lambda: loop.run_until_complete(agent.ainvoke({"messages": [HumanMessage(content="Analyse ces feedbacks")]})),
+            repeat=3,
+        )
+    finally:
+        loop.close()
+
+
+def test_bench_parallel_tool_calls(fake_llm):
+    from backend.agent.agent_main import supervisor_step
+
+    # Cinq user stories dans un même tour : la durée doit rester proche d'un seul appel
+    fake_llm["latency"] = 0.05
+    registry.clear()
+    fake_llm["calls"] = lambda: [
+        {"name": "write_user_story_tool", "args": {"feature_description": f"Feature {i}"}} for i in range(5)
+    ]
+    loop = asyncio.new_event_loop()
+    try:
+        duration = measure(
+            "parallel_story_calls[5x50ms]",
+            lambda: loop.run_until_complete(supervisor_step({"messages": [HumanMessage(content="Rédige 5 user stories")]})),
+            repeat=3,
+        )
+    finally:
+        loop.close()
+    # 2 appels supervisor + 2 vagues d'outils (MAX_TOOL_WORKERS=4) au maximum, bien moins que 7 appels séquentiels
+    assert duration < 7 * 0.05
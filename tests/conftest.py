@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_feature_store(tmp_path, monkeypatch):
+    """
+    Historique local des outils écrit dans un répertoire temporaire, jamais dans `.cache/features.sqlite`.
+    """
+    from backend.tools import feature_store
+
+    monkeypatch.setattr(feature_store, "feature_store", feature_store.FeatureStore(str(tmp_path / "features.sqlite")))
+
+
+@pytest.fixture(autouse=True)
+def disabled_tracing(monkeypatch):
+    """
+    Pas de fichier de trace JSONL pendant les tests (`.cache/trace.jsonl` par défaut).
+    """
+    from backend.core.metrics import metrics
+
+    monkeypatch.setattr(metrics, "trace_file", None)
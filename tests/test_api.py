@@ -0,0 +1,49 @@
+def test_sessions_are_persisted_and_isolated(tmp_path):
+    import json
+    from fastapi.testclient import TestClient
+    from langchain_core.messages import SystemMessage, ToolMessage
+    from backend.api.app import create_app
+    from backend.core.chains import registry
+    from backend.core.fake_llm import FakeChatModel, tool_call_message
+
+    def responder(messages):
+        if isinstance(messages[0], SystemMessage) and "Product" in messages[0].content:
+            if isinstance(messages[-1], ToolMessage):
+                return "Story rédigée."
+            return tool_call_message({"name": "write_user_story_tool", "args": {"feature_description": messages[-1].content}})
+        title = "PDF" if "PDF" in messages[-1].content else "CSV"
+        return json.dumps({"title": title, "story": "s", "acceptance_criteria": ["a"], "estimated_complexity": "faible"})
+
+    db = str(tmp_path / "sessions.sqlite")
+    registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=responder))
+    try:
+        with TestClient(create_app(db)) as client:
+            first = client.post("/sessions").json()["session_id"]
+            second = client.post("/sessions").json()["session_id"]
+            response = client.post(f"/sessions/{first}/messages", json={"message": "Export PDF"})
+            assert response.status_code == 200
+            assert response.json()["reply"] == "Story rédigée."
+            client.post(f"/sessions/{second}/messages", json={"message": "Export CSV"})
+            client.post(f"/sessions/{first}/messages", json={"message": "Export PDF encore"})
+            assert client.get("/sessions/unknown").status_code == 404
+
+            measures = client.get("/metrics").json()
+            assert measures["supervisor:supervisor"]["count"] >= 3
+            assert "concurrency_limit" in measures["llm_limiter"]
+
+        # Nouveau processus simulé : l'état est relu depuis SQLite
+        with TestClient(create_app(db)) as client:
+            first_state = client.get(f"/sessions/{first}").json()
+            second_state = client.get(f"/sessions/{second}").json()
+    finally:
+        registry.set_llm_factory(None)
+
+    assert first_state["turns"] == 2
+    assert first_state["results"]["user_story"]["title"] == "PDF"
+    assert second_state["turns"] == 1
+    assert second_state["results"]["user_story"]["title"] == "CSV"
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
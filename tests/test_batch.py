@@ -0,0 +1,88 @@
+def _responder(calls, fail_on=None):
+    import json
+
+    def responder(messages):
+        prompt = str(messages[-1].content)
+        if "patterns ou thèmes récurrents" in prompt:
+            return json.dumps({"patterns": ["Thème commun"]})
+        if "framework" in prompt:
+            features, _ = json.JSONDecoder().raw_decode(prompt.split("Features :")[1].strip())
+            names = [f["name"] for f in features]
+            return json.dumps({"features": [
+                {"feature_name": name, "score": "reach=10 impact=2 confidence=0.5 effort=1", "justification": "j"}
+                for name in names
+            ]})
+        lines = [line.strip()[2:] for line in prompt.splitlines() if line.strip().startswith("- ")]
+        calls.append(lines)
+        if fail_on is not None and any(fail_on in line for line in lines):
+            raise RuntimeError("interruption simulée")
+        return json.dumps({"features": [
+            {"name": f"F {line}", "description": line, "source_feedbacks": [line], "category": "feature"} for line in lines
+        ]})
+
+    return responder
+
+
+def test_iter_feedback_rows_csv_and_jsonl(tmp_path):
+    import json
+    from backend.batch import iter_batches, iter_feedback_rows
+
+    csv_path = tmp_path / "feedbacks.csv"
+    csv_path.write_text('id,feedback\n1,"Export PDF\ncassé"\n2,\n3,Mode nuit\n', encoding="utf-8")
+    assert list(iter_feedback_rows(str(csv_path))) == ["Export PDF cassé", "Mode nuit"]
+
+    jsonl_path = tmp_path / "feedbacks.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(r) for r in [{"text": "a"}, "b", {"text": ""}]) + "\n", encoding="utf-8")
+    assert list(iter_feedback_rows(str(jsonl_path))) == ["a", "b"]
+
+    assert list(iter_batches(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_run_batch_resumes_without_reprocessing(tmp_path, monkeypatch):
+    import asyncio
+    import hashlib
+    import json
+    import pytest
+    from backend.batch import run_batch
+    from backend.core.chains import registry
+    from backend.core.fake_llm import FakeChatModel
+    from backend.core.metrics import metrics
+
+    monkeypatch.setattr(metrics, "trace_file", None)
+    rows = [hashlib.sha1(str(i).encode()).hexdigest() for i in range(25)]
+    input_path = tmp_path / "feedbacks.csv"
+    input_path.write_text("feedback\n" + "\n".join(rows) + "\n", encoding="utf-8")
+    output_path = tmp_path / "out" / "results.jsonl"
+
+    # 1. Premier passage interrompu au troisième lot
+    calls = []
+    registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=_responder(calls, fail_on=rows[20])))
+    try:
+        with pytest.raises(RuntimeError):
+            asyncio.run(run_batch(str(input_path), str(output_path), batch_size=10, concurrency=1))
+
+        # 2. Reprise : seules les lignes non écrites sont renvoyées au modèle
+        calls.clear()
+        registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=_responder(calls)))
+        report = asyncio.run(run_batch(str(input_path), str(output_path), batch_size=10, concurrency=2))
+    finally:
+        registry.set_llm_factory(None)
+
+    assert report.resumed_from_row == 20
+    assert report.rows == 25 and report.batches == 3
+    assert sorted(line for batch in calls for line in batch) == sorted(rows[20:])
+
+    lines = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+    assert [line["batch"] for line in lines] == [0, 1, 2]
+    assert [line["rows"] for line in lines] == [10, 10, 5]
+    assert len(lines[2]["prioritization"]["features"]) == 5
+    assert lines[0]["patterns"]["patterns"] == ["Thème commun"]
+
+    # Un point de reprise d'un autre traitement est refusé
+    with pytest.raises(ValueError):
+        asyncio.run(run_batch(str(input_path), str(output_path), batch_size=5))
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
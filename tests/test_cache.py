@@ -0,0 +1,68 @@
+def test_result_cache_roundtrip_and_stats(tmp_path):
+    from backend.core.cache import ResultCache, make_cache_key
+    from backend.tools.feedback_analyzer import AnalysisResult, Feature
+
+    cache = ResultCache(str(tmp_path), max_entries=10, ttl_seconds=3600)
+    key = make_cache_key("analyze_feedback", "gemini-2.5-flash", 0, "1", {"feedback": "Export  PDF\n"})
+    same_key = make_cache_key("analyze_feedback", "gemini-2.5-flash", 0, "1", {"feedback": "Export PDF"})
+    assert key == same_key
+
+    assert cache.get(key, AnalysisResult) is None
+    result = AnalysisResult(features=[Feature(name="Export PDF", description="d", source_feedbacks=["Export PDF"], category="feature")])
+    cache.set(key, result)
+    assert cache.get(key, AnalysisResult) == result
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_result_cache_lru_and_ttl(tmp_path):
+    import os
+    import time
+    from backend.core.cache import ResultCache
+    from backend.tools.feedback_analyzer import PatternAnalysisResult
+
+    cache = ResultCache(str(tmp_path), max_entries=2, ttl_seconds=3600)
+    cache.set("a", PatternAnalysisResult(patterns=["a"]))
+    cache.set("b", PatternAnalysisResult(patterns=["b"]))
+    # "a" est plus ancien que "b" : on le relit pour qu'il devienne le plus récent
+    os.utime(tmp_path / "b.json", (time.time() - 100, time.time() - 100))
+    os.utime(tmp_path / "a.json", (time.time() - 200, time.time() - 200))
+    assert cache.get("a", PatternAnalysisResult) is not None
+    cache.set("c", PatternAnalysisResult(patterns=["c"]))
+    assert cache.get("b", PatternAnalysisResult) is None
+    assert cache.get("a", PatternAnalysisResult) is not None
+
+    expired = ResultCache(str(tmp_path), max_entries=10, ttl_seconds=0)
+    time.sleep(0.01)
+    assert expired.get("c", PatternAnalysisResult) is None
+
+
+
+def test_result_cache_keeps_an_in_memory_lru_index(tmp_path, monkeypatch):
+    import asyncio
+    from pathlib import Path
+    from backend.core.cache import ResultCache
+    from backend.tools.feedback_analyzer import PatternAnalysisResult
+
+    cache = ResultCache(str(tmp_path), max_entries=2, ttl_seconds=3600)
+    globs = []
+    original_glob = Path.glob
+    monkeypatch.setattr(Path, "glob", lambda self, pattern: globs.append(pattern) or original_glob(self, pattern))
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            await cache.aset(key, PatternAnalysisResult(patterns=[key]))
+        return await cache.aget("c", PatternAnalysisResult)
+
+    assert asyncio.run(scenario()).patterns == ["c"]
+    # Répertoire parcouru une seule fois, au premier accès, et non à chaque écriture
+    assert len(globs) == 1
+    assert sorted(p.name for p in tmp_path.glob("*.json")) == ["b.json", "c.json"]
+
+    # Un nouveau processus retrouve les entrées existantes
+    assert ResultCache(str(tmp_path), max_entries=2).get("b", PatternAnalysisResult) is not None
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
@@ -0,0 +1,138 @@
+def test_chain_registry_reuses_chains(monkeypatch):
+    import backend.core.chains as chains
+    from backend.core.chains import ChainRegistry
+    from backend.tools.feedback_analyzer import ANALYSIS_CHAIN, PATTERN_CHAIN
+
+    monkeypatch.setattr(chains, "GEMINI_API_KEY", "test-key")
+    registry = ChainRegistry()
+
+    first = registry.get_chain(ANALYSIS_CHAIN)
+    second = registry.get_chain(ANALYSIS_CHAIN)
+    registry.get_chain(PATTERN_CHAIN)
+
+    assert first is second
+    stats = registry.stats()
+    # Un seul client partagé (même modèle, même température) pour les deux chaînes
+    assert stats["llms"] == 1
+    assert stats["chains"] == 2
+    assert stats["setups_avoided"] >= 2
+
+
+def _run_story_chain(responses, monkeypatch):
+    import asyncio
+    from backend.core.chains import ainvoke_chain, registry
+    from backend.core.fake_llm import FakeChatModel
+    from backend.core.metrics import metrics
+    from backend.tools.story_writer import USER_STORY_CHAIN
+
+    prompts = []
+
+    def responder(messages):
+        prompts.append(str(messages[-1].content))
+        return responses[len(prompts) - 1]
+
+    monkeypatch.setattr(metrics, "trace_file", None)
+    metrics.clear()
+    registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=responder))
+    try:
+        story = asyncio.run(ainvoke_chain(USER_STORY_CHAIN, {"feature_description": "Export PDF"}))
+    finally:
+        registry.set_llm_factory(None)
+    return story, prompts, metrics.records("chain", "write_user_story")[0]
+
+
+STORY = '{"title": "t", "story": "s", "acceptance_criteria": ["a"], "estimated_complexity": "faible"}'
+
+
+def test_native_structured_output_without_format_instructions(monkeypatch):
+    story, prompts, record = _run_story_chain([STORY], monkeypatch)
+
+    assert story.title == "t"
+    # Le schéma est transmis au modèle : plus de consignes de format dans le prompt
+    assert "JSON schema" not in prompts[0]
+    assert not record.parse_failure
+    assert record.extra["prompt_tokens_saved"] > 0
+
+
+def test_malformed_output_is_repaired_locally(monkeypatch):
+    story, prompts, record = _run_story_chain(["```json\n" + STORY[:-1] + ",}\n```"], monkeypatch)
+
+    assert story.estimated_complexity == "faible"
+    assert len(prompts) == 1
+    assert record.parse_failure and record.extra["repair"] == "local"
+
+
+def test_invalid_output_is_sent_back_alone_for_repair(monkeypatch):
+    story, prompts, record = _run_story_chain(["Titre : t, sans JSON", STORY], monkeypatch)
+
+    assert story.title == "t"
+    # Seule la sortie fautive est renvoyée, pas la description d'origine
+    assert "Titre : t, sans JSON" in prompts[1]
+    assert "Export PDF" not in prompts[1]
+    assert record.retries == 1 and record.extra["repair"] == "model"
+
+
+def test_prompt_mode_parses_text_output(monkeypatch):
+    import backend.core.chains as chains
+
+    monkeypatch.setattr(chains, "STRUCTURED_OUTPUT_MODE", "prompt")
+    story, prompts, record = _run_story_chain([STORY], monkeypatch)
+
+    assert story.story == "s"
+    assert "JSON schema" in prompts[0]
+    assert "prompt_tokens_saved" not in record.extra
+
+
+def test_parse_model_routes():
+    from backend.core.chains import parse_model_routes
+    from backend.core.config import FAST_MODEL_NAME, MODEL_NAME
+
+    routes = parse_model_routes("analyze_feedback=fast>default, write_user_story = model-x , broken=, fast>fast")
+    assert routes == {"analyze_feedback": (FAST_MODEL_NAME, MODEL_NAME), "write_user_story": ("model-x",)}
+    assert parse_model_routes("prioritize_features=default>default") == {"prioritize_features": (MODEL_NAME,)}
+
+
+def test_invalid_fast_model_output_escalates_to_stronger_model(monkeypatch):
+    import asyncio
+    import json
+    import backend.core.chains as chains
+    from backend.core.chains import ainvoke_chain, registry
+    from backend.core.fake_llm import FakeChatModel
+    from backend.core.metrics import metrics
+    from backend.tools.feedback_analyzer import ANALYSIS_CHAIN
+
+    monkeypatch.setattr(chains, "CHAIN_MODEL_ROUTES", {"analyze_feedback": ("petit", "grand")})
+    monkeypatch.setattr(metrics, "trace_file", None)
+    metrics.clear()
+    valid = json.dumps({"features": [{"name": "Export", "description": "d", "source_feedbacks": ["s"], "category": "bug"}]})
+    calls = []
+
+    def factory(model, temperature):
+        def responder(messages):
+            calls.append(model)
+            return "pas de JSON" if model == "petit" else valid
+        return FakeChatModel(responder=responder)
+
+    registry.set_llm_factory(factory)
+    try:
+        result = asyncio.run(ainvoke_chain(ANALYSIS_CHAIN, {"feedback": "L'export plante"}))
+        # Sortie valide du premier modèle : pas d'escalade
+        monkeypatch.setattr(chains, "CHAIN_MODEL_ROUTES", {"analyze_feedback": ("grand",)})
+        asyncio.run(ainvoke_chain(ANALYSIS_CHAIN, {"feedback": "L'export plante"}))
+    finally:
+        registry.set_llm_factory(None)
+
+    assert result.features[0].name == "Export"
+    # Le petit modèle n'est pas sollicité pour corriger sa sortie : le grand modèle reprend la demande d'origine
+    assert calls == ["petit", "grand", "grand"]
+    escalated, direct = metrics.records("chain", "analyze_feedback")
+    assert escalated.model == "grand" and escalated.parse_failure
+    assert escalated.extra["escalations"][0]["model"] == "petit"
+    assert "repair" not in escalated.extra
+    assert "escalations" not in direct.extra
+    assert metrics.summary()["chain:analyze_feedback"]["models"] == {"grand": 2}
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
@@ -0,0 +1,81 @@
+class ResourceExhausted(Exception):
+    """
+    Même nom que l'exception 429 du SDK Google.
+    """
+
+
+def test_token_bucket_reserves_in_order():
+    from backend.core.concurrency import TokenBucket
+
+    now = [0.0]
+    bucket = TokenBucket(per_minute=60, capacity=2, clock=lambda: now[0])
+
+    assert bucket.reserve(1) == 0 and bucket.reserve(1) == 0
+    # Seau vide : 1 unité par seconde
+    assert bucket.reserve(1) == 1.0
+    assert bucket.reserve(1) == 2.0
+    now[0] = 10.0
+    assert bucket.reserve(1) == 0
+    assert TokenBucket(per_minute=0).reserve(10 ** 6) == 0
+
+
+def test_adaptive_limiter_bounds_concurrency_and_adapts():
+    import asyncio
+    from backend.core.concurrency import AdaptiveConcurrencyLimiter
+
+    limiter = AdaptiveConcurrencyLimiter(maximum=4, initial=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        await limiter.acquire()
+        try:
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+        finally:
+            limiter.release()
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2 and limiter.in_flight == 0
+
+    limiter.on_throttle()
+    assert limiter.limit == 1
+    for _ in range(20):
+        limiter.on_success()
+    assert limiter.limit == 4
+
+
+def test_rate_limiter_retries_throttled_calls():
+    import asyncio
+    import pytest
+    from backend.core.concurrency import RateLimiter
+    from backend.core.metrics import CallRecord
+
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=0, max_concurrency=4, max_retries=3, backoff_base=0.001)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ResourceExhausted("429 quota exceeded")
+        return "ok"
+
+    record = CallRecord(kind="chain", name="test")
+    assert asyncio.run(limiter.run(flaky, record=record)) == "ok"
+    assert record.retries == 2
+    assert limiter.concurrency.throttled == 2 and limiter.concurrency.limit < 4
+    assert limiter.concurrency.in_flight == 0
+
+    async def broken():
+        raise ValueError("pas un 429")
+
+    with pytest.raises(ValueError):
+        asyncio.run(limiter.run(broken))
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
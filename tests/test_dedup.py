@@ -0,0 +1,92 @@
+def test_cluster_near_duplicates():
+    from backend.tools.dedup import cluster_near_duplicates
+
+    feedbacks = [
+        "Impossible de me connecter via Google.",
+        "J'aimerais exporter mes rapports en PDF.",
+        "impossible de me connecter via google !",
+        "Impossible de me connecter via Google svp",
+        "Le mode sombre est très agréable.",
+    ]
+    clusters = cluster_near_duplicates(feedbacks)
+
+    assert [c.count for c in clusters] == [3, 1, 1]
+    assert clusters[0].representative == "Impossible de me connecter via Google."
+    assert clusters[0].prompt_line() == "Impossible de me connecter via Google. (x3)"
+    assert sum(c.count for c in clusters) == len(feedbacks)
+
+
+def test_expand_sources():
+    from backend.tools.dedup import cluster_near_duplicates, expand_sources
+
+    feedbacks = ["Export PDF cassé sur mobile.", "Export PDF cassé sur mobile !", "Mode sombre svp"]
+    clusters = cluster_near_duplicates(feedbacks)
+
+    expanded = expand_sources(["Export PDF cassé sur mobile. (x2)", "Phrase reformulée"], clusters)
+    assert expanded == ["Export PDF cassé sur mobile.", "Export PDF cassé sur mobile !", "Phrase reformulée"]
+
+
+
+def test_expand_sources_matches_partial_excerpts():
+    from backend.tools.dedup import cluster_near_duplicates, expand_sources
+
+    feedbacks = [
+        "L'export PDF plante systématiquement sur mobile depuis la mise à jour.",
+        "l'export PDF plante systématiquement sur mobile depuis la mise à jour !",
+        "Mode sombre svp",
+    ]
+    clusters = cluster_near_duplicates(feedbacks)
+    assert [c.count for c in clusters] == [2, 1]
+
+    # Extrait partiel, puis extrait légèrement retouché par le modèle
+    assert expand_sources(["export PDF plante systématiquement sur mobile"], clusters) == feedbacks[:2]
+    assert expand_sources(["L'export PDF plante systématiquement sur mobile depuis la dernière mise à jour"], clusters) == feedbacks[:2]
+    # Trop peu de mots en commun : extrait conservé tel quel
+    assert expand_sources(["Export Excel"], clusters) == ["Export Excel"]
+
+def test_analyze_feedback_tool_sends_one_representative_per_cluster(monkeypatch):
+    import backend.tools.feedback_analyzer as analyzer
+    from backend.tools.feedback_analyzer import AnalysisResult, Feature
+
+    prompts = []
+
+    async def fake_ainvoke_chain(spec, inputs, model=None):
+        prompts.append(inputs["feedback"])
+        return AnalysisResult(features=[
+            Feature(name="Connexion Google", description="d", source_feedbacks=["Impossible de me connecter via Google. (x3)"], category="bug"),
+        ])
+
+    monkeypatch.setattr(analyzer, "ainvoke_chain", fake_ainvoke_chain)
+    feedback_text = "« Impossible de me connecter via Google. », « impossible de me connecter via google ! », « Impossible de me connecter via Google ! »"
+    result = analyzer.analyze_feedback_tool.invoke({"feedback_text": feedback_text})
+
+    assert prompts == ["- Impossible de me connecter via Google. (x3)"]
+    assert len(result.features[0].source_feedbacks) == 3
+
+
+
+def test_dedup_keeps_the_feedbacks_around_quoted_duplicates(monkeypatch):
+    import backend.tools.feedback_analyzer as analyzer
+    from backend.tools.feedback_analyzer import AnalysisResult
+
+    prompts = []
+
+    async def fake_ainvoke_chain(spec, inputs, model=None):
+        prompts.append(inputs["feedback"])
+        return AnalysisResult()
+
+    monkeypatch.setattr(analyzer, "ainvoke_chain", fake_ainvoke_chain)
+    feedback_text = (
+        'Ticket 1: "impossible de me connecter via Google". Ticket 2: "impossible de me connecter via Google !". '
+        "Ticket 3: l'export PDF plante à chaque fois."
+    )
+    analyzer.analyze_feedback_tool.invoke({"feedback_text": feedback_text})
+
+    # Quasi-doublons regroupés, sans perdre le ticket qui n'est pas cité
+    assert len(prompts) == 1
+    assert "(x2)" in prompts[0]
+    assert "l'export PDF plante à chaque fois" in prompts[0]
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
@@ -0,0 +1,140 @@
+def _feature(name, sources, category="feature", description="d"):
+    from backend.tools.feedback_analyzer import Feature
+
+    return Feature(name=name, description=description, source_feedbacks=sources, category=category)
+
+
+def test_feature_index_merges_by_name_and_fingerprint():
+    from backend.tools.feature_index import FeatureIndex
+    from backend.tools.feedback_analyzer import AnalysisResult
+
+    index = FeatureIndex()
+    index.add(AnalysisResult(features=[_feature("Export PDF", ["a"])]), ["a"])
+    index.add(
+        AnalysisResult(features=[
+            _feature("export pdf", ["b"], description="plus longue description"),
+            _feature("PDF export", ["c"]),
+            _feature("Export PDF", ["d"], category="bug"),
+        ]),
+        ["b", "c", "d"],
+    )
+
+    features = index.result().features
+    assert [(f.name, f.category) for f in features] == [("Export PDF", "feature"), ("Export PDF", "bug")]
+    assert features[0].source_feedbacks == ["a", "b", "c"]
+    assert features[0].description == "plus longue description"
+
+    assert index.unseen(["A", "b !", "e", "e"]) == ["e"]
+
+    restored = FeatureIndex.from_dict(index.to_dict())
+    assert restored.result() == index.result()
+    assert restored.unseen(["a", "f"]) == ["f"]
+
+
+def test_incremental_analysis_sends_only_new_feedbacks():
+    import asyncio
+    import json
+    from backend.agent.agent_main import execute_tool_call
+    from backend.core.chains import registry
+    from backend.core.fake_llm import FakeChatModel
+    from backend.tools.feature_index import FeatureIndex
+
+    prompts = []
+
+    def responder(messages):
+        prompt = str(messages[-1].content)
+        prompts.append(prompt)
+        lines = [line.strip()[2:] if line.strip().startswith("- ") else line.strip() for line in prompt.split("---")[1].strip().splitlines()]
+        features = [{"name": line.split(" ")[0], "description": line, "source_feedbacks": [line], "category": "feature"} for line in lines]
+        return json.dumps({"features": features}, ensure_ascii=False)
+
+    def call(text):
+        return {"name": "analyze_feedback_tool", "args": {"feedback_text": text}}
+
+    index = FeatureIndex()
+    registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=responder))
+    try:
+        asyncio.run(execute_tool_call(call("Export PDF cassé\nMode nuit trop sombre"), index))
+        _, state_key, result = asyncio.run(execute_tool_call(call("Export PDF cassé\nRecherche trop lente"), index))
+        asyncio.run(execute_tool_call(call("mode nuit trop sombre !"), index))
+    finally:
+        registry.set_llm_factory(None)
+
+    # Le deuxième appel n'envoie que la phrase nouvelle ; le troisième n'appelle pas le modèle
+    assert len(prompts) == 2
+    assert "Recherche trop lente" in prompts[1] and "Export PDF" not in prompts[1]
+    assert state_key == "analysis_result"
+    assert [f["name"] for f in result["features"]] == ["Export", "Mode", "Recherche"]
+
+
+def test_parallel_analyses_in_one_turn_keep_the_full_index(monkeypatch):
+    import asyncio
+    from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+    import backend.agent.agent_main as agent_main
+    from backend.core.chains import registry
+    from backend.core.fake_llm import FakeChatModel, tool_call_message
+    from backend.tools.feedback_analyzer import AnalysisResult
+
+    class Analyzer:
+        name = "analyze_feedback_tool"
+
+        async def ainvoke(self, arguments):
+            text = arguments["feedback_text"]
+            # Le premier appel du tour se termine en dernier
+            await asyncio.sleep(0.05 if "Alpha" in text else 0)
+            return AnalysisResult(features=[_feature(text.split()[0], [text])])
+
+    monkeypatch.setattr(agent_main, "analyze_feedback_tool", Analyzer())
+
+    def responder(messages):
+        if isinstance(messages[-1], ToolMessage):
+            return "ok"
+        return tool_call_message(
+            {"name": "analyze_feedback_tool", "args": {"feedback_text": "Alpha est lent"}},
+            {"name": "analyze_feedback_tool", "args": {"feedback_text": "Beta plante"}},
+        )
+
+    registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=responder))
+    try:
+        state = asyncio.run(agent_main.supervisor_step({"messages": [HumanMessage(content="Analyse ces deux feedbacks")]}))
+    finally:
+        registry.set_llm_factory(None)
+
+    assert sorted(f["name"] for f in state["analysis_result"]["features"]) == ["Alpha", "Beta"]
+    assert sorted(f["name"] for f in state["feature_index"]["features"]) == ["Alpha", "Beta"]
+
+
+
+def test_repeated_quote_in_a_new_feedback_is_analyzed(monkeypatch):
+    import asyncio
+    import backend.agent.agent_main as agent_main
+    from backend.tools.feature_index import FeatureIndex
+    from backend.tools.feedback_analyzer import AnalysisResult
+
+    texts = []
+
+    class Analyzer:
+        name = "analyze_feedback_tool"
+
+        async def ainvoke(self, arguments):
+            texts.append(arguments["feedback_text"])
+            return AnalysisResult(features=[_feature(f"F{len(texts)}", [arguments["feedback_text"]])])
+
+    monkeypatch.setattr(agent_main, "analyze_feedback_tool", Analyzer())
+
+    def call(text):
+        return {"name": "analyze_feedback_tool", "args": {"feedback_text": text}}
+
+    index = FeatureIndex()
+    asyncio.run(agent_main.execute_tool_call(call('Le bouton "Exporter" ne marche pas'), index))
+    _, _, result = asyncio.run(agent_main.execute_tool_call(
+        call('Le bouton "Exporter" est trop lent et l\'appli plante au démarrage'), index
+    ))
+
+    # Empreinte du feedback complet : la citation commune ne le fait pas passer pour déjà analysé
+    assert texts == ['Le bouton "Exporter" ne marche pas', 'Le bouton "Exporter" est trop lent et l\'appli plante au démarrage']
+    assert [f["name"] for f in result["features"]] == ["F1", "F2"]
+
+if __name__ == '__main__':
+    test_feature_index_merges_by_name_and_fingerprint()
+    test_incremental_analysis_sends_only_new_feedbacks()
@@ -0,0 +1,76 @@
+def test_feature_store_saves_and_searches_tool_results(tmp_path):
+    import time
+    from backend.tools.feature_store import FeatureStore
+
+    store = FeatureStore(str(tmp_path / "features.sqlite"))
+    analysis = {"features": [
+        {"name": "Export PDF", "description": "Exporter les rapports", "source_feedbacks": ["L'export plante"], "category": "bug"},
+        {"name": "Mode sombre", "description": "Thème sombre", "source_feedbacks": ["Trop lumineux"], "category": "feature"},
+    ]}
+    assert store.save("analyze_feedback_tool", analysis, "s1") == 2
+    # Même fonctionnalité revue dans la même session : mise à jour, pas de doublon
+    analysis["features"][0]["source_feedbacks"].append("Les exports échouent")
+    store.save("analyze_feedback_tool", analysis, "s1")
+    store.save("write_user_stories_tool", {"stories": [
+        {"feature": "Export PDF", "story": {"title": "Exporter en PDF", "story": "s", "acceptance_criteria": ["Le fichier s'ouvre"], "estimated_complexity": "faible"}},
+        {"feature": "Mode sombre", "error": "échec"},
+    ]}, "s2")
+    assert store.save("identify_recurrent_patterns_tool", {"patterns": ["export"]}) == 0
+
+    # Accents, casse et pluriel ignorés ; provenance et dates conservées
+    result = store.search("EXPORTS échoués")
+    assert [(r.kind, r.session_id) for r in result.records] == [("feature", "s1"), ("user_story", "s2")]
+    assert result.records[0].tool == "analyze_feedback_tool"
+    assert result.records[0].data["source_feedbacks"] == ["L'export plante", "Les exports échouent"]
+    assert "[" in result.records[0].snippet
+
+    assert [r.name for r in store.search("export", kind="user_story").records] == ["Exporter en PDF"]
+    assert store.search("export", since=time.time() + 60).records == []
+    assert store.search("?!").records == []
+
+
+def test_supervisor_records_tool_results_with_session(tmp_path, monkeypatch):
+    import asyncio
+    import json
+    from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+    from backend.agent.agent_main import supervisor_step
+    from backend.core.chains import registry
+    from backend.core.fake_llm import FakeChatModel, tool_call_message
+    from backend.tools import feature_store
+
+    store = feature_store.FeatureStore(str(tmp_path / "features.sqlite"))
+    monkeypatch.setattr(feature_store, "feature_store", store)
+    story = json.dumps({"title": "Exporter en PDF", "story": "s", "acceptance_criteria": ["a"], "estimated_complexity": "faible"})
+
+    def responder(messages):
+        if isinstance(messages[0], SystemMessage) and "Product" in messages[0].content:
+            if isinstance(messages[-1], ToolMessage):
+                return "ok"
+            return tool_call_message({"name": "write_user_story_tool", "args": {"feature_description": "Export PDF"}})
+        return story
+
+    registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=responder))
+    try:
+        asyncio.run(supervisor_step({"messages": [HumanMessage(content="Rédige une user story")]}, {"configurable": {"thread_id": "s1"}}))
+    finally:
+        registry.set_llm_factory(None)
+
+    records = store.search("pdf").records
+    assert [(r.kind, r.name, r.session_id) for r in records] == [("user_story", "Exporter en PDF", "s1")]
+
+
+
+def test_record_tool_result_ignores_storage_errors(tmp_path, monkeypatch):
+    import asyncio
+    from backend.tools import feature_store
+
+    # Le répertoire de la base est un fichier : l'écriture échoue avec une OSError
+    (tmp_path / "cache").write_text("")
+    monkeypatch.setattr(feature_store, "feature_store", feature_store.FeatureStore(str(tmp_path / "cache" / "features.sqlite")))
+    analysis = {"features": [{"name": "Export PDF", "description": "d", "source_feedbacks": [], "category": "bug"}]}
+
+    asyncio.run(feature_store.record_tool_result("analyze_feedback_tool", analysis, "s1"))
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
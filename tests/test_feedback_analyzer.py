@@ -46,6 +46,47 @@ def test_identify_recurrent_patterns_tool():
         else:
             print("Aucun pattern récurrent identifié.")
 
+def test_merge_features():
+    from backend.tools.feedback_analyzer import AnalysisResult, Feature, merge_features
+
+    batch_1 = AnalysisResult(features=[
+        Feature(name="Export PDF", description="Exporter en PDF.", source_feedbacks=["Export PDF svp"], category="feature"),
+        Feature(name="Connexion Google", description="Bug de connexion.", source_feedbacks=["Google KO"], category="bug"),
+    ])
+    batch_2 = AnalysisResult(features=[
+        Feature(name="export pdf", description="Exporter les rapports en PDF.", source_feedbacks=["Export PDF svp", "PDF !"], category="feature"),
+    ])
+    merged = merge_features([batch_1, batch_2])
+
+    assert [f.name for f in merged.features] == ["Export PDF", "Connexion Google"]
+    assert merged.features[0].source_feedbacks == ["Export PDF svp", "PDF !"]
+    assert merged.features[0].description == "Exporter les rapports en PDF."
+
+
+def test_analyze_feedback_in_batches(monkeypatch):
+    import asyncio
+    import backend.tools.feedback_analyzer as analyzer
+    from backend.tools.feedback_analyzer import AnalysisResult, Feature
+
+    prompts = []
+
+    async def fake_ainvoke_chain(spec, inputs, model=None):
+        prompts.append(inputs["feedback"])
+        return AnalysisResult(features=[
+            Feature(name="Export PDF", description="d", source_feedbacks=[line[2:]], category="feature")
+            for line in inputs["feedback"].splitlines()
+        ])
+
+    monkeypatch.setattr(analyzer, "ainvoke_chain", fake_ainvoke_chain)
+    feedback_text = "\n".join(f"Je veux exporter le rapport {i} en PDF." for i in range(50))
+    result = asyncio.run(analyzer.analyze_feedback_in_batches(feedback_text, max_tokens=60))
+
+    assert len(prompts) > 1
+    assert all(analyzer.estimate_tokens(p) <= 80 for p in prompts)
+    assert len(result.features) == 1
+    assert len(result.features[0].source_feedbacks) == 50
+
+
 if __name__ == '__main__':
     test_feedback_analyzer()
     test_identify_recurrent_patterns_tool()
@@ -0,0 +1,97 @@
+def _turn(i, payload):
+    import json
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+    return [
+        HumanMessage(content=f"Analyse ces feedbacks n°{i}"),
+        AIMessage(content="", tool_calls=[{"name": "analyze_feedback_tool", "args": {"feedback_text": "x"}, "id": f"call-{i}"}]),
+        ToolMessage(content=json.dumps(payload), tool_name="analyze_feedback_tool", tool_call_id=f"call-{i}"),
+        AIMessage(content=f"Voici l'analyse n°{i}."),
+    ]
+
+
+def test_compact_history_replaces_old_tool_payloads():
+    import json
+    from langchain_core.messages import SystemMessage, ToolMessage
+    from backend.agent.history import compact_history
+
+    payload = {"features": [{"name": f"Feature {j}", "description": "d" * 200, "source_feedbacks": [], "category": "feature"} for j in range(5)]}
+    history = [SystemMessage(content="system")] + _turn(1, payload) + _turn(2, payload) + _turn(3, payload)[:1]
+    compacted, report = compact_history(history, {"analysis_result": payload}, token_budget=100_000)
+
+    tool_messages = [m for m in compacted if isinstance(m, ToolMessage)]
+    assert len(tool_messages) == 2
+    assert all(json.loads(m.content)["ref"] == "analysis_result" for m in tool_messages)
+    # L'état courant n'est fourni qu'une seule fois
+    assert sum("Feature 0" in str(m.content) for m in compacted) == 3
+    assert report.compacted_tool_messages == 2
+    assert report.tokens_saved > 0
+    assert len(history) == 10  # l'historique d'origine n'est pas modifié
+
+
+def test_compact_history_drops_oldest_turns_over_budget():
+    from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+    from backend.agent.history import compact_history
+
+    history = [SystemMessage(content="system")]
+    for i in range(20):
+        history += _turn(i, {"features": []})
+    history += _turn(20, {"features": []})
+
+    compacted, report = compact_history(history, {}, token_budget=150)
+
+    assert report.dropped_messages > 0
+    assert report.compacted_tokens < report.original_tokens
+    assert "Résumé des échanges précédents" in compacted[1].content
+    # Le tour en cours est conservé intact
+    assert compacted[-4:] == history[-4:]
+    # Les tool_calls restent appariés à leurs ToolMessages
+    remaining = compacted[2:]
+    assert isinstance(remaining[0], HumanMessage)
+    assert sum(isinstance(m, ToolMessage) for m in remaining) == sum(len(getattr(m, "tool_calls", None) or []) for m in remaining)
+
+
+def test_compact_history_bounds_the_state_snapshot():
+    from langchain_core.messages import SystemMessage
+    from backend.agent.history import compact_history, history_tokens, message_tokens, state_snapshot
+
+    payload = {"features": [
+        {"name": f"Feature {j}", "description": "d" * 1000, "source_feedbacks": ["s" * 200], "category": "feature"}
+        for j in range(200)
+    ]}
+    history = [SystemMessage(content="system")]
+    for i in range(3):
+        history += _turn(i, payload)
+    history += _turn(3, payload)[:1]
+
+    compacted, report = compact_history(history, {"analysis_result": payload}, token_budget=8000)
+
+    assert report.compacted_tokens <= 8000
+    assert report.tokens_saved > 0
+    assert report.compacted_tokens == history_tokens(compacted)
+    snapshot = next(m for m in compacted if "Résultats courants" in str(m.content))
+    # Description compacte (noms et catégories), sans les descriptions complètes
+    assert "Feature 0 (feature)" in snapshot.content
+    assert "d" * 1000 not in snapshot.content
+
+    # Budget trop petit pour toute la liste : troncature signalée
+    truncated = state_snapshot({"analysis_result": payload}, max_tokens=100)
+    assert message_tokens(truncated) <= 100
+    assert "lignes omises" in truncated.content
+
+
+def test_compact_history_never_grows_the_history():
+    from langchain_core.messages import SystemMessage
+    from backend.agent.history import compact_history
+
+    payload = {"features": [{"name": f"F{j}", "description": "d", "source_feedbacks": [], "category": "bug"} for j in range(50)]}
+    history = [SystemMessage(content="system")] + _turn(1, {"features": payload["features"][:1]}) + _turn(2, payload)[:1]
+    compacted, report = compact_history(history, {"analysis_result": payload}, token_budget=100_000)
+
+    assert report.compacted_tokens <= report.original_tokens
+    assert report.tokens_saved >= 0
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
@@ -0,0 +1,98 @@
+def test_route_intent_builds_tool_calls_for_obvious_requests():
+    from backend.agent.intent import route_intent
+
+    decision = route_intent("Analyse ces feedbacks : L'app plante. Je veux un export PDF.", {})
+    assert decision.tool_call["name"] == "analyze_feedback_tool"
+    assert decision.tool_call["args"] == {"feedback_text": "L'app plante. Je veux un export PDF."}
+    assert decision.tool_call["id"].startswith("fast-")
+
+    decision = route_intent("Quels sont les patterns récurrents : L'app plante. L'app est lente.", {})
+    assert decision.tool_call["name"] == "identify_recurrent_patterns_tool"
+    assert len(decision.tool_call["args"]["feedbacks"]) == 2
+
+    decision = route_intent("Rédige les user stories :\n- Export PDF\n- Mode sombre", {})
+    assert decision.tool_call["name"] == "write_user_stories_tool"
+    assert decision.tool_call["args"] == {"features": ["Export PDF", "Mode sombre"]}
+
+    decision = route_intent("Rédige les user stories de « Export PDF » et « Mode sombre »", {})
+    assert decision.tool_call["args"] == {"features": ["Export PDF", "Mode sombre"]}
+
+    # Une seule ligne : une seule fonctionnalité, même décrite en plusieurs phrases
+    description = "En tant qu'admin je veux exporter le tableau en PDF. Le fichier doit inclure les filtres actifs."
+    decision = route_intent(f"Rédige une user story : {description}", {})
+    assert decision.tool_call["name"] == "write_user_story_tool"
+    assert decision.tool_call["args"] == {"feature_description": description}
+
+    state = {"analysis_result": {"features": [{"name": "Export PDF", "description": "d", "category": "export", "source_feedbacks": []}]}}
+    decision = route_intent("Priorise les fonctionnalités en MoSCoW", state)
+    assert decision.tool_call["name"] == "prioritize_features_tool"
+    assert decision.tool_call["args"]["framework"] == "MoSCoW"
+    assert decision.tool_call["args"]["features"] == [{"name": "Export PDF", "description": "d", "category": "export"}]
+
+
+def test_route_intent_falls_back_when_ambiguous():
+    from backend.agent.intent import route_intent
+
+    # Plusieurs intentions, aucune intention outillée, données manquantes ou classifieur peu sûr
+    assert route_intent("Analyse ces feedbacks et priorise-les : L'app plante.", {}).tool_call is None
+    assert route_intent("Bonjour : comment ça va ?", {}).tool_call is None
+    assert route_intent("Rédige une user story", {}).tool_call is None
+    assert route_intent("Priorise les fonctionnalités", {}).tool_call is None
+    assert route_intent("Analyse ces feedbacks : L'app plante.", {}, min_confidence=1.0).tool_call is None
+
+
+def test_route_intent_leaves_questions_and_short_payloads_to_the_supervisor():
+    from backend.agent.intent import route_intent, split_instruction
+
+    # Deux-points suivi d'une remarque, pas de données
+    message = "Peux-tu m'expliquer comment tu analyses les feedbacks : je ne comprends pas"
+    assert split_instruction(message)[1] == "je ne comprends pas"
+    assert route_intent(message, {}).tool_call is None
+    assert split_instruction("Analyse ces feedbacks : ok") == ("Analyse ces feedbacks : ok", "")
+    assert route_intent("Analyse ces feedbacks : ok", {}).tool_call is None
+    assert route_intent("Analyse ces feedbacks : tu peux le faire ?", {}).tool_call is None
+
+    # Questions, même avec des données citées ou une analyse en cours
+    state = {"analysis_result": {"features": [{"name": "Export PDF", "description": "d", "category": "export", "source_feedbacks": []}]}}
+    assert route_intent("Pourquoi as-tu priorisé ainsi ?", state).tool_call is None
+    assert route_intent("Comment tu priorises « Export PDF » en RICE", state).tool_call is None
+
+    # Liste sur plusieurs lignes : données, même courtes
+    decision = route_intent("Analyse ces feedbacks :\n- Lent\n- Cher", {})
+    assert decision.tool_call["name"] == "analyze_feedback_tool"
+
+
+def test_fast_path_skips_the_routing_call():
+    import asyncio
+    import json
+    from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+    from backend.agent.agent_main import supervisor_step
+    from backend.core.chains import registry
+    from backend.core.fake_llm import FakeChatModel
+
+    story = json.dumps({"title": "t", "story": "s", "acceptance_criteria": ["a"], "estimated_complexity": "faible"})
+    supervisor_calls = []
+
+    def responder(messages):
+        if isinstance(messages[0], SystemMessage) and "Product" in messages[0].content:
+            supervisor_calls.append(messages)
+            return "Voici la user story."
+        return story
+
+    registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=responder))
+    try:
+        state = asyncio.run(supervisor_step({"messages": [HumanMessage(content="Rédige une user story : Export PDF")]}))
+    finally:
+        registry.set_llm_factory(None)
+
+    # Un seul appel au supervisor : la réponse finale, après le résultat de l'outil
+    assert len(supervisor_calls) == 1
+    assert isinstance(supervisor_calls[0][-1], ToolMessage)
+    assert state["user_story"]["title"] == "t"
+
+
+if __name__ == '__main__':
+    test_route_intent_builds_tool_calls_for_obvious_requests()
+    test_route_intent_falls_back_when_ambiguous()
+    test_route_intent_leaves_questions_and_short_payloads_to_the_supervisor()
+    test_fast_path_skips_the_routing_call()
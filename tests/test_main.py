@@ -0,0 +1,35 @@
+def test_stream_turn_prints_tokens_and_tool_events(capsys):
+    import asyncio
+    import json
+    from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+    from backend.core.chains import registry
+    from backend.core.fake_llm import FakeChatModel, tool_call_message
+    from backend.main import stream_turn
+
+    story = json.dumps({"title": "t", "story": "s", "acceptance_criteria": ["a"], "estimated_complexity": "faible"})
+
+    def responder(messages):
+        if isinstance(messages[0], SystemMessage) and "Product" in messages[0].content:
+            if isinstance(messages[-1], ToolMessage):
+                return "Voici la user story."
+            return tool_call_message({"name": "write_user_story_tool", "args": {"feature_description": "Export PDF"}})
+        return story
+
+    registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=responder))
+    try:
+        state = asyncio.run(stream_turn({"messages": [HumanMessage(content="Rédige une user story")]}))
+    finally:
+        registry.set_llm_factory(None)
+
+    output = capsys.readouterr().out
+    assert "[write_user_story_tool] en cours…" in output
+    assert "[write_user_story_tool] terminé" in output
+    assert "Voici la user story." in output
+    # Les sorties JSON des chaînes d'outils ne sont pas affichées
+    assert "acceptance_criteria" not in output
+    assert state["user_story"]["title"] == "t"
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
@@ -0,0 +1,36 @@
+def test_track_call_and_summary(tmp_path):
+    import json
+    import pytest
+    from langchain_core.exceptions import OutputParserException
+    import backend.core.metrics as metrics_module
+    from backend.core.metrics import MetricsRegistry, track_call
+
+    registry = MetricsRegistry(trace_file=str(tmp_path / "trace.jsonl"))
+    metrics_module.metrics, previous = registry, metrics_module.metrics
+    try:
+        for i in range(10):
+            with track_call("chain", "analyze_feedback", "gemini-2.5-flash") as record:
+                record.cache_hit = i % 2 == 0
+                record.input_tokens = 100
+        with pytest.raises(OutputParserException):
+            with track_call("chain", "analyze_feedback"):
+                raise OutputParserException("JSON invalide")
+    finally:
+        metrics_module.metrics = previous
+
+    summary = registry.summary()["chain:analyze_feedback"]
+    assert summary["count"] == 11
+    assert summary["input_tokens"] == 1000
+    assert summary["cache_hit_rate"] == 0.5
+    assert summary["parse_failure_rate"] == 1 / 11
+    assert set(summary["wall_time"]) == {"p50", "p95", "p99"}
+
+    registry.flush()
+    lines = (tmp_path / "trace.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 11
+    assert json.loads(lines[-1])["parse_failure"] is True
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
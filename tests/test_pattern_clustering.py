@@ -0,0 +1,63 @@
+def _synthetic_feedbacks(n_per_theme):
+    themes = [
+        "la synchronisation échoue sur {} appareils",
+        "impossible de me connecter avec google sur {} comptes",
+        "export pdf des rapports cassé sur {} projets",
+    ]
+    return [theme.format(i) for i in range(n_per_theme) for theme in themes]
+
+
+def test_cluster_feedbacks_groups_themes():
+    from backend.tools.pattern_clustering import cluster_feedbacks
+
+    feedbacks = _synthetic_feedbacks(40)
+    clusters = cluster_feedbacks(feedbacks, n_clusters=3, samples_per_cluster=3)
+
+    assert sorted(c.size for c in clusters) == [40, 40, 40]
+    for cluster in clusters:
+        themes = {feedbacks[i].split(" ")[1] for i in cluster.members}
+        assert len(themes) == 1
+        assert len(cluster.samples) == 3
+
+
+def test_identify_patterns_by_clustering_makes_one_model_call(monkeypatch):
+    import asyncio
+    import backend.tools.feedback_analyzer as analyzer
+    from backend.tools.feedback_analyzer import ClusterLabels
+
+    calls = []
+
+    async def fake_ainvoke_chain(spec, inputs, model=None):
+        calls.append(spec.name)
+        return ClusterLabels(labels=["Thème A", "Thème B"])
+
+    monkeypatch.setattr(analyzer, "ainvoke_chain", fake_ainvoke_chain)
+    monkeypatch.setattr(analyzer, "PATTERN_MAX_CLUSTERS", 3)
+    result = asyncio.run(analyzer.identify_patterns_by_clustering(_synthetic_feedbacks(100)))
+
+    assert calls == ["label_pattern_clusters"]
+    assert sum(c.size for c in result.clusters) == 300
+    assert result.patterns[:2] == ["Thème A", "Thème B"]
+    # Libellé de repli pour le groupe non nommé par le modèle
+    assert result.patterns[2] == result.clusters[2].examples[0]
+
+
+
+def test_small_volume_patterns_come_from_a_patterns_only_schema(monkeypatch):
+    import backend.tools.feedback_analyzer as analyzer
+    from backend.tools.feedback_analyzer import PATTERN_CHAIN, RecurrentPatterns
+
+    assert set(PATTERN_CHAIN.schema.model_fields) == {"patterns"}
+
+    async def fake_ainvoke_chain(spec, inputs, model=None):
+        return RecurrentPatterns(patterns=["Lenteurs"])
+
+    monkeypatch.setattr(analyzer, "ainvoke_chain", fake_ainvoke_chain)
+    result = analyzer.identify_recurrent_patterns_tool.invoke({"feedbacks": ["L'app est lente.", "Tout rame."]})
+
+    assert result.patterns == ["Lenteurs"]
+    assert result.clusters == []
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
@@ -0,0 +1,44 @@
+def test_pipeline_runs_all_stages_without_supervisor():
+    import asyncio
+    import json
+    from backend.agent.pipeline import run_pipeline
+    from backend.core.chains import registry
+    from backend.core.fake_llm import FakeChatModel
+
+    reach = {"Export": 10, "Recherche": 90, "Mode": 50}
+    prompts = []
+
+    def responder(messages):
+        prompt = str(messages[-1].content)
+        prompts.append(prompt)
+        if "Analysez le feedback" in prompt:
+            lines = prompt.split("---")[1].strip().splitlines()
+            features = [{"name": line.split(" ")[0], "description": line, "source_feedbacks": [line], "category": "feature"} for line in lines]
+            return json.dumps({"features": features}, ensure_ascii=False)
+        if "User Story" in prompt:
+            feature = prompt.split("---")[1].strip()
+            return json.dumps({"title": f"Story {feature.split(' ')[0]}", "story": feature, "acceptance_criteria": ["a"], "estimated_complexity": "faible"})
+        features = [
+            {"feature_name": name, "score": f"reach={value}; impact=1; confidence=100%; effort=1", "justification": "j"}
+            for name, value in reach.items()
+        ]
+        return json.dumps({"features": features})
+
+    registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=responder))
+    try:
+        results = asyncio.run(run_pipeline("Export PDF cassé\nRecherche trop lente\nMode nuit trop sombre", top_n=2))
+    finally:
+        registry.set_llm_factory(None)
+
+    # Analyse + priorisation + une story par fonctionnalité retenue, aucun appel au supervisor
+    assert len(prompts) == 4
+    assert [f["feature_name"] for f in results["prioritization_result"]["features"]] == ["Recherche", "Mode", "Export"]
+    stories = results["user_stories"]["stories"]
+    assert [outcome["story"]["title"] for outcome in stories] == ["Story Recherche", "Story Mode"]
+    # La description issue de l'analyse est transmise à la rédaction
+    assert stories[0]["feature"] == "Recherche : Recherche trop lente"
+    assert len(results["feature_index"]["seen"]) == 3
+
+
+if __name__ == '__main__':
+    test_pipeline_runs_all_stages_without_supervisor()
@@ -0,0 +1,150 @@
+def test_parse_subscores():
+    from backend.tools.scoring import parse_subscores
+
+    assert parse_subscores("reach=60; effort=3") == {"reach": 60.0, "effort": 3.0}
+    score = "reach=60 : beaucoup d'utilisateurs. impact=8 : fort. confidence=90% : données solides. effort=2,5 : simple."
+    assert parse_subscores(score) == {"reach": 60.0, "impact": 8.0, "confidence": 0.9, "effort": 2.5}
+    assert parse_subscores(None) == {}
+
+
+def test_rice_score_board_ranking():
+    import time
+    import numpy as np
+    from backend.tools.scoring import RiceScoreBoard
+
+    board = RiceScoreBoard(["A", "B", "C"])
+    board.set("A", reach=10, impact=1, confidence=1, effort=1)
+    board.set("B", reach=100, impact=2, confidence=0.5, effort=4)
+    board.set("C", reach=50)
+    assert board.missing() == ["C"]
+    assert [board.names[i] for i in board.ranking()] == ["B", "A", "C"]
+
+    # Re-classement d'un gros backlog après modification d'un seul sous-score
+    n = 10_000
+    big = RiceScoreBoard(f"F{i}" for i in range(n))
+    big.values[:] = np.random.default_rng(0).uniform(1, 10, size=(n, 4))
+    start = time.perf_counter()
+    big.set("F42", reach=1e6)
+    order = big.ranking()
+    assert (time.perf_counter() - start) < 0.5
+    assert big.names[order[0]] == "F42"
+
+
+def test_prioritize_rice_only_calls_model_for_missing_subscores(monkeypatch):
+    import asyncio
+    import json
+    import backend.tools.prioritizer as prioritizer
+    from backend.tools.prioritizer import FeatureToPrioritize, PrioritizationResult, PrioritizedFeature
+
+    calls = []
+
+    async def fake_ainvoke_chain(spec, inputs, model=None):
+        calls.append([f["name"] for f in json.loads(inputs["features"])])
+        return PrioritizationResult(features=[
+            PrioritizedFeature(feature_name="Mode sombre", score="reach=10 : x. impact=1 : x. confidence=1 : x. effort=1 : x.", final_score=999, justification="j"),
+        ])
+
+    monkeypatch.setattr(prioritizer, "ainvoke_chain", fake_ainvoke_chain)
+    features = [
+        FeatureToPrioritize(name="Export PDF", description="d", score_details="reach=60; impact=2; confidence=0.5; effort=3"),
+        FeatureToPrioritize(name="Mode sombre", description="d"),
+    ]
+    result = asyncio.run(prioritizer.prioritize_rice(features))
+
+    assert calls == [["Mode sombre"]]
+    assert [(f.feature_name, f.final_score) for f in result.features] == [("Export PDF", 20.0), ("Mode sombre", 10.0)]
+
+
+def test_chunked_rice_prioritization_is_calibrated_by_anchors(monkeypatch):
+    import asyncio
+    import json
+    import pytest
+    import backend.tools.prioritizer as prioritizer
+    from backend.tools.prioritizer import FeatureToPrioritize, PrioritizationResult, PrioritizedFeature
+
+    calls = []
+
+    async def fake_ainvoke_chain(spec, inputs, model=None):
+        names = [f["name"] for f in json.loads(inputs["features"])]
+        calls.append(names)
+        # Chaque lot est noté avec un biais différent ; la vraie portée de Fn est n
+        bias = 1 + sum(int(name[1:]) for name in names) % 4
+        return PrioritizationResult(features=[
+            PrioritizedFeature(
+                feature_name=name,
+                score=f"reach={int(name[1:]) * bias} : x. impact=1 : x. confidence=1 : x. effort=1 : x.",
+                justification="j",
+            )
+            for name in names
+        ])
+
+    monkeypatch.setattr(prioritizer, "ainvoke_chain", fake_ainvoke_chain)
+    monkeypatch.setattr(prioritizer, "PRIORITIZATION_CHUNK_SIZE", 10)
+    monkeypatch.setattr(prioritizer, "PRIORITIZATION_ANCHORS", 3)
+    features = [FeatureToPrioritize(name=f"F{n}", description="d") for n in range(1, 41)]
+
+    result = asyncio.run(prioritizer.prioritize_rice(features))
+    reversed_result = asyncio.run(prioritizer.prioritize_rice(features[::-1]))
+
+    # 37 fonctionnalités hors ancres, 7 par lot ; ancres présentes dans chaque lot
+    assert len(calls) == 2 * 6
+    assert all(len(names) <= 10 for names in calls)
+    ranking = [f.feature_name for f in result.features]
+    assert ranking == [f"F{n}" for n in range(40, 0, -1)]
+    assert [f.feature_name for f in reversed_result.features] == ranking
+    # Scores ramenés à une échelle commune : proportionnels à la vraie portée
+    scores = [f.final_score for f in result.features]
+    assert scores[0] / scores[-1] == pytest.approx(40, rel=0.01)
+
+
+
+def test_chunked_moscow_prioritization_is_aligned_by_anchors(monkeypatch):
+    import asyncio
+    import json
+    import backend.tools.prioritizer as prioritizer
+    from backend.tools.prioritizer import FeatureToPrioritize, PrioritizationResult, PrioritizedFeature
+    from backend.tools.scoring import MOSCOW_LABELS
+
+    calls = []
+
+    async def fake_ainvoke_chain(spec, inputs, model=None):
+        names = [f["name"] for f in json.loads(inputs["features"])]
+        calls.append(names)
+        # Vrai niveau de Fn : n % 4 ; le premier lot est classé un niveau trop sévèrement
+        harsh = int(len(calls) == 1)
+        return PrioritizationResult(features=[
+            PrioritizedFeature(
+                feature_name=name,
+                qualitative_rank=MOSCOW_LABELS[min(int(name[1:]) % 4 + harsh, 3)],
+                justification="j",
+            )
+            for name in names
+        ])
+
+    monkeypatch.setattr(prioritizer, "ainvoke_chain", fake_ainvoke_chain)
+    monkeypatch.setattr(prioritizer, "PRIORITIZATION_CHUNK_SIZE", 10)
+    monkeypatch.setattr(prioritizer, "PRIORITIZATION_ANCHORS", 3)
+    features = [FeatureToPrioritize(name=f"F{n}", description="d") for n in range(1, 41)]
+
+    result = prioritizer.prioritize_features_tool.invoke({"features": features, "framework": "MoSCoW"})
+
+    assert len(calls) == 6
+    assert len(result.features) == 40
+    # Lot sévère réaligné sur les ancres (ses Could et Won't, tous deux classés Won't, restent indiscernables)
+    # puis classement global par niveau
+    levels = [MOSCOW_LABELS.index(f.qualitative_rank) for f in result.features]
+    assert levels == sorted(levels)
+    for f in result.features:
+        true_level = int(f.feature_name[1:]) % 4
+        if true_level < 2:
+            assert f.qualitative_rank == MOSCOW_LABELS[true_level]
+    assert any("Aligné sur les ancres" in f.justification for f in result.features)
+
+    # Autres frameworks : un seul appel sur tout le backlog
+    calls.clear()
+    prioritizer.prioritize_features_tool.invoke({"features": features, "framework": "WSJF"})
+    assert [len(names) for names in calls] == [40]
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
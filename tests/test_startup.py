@@ -0,0 +1,46 @@
+import os
+
+# Budget du temps d'import (cumulé) du module de l'agent, en secondes
+IMPORT_BUDGET = float(os.getenv("IMPORT_BUDGET_SECONDS", "2.0"))
+
+# Modules lourds qui ne doivent être chargés qu'au premier usage
+DEFERRED_MODULES = ("langchain_google_genai", "google.ai.generativelanguage", "langgraph", "sklearn")
+
+
+def _import_times(module):
+    import subprocess
+    import sys
+
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_agent_import_is_lazy_and_within_budget():
+    times = _import_times("backend.agent.agent_main")
+
+    loaded = [name for name in times if name.startswith(DEFERRED_MODULES)]
+    assert loaded == [], f"Modules chargés à l'import : {loaded}"
+    assert times["backend.agent.agent_main"] < IMPORT_BUDGET
+
+
+def test_agent_is_compiled_on_first_use():
+    from backend.agent.agent_main import get_agent
+
+    assert get_agent() is get_agent()
+
+
+if __name__ == '__main__':
+    test_agent_import_is_lazy_and_within_budget()
+    test_agent_is_compiled_on_first_use()
@@ -18,5 +18,47 @@ def test_story_writer():
             print(f"  {idx}. {crit}")
         print(f"Estimated Complexity: {user_story.estimated_complexity}")
 
+
+def test_write_user_stories_in_order_with_isolated_failures():
+    import asyncio
+    import json
+    import re
+    from backend.core.chains import registry
+    from backend.core.fake_llm import FakeChatModel
+    from backend.tools.story_writer import write_user_stories
+
+    def story(feature, **extra):
+        return {**extra, "title": f"Story {feature}", "story": "s", "acceptance_criteria": ["a"], "estimated_complexity": "faible"}
+
+    prompts = []
+
+    def responder(messages):
+        prompt = str(messages[-1].content)
+        prompts.append(prompt)
+        numbered = re.findall(r"^\s*(\d+)\. (F\d)$", prompt, re.MULTILINE)
+        if numbered:
+            # Réponse groupée incomplète : la fonctionnalité F3 est omise
+            return json.dumps({"stories": [story(f, index=int(n)) for n, f in numbered if f != "F3"]})
+        feature = prompt.split("---")[1].strip()
+        if feature == "F4" or "pas pu être validée" in prompt:
+            return "pas de JSON"
+        return json.dumps(story(feature))
+
+    registry.set_llm_factory(lambda model, temperature: FakeChatModel(responder=responder))
+    try:
+        result = asyncio.run(write_user_stories(["F0", "F1", "F2", "F3", "F4"], batch_size=2, max_concurrency=2))
+    finally:
+        registry.set_llm_factory(None)
+
+    assert [outcome.feature for outcome in result.stories] == ["F0", "F1", "F2", "F3", "F4"]
+    assert [outcome.story.title for outcome in result.stories[:4]] == ["Story F0", "Story F1", "Story F2", "Story F3"]
+    # F4 : seul d'un lot, sortie invalide même après correction → erreur isolée
+    assert result.stories[4].story is None and result.stories[4].error
+    # 2 lots groupés + F3 régénérée seule + F4 (et sa tentative de correction)
+    assert sum("F3" in p for p in prompts) == 2
+    assert len(prompts) == 5
+
+
 if __name__ == '__main__':
     test_story_writer()
+    test_write_user_stories_in_order_with_isolated_failures()
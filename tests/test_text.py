@@ -0,0 +1,40 @@
+def test_split_feedbacks():
+    from backend.core.text import split_feedbacks
+
+    quoted = "Voici des feedbacks : « La synchro est lente », « Je dois relancer l'appli ». Merci"
+    assert split_feedbacks(quoted) == ["La synchro est lente", "Je dois relancer l'appli"]
+
+    lines = "- Export PDF\n\n- Mode sombre\n"
+    assert split_feedbacks(lines) == ["Export PDF", "Mode sombre"]
+
+    sentences = "Export PDF cassé. Ajoutez un mode sombre !"
+    assert split_feedbacks(sentences) == ["Export PDF cassé.", "Ajoutez un mode sombre !"]
+
+    labelled = "Ticket 1 : « La synchro est lente »\nTicket 2 : « Export PDF cassé »"
+    assert split_feedbacks(labelled) == ["La synchro est lente", "Export PDF cassé"]
+
+
+def test_split_feedbacks_keeps_unquoted_text():
+    from backend.core.text import split_feedbacks
+
+    # Une citation dans un feedback ne remplace pas le reste du texte
+    tickets = [f"Ticket {i} : l'appli plante à l'étape {i}" for i in range(20)] + ['le bouton "Exporter" est grisé']
+    assert split_feedbacks("\n".join(tickets)) == tickets
+    assert split_feedbacks('Le bouton "Exporter" ne marche pas') == ['Le bouton "Exporter" ne marche pas']
+
+    mixed = 'Ticket 1: "connexion impossible". Ticket 2: l\'export PDF plante.'
+    assert split_feedbacks(mixed) == ['Ticket 1: "connexion impossible".', "Ticket 2: l'export PDF plante."]
+
+
+def test_batch_by_tokens():
+    from backend.core.text import batch_by_tokens, normalize_text
+
+    batches = batch_by_tokens(["a" * 40, "b" * 40, "c" * 40], max_tokens=25)
+    assert batches == [["a" * 40, "b" * 40], ["c" * 40]]
+    assert normalize_text("  Éxport   PDF ! ") == "export pdf"
+
+
+if __name__ == '__main__':
+    test_split_feedbacks()
+    test_split_feedbacks_keeps_unquoted_text()
+    test_batch_by_tokens()